@@ -1,4 +1,11 @@
-import requests, os
+import os
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+
+from src.apis.session import get_http_client, CONNECT_ONLY
 
 class Forecast:
     def set_forecast(self, token_remc, json_data, owner_id, forecast_type, module):
@@ -18,6 +25,18 @@ class Forecast:
             dict: JSON response from the API.
         """
         
+        r = self.post_forecast(token_remc, json_data, owner_id, forecast_type, module)
+        print(str(r))  
+        return r.json()
+
+    def post_forecast(self, token_remc, json_data, owner_id, forecast_type, module):
+        """
+        Send one setForecast request through the pooled session and return the raw response.
+
+        Only failures to connect are retried: the request never reached the server, so
+        resending it cannot submit a forecast twice. Error statuses and read timeouts are
+        not retried, since the server may already have stored the forecast.
+        """
         api_endpoint = os.getenv('remc_base_url') + 'setForecast'
 
         params = {
@@ -28,6 +47,93 @@ class Forecast:
             'level': module
         }
 
-        r = requests.post(url=api_endpoint, data=params)
-        print(str(r))  
-        return r.json()
\ No newline at end of file
+        return get_http_client().post(url=api_endpoint, data=params, retry=CONNECT_ONLY)
+
+    def response_error(self, r):
+        """
+        Error of a setForecast response, None if it was accepted.
+
+        A response is accepted when its status is 2xx, its body is JSON, and the body
+        carries no error: no truthy 'error'/'errors' key, and no 'success' or 'status'
+        key set to false or to an error/fail value.
+        """
+        if not r.ok:
+            return f'HTTP {r.status_code}: {r.text[:200]}'
+        try:
+            body = r.json()
+        except ValueError:
+            return f'Response is not JSON: {r.text[:200]}'
+        if not isinstance(body, dict):
+            return None
+        if body.get('error') or body.get('errors'):
+            return str(body.get('error') or body.get('errors'))[:200]
+        if body.get('success', True) is False:
+            return str(body.get('message', body))[:200]
+        status = body.get('status')
+        if status is False or str(status).lower() in ('error', 'fail', 'failed', 'failure'):
+            return str(body.get('message', body))[:200]
+        return None
+
+    def set_forecasts_bulk(self, token_remc, df_pred, forecast_type, module='plant', max_workers=None):
+        """
+        Upload forecasts of many plants concurrently, one setForecast request per plant.
+
+        Each plant's rows are sent as set_forecast sends them, with the plant's own
+        owner_id. Requests run on a bounded thread pool over the shared pooled
+        session. A request is retried only if it failed to connect (see post_forecast).
+        ForecastDaemon only calls it when uploading was enabled (see to_payload).
+
+        Args:
+            token_remc (dict): Dictionary containing access token information.
+            df_pred (DataFrame): Long forecast with owner_id, plant_id, datetime, revision and forecast columns.
+            forecast_type (str): Type of forecast.
+            module (str): Optional parameter for module level.
+            max_workers (int): Max requests in flight, defaults to the `upload_max_workers` env variable or 8.
+
+        Returns:
+            DataFrame: One row per plant with owner_id, plant_id, forecast_type, success,
+                status_code, latency (s) and error (see response_error).
+        """
+        max_workers = int(max_workers or os.getenv('upload_max_workers', 8))
+        plants = list(df_pred.groupby('plant_id', sort=False))
+
+        def upload(plant_id, df_plant):
+            owner_id = df_plant['owner_id'].iloc[0]
+            start = time.perf_counter()
+            status_code, error = None, None
+            try:
+                r = self.post_forecast(token_remc, self.to_payload(df_plant), owner_id, forecast_type, module)
+                status_code = r.status_code
+                error = self.response_error(r)
+            except Exception as e:
+                error = str(e)
+            return {'owner_id': owner_id, 'plant_id': plant_id, 'forecast_type': forecast_type,
+                    'success': error is None, 'status_code': status_code,
+                    'latency': time.perf_counter() - start, 'error': error}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(upload, plant_id, df_plant) for plant_id, df_plant in plants]
+            results = [future.result() for future in as_completed(futures)]
+
+        columns = ['owner_id', 'plant_id', 'forecast_type', 'success', 'status_code', 'latency', 'error']
+        return pd.DataFrame(results, columns=columns)
+
+    def to_payload(self, df_pred):
+        """
+        Serialize forecast rows (of predict/predict_many) into the `data` field of setForecast.
+
+        The format setForecast expects for `data` is not documented in this repo, this
+        record layout is an assumption, which is why ForecastDaemon only uploads on request.
+
+        Args:
+            df_pred (DataFrame): Forecast with 'datetime', 'revision' and 'forecast' columns.
+
+        Returns:
+            str: JSON list of {datetime, revision, forecast} records.
+        """
+        records = [
+            {'datetime': dt.strftime('%Y-%m-%d %H:%M:%S'), 'revision': int(revision),
+             'forecast': None if math.isnan(forecast) else float(forecast)}
+            for dt, revision, forecast in zip(df_pred['datetime'], df_pred['revision'], df_pred['forecast'])
+        ]
+        return json.dumps(records)
@@ -0,0 +1,146 @@
+"""
+Shared HTTP client for all REMC/CC API calls.
+
+Keeps one pooled requests.Session per process so that per-plant, per-day
+requests reuse TCP/TLS connections, and adds per-call timeouts, exponential
+backoff retries on transient failures and simple request counters.
+
+Only idempotent methods are retried by default. A POST (e.g. setForecast) may
+have been processed even when the response is an error, so it is sent once
+unless the caller passes retry=True for a read-only POST, or retry=CONNECT_ONLY
+to retry only failures to connect, where the request was never sent.
+"""
+
+import os
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from src.helper.settings import get_settings
+
+# Status codes worth retrying: rate limiting and server-side errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# Methods that can be repeated without changing the result on the server
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+# retry= value that retries only connection failures before the request was sent
+CONNECT_ONLY = 'connect'
+
+
+def is_connect_failure(error):
+    """True if a requests exception happened while connecting, before any byte of the request was sent."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(error, requests.ConnectionError) and isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+class HTTPClient:
+    def __init__(self, pool_size=None, timeout=None, max_retries=None, backoff_factor=None):
+        """
+        Initialize HTTPClient.
+
+        Args:
+            pool_size (int): Max connections kept per host. Match it to the executor width.
+            timeout (float): Per-call timeout in seconds.
+            max_retries (int): Number of retries on 5xx/429 or connection errors.
+            backoff_factor (float): Base delay in seconds, doubled on every retry.
+        """
+        get_settings()
+        self.pool_size = int(pool_size or os.getenv('http_pool_size', 32))
+        self.timeout = float(timeout or os.getenv('http_timeout', 30))
+        self.max_retries = int(max_retries if max_retries is not None else os.getenv('http_max_retries', 3))
+        self.backoff_factor = float(backoff_factor if backoff_factor is not None else os.getenv('http_backoff_factor', 0.5))
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset request, retry, error and latency counters."""
+        with self._lock:
+            self.stats = {'requests': 0, 'retries': 0, 'errors': 0, 'total_latency': 0.0, 'max_latency': 0.0}
+
+    def get_stats(self):
+        """Return a copy of the counters along with the average latency per request."""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['avg_latency'] = stats['total_latency'] / stats['requests'] if stats['requests'] else 0.0
+        return stats
+
+    def _record(self, latency, retried=False, failed=False):
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['retries'] += int(retried)
+            self.stats['errors'] += int(failed)
+            self.stats['total_latency'] += latency
+            self.stats['max_latency'] = max(self.stats['max_latency'], latency)
+
+    def request(self, method, url, timeout=None, retry=None, **kwargs):
+        """
+        Send a request through the pooled session, retrying transient failures.
+
+        Args:
+            method (str): HTTP method, e.g. 'GET' or 'POST'.
+            url (str): Endpoint URL.
+            timeout (float): Optional override of the default per-call timeout.
+            retry (bool or str): Whether transient failures are retried, defaults to True
+                for idempotent methods only. CONNECT_ONLY retries only connection failures
+                before the request was sent, never error statuses or read timeouts.
+            **kwargs: Passed through to requests.Session.request.
+
+        Returns:
+            requests.Response: The final response (possibly with an error status).
+        """
+        timeout = timeout or self.timeout
+        connect_only = retry == CONNECT_ONLY
+        max_retries = self.max_retries if (method.upper() in IDEMPOTENT_METHODS if retry is None else retry) else 0
+        attempt = 0
+        while True:
+            response = None
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(time.perf_counter() - start, retried=attempt > 0, failed=True)
+                if attempt >= max_retries or (connect_only and not is_connect_failure(e)):
+                    raise
+            else:
+                self._record(time.perf_counter() - start, retried=attempt > 0)
+                if connect_only or response.status_code not in RETRY_STATUS_CODES or attempt >= max_retries:
+                    return response
+            time.sleep(self._backoff_delay(attempt, response))
+            attempt += 1
+
+    def _backoff_delay(self, attempt, response=None):
+        """Exponential backoff delay, honouring a numeric Retry-After header when present."""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return float(retry_after)
+        return self.backoff_factor * (2 ** attempt)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """Return the process-wide HTTPClient, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HTTPClient()
+    return _client
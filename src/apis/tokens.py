@@ -1,28 +1,62 @@
 import os
-import requests
 import pandas as pd
-from dotenv import load_dotenv
 import json
+import threading
 from datetime import datetime, timedelta
 
-# Load environment variables from a .env file if present
-load_dotenv()
-
-from src.helper.paths import CONFIG_PATH
+from src.helper import paths
+from src.helper.settings import get_settings
 from src.helper.utils import save_pickle, load_pickle
+from src.apis.session import get_http_client
+
+# Refresh the REMC token this many seconds before it expires
+TOKEN_REFRESH_MARGIN = 300
+TOKEN_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
 
 class APIClient:
     def __init__(self):
+        get_settings()
         self.cc_base_url = os.getenv('cc_base_url')
         self.remc_base_url = os.getenv('remc_base_url')
         self.cc_username = os.getenv('cc_username')
         self.cc_password = os.getenv('cc_password')
         self.remc_email = os.getenv('remc_email')
         self.remc_password = os.getenv('remc_password')
-        self.cc_token_file = os.path.join(CONFIG_PATH, 'token_cc.json')
-        self.remc_token_file = os.path.join(CONFIG_PATH, 'token_remc.json')
-        self.cc_token = self.load_token(self.cc_token_file)
-        self.remc_token = self.load_token(self.remc_token_file)
+        self.cc_token_file = os.path.join(paths.CONFIG_PATH, 'token_cc.json')
+        self.remc_token_file = os.path.join(paths.CONFIG_PATH, 'token_remc.json')
+        self.refresh_margin = int(os.getenv('token_refresh_margin', TOKEN_REFRESH_MARGIN))
+        # token files are read on first use, not at construction
+        self._cc_token = None
+        self._remc_token = None
+        self._cc_loaded = False
+        self._remc_loaded = False
+        self._lock = threading.RLock()
+
+    @property
+    def cc_token(self):
+        with self._lock:
+            if not self._cc_loaded:
+                self._cc_token = self.load_token(self.cc_token_file)
+                self._cc_loaded = True
+            return self._cc_token
+
+    @cc_token.setter
+    def cc_token(self, token_data):
+        with self._lock:
+            self._cc_token, self._cc_loaded = token_data, True
+
+    @property
+    def remc_token(self):
+        with self._lock:
+            if not self._remc_loaded:
+                self._remc_token = self.load_token(self.remc_token_file)
+                self._remc_loaded = True
+            return self._remc_token
+
+    @remc_token.setter
+    def remc_token(self, token_data):
+        with self._lock:
+            self._remc_token, self._remc_loaded = token_data, True
 
     def load_token(self, token_file):
         """Load token from JSON file if it exists and is valid."""
@@ -30,41 +64,56 @@ class APIClient:
             with open(token_file, 'r') as file:
                 token_data = json.load(file)
                 # Check if token is still valid
-                if 'expires_at' in token_data and datetime.strptime(token_data['expires_at'], '%Y-%m-%dT%H:%M:%S') > datetime.now():
+                if 'expires_at' in token_data and datetime.strptime(token_data['expires_at'], TOKEN_TIME_FORMAT) > datetime.now():
                     return token_data
         return None
 
     def save_token(self, token_file, token_data):
         """Save token to JSON file."""
-        with open(token_file, 'w') as file:
+        with open(f'{token_file}.tmp', 'w') as file:
             json.dump(token_data, file)
+        os.replace(f'{token_file}.tmp', token_file)
+
+    def is_token_fresh(self, token_data):
+        """True if the token exists and does not expire within the refresh margin."""
+        if not token_data or 'expires_at' not in token_data:
+            return False
+        expires_at = datetime.strptime(token_data['expires_at'], TOKEN_TIME_FORMAT)
+        return expires_at - timedelta(seconds=self.refresh_margin) > datetime.now()
 
     def get_cc_token(self):
         """Get Climate Connect token. Generate new token if expired or not available."""
-        if not self.cc_token:
-            api_endpoint = f"{self.cc_base_url}get-token"
+        with self._lock:
+            if not self.cc_token:
+                api_endpoint = f"{self.cc_base_url}get-token"
+                headers = {'Content-Type': 'application/json'}
+                params = {'username': self.cc_username, 'password': self.cc_password}
+                response = get_http_client().post(url=api_endpoint, headers=headers, params=params, retry=True)
+                response.raise_for_status()  # Raise an error for bad responses
+                token_data = response.json()
+                self.save_token(self.cc_token_file, token_data)
+                self.cc_token = token_data
+            return self.cc_token
+
+    def get_remc_token(self, force_refresh=False):
+        """
+        Get REMC token. Reuses the cached token until shortly before `expires_at`,
+        logs in again when it is about to expire, missing, or `force_refresh` is set
+        (e.g. after the API rejected it).
+        """
+        with self._lock:
+            if not force_refresh and self.is_token_fresh(self.remc_token):
+                return self.remc_token
+            api_endpoint = f"{self.remc_base_url}get-token"
             headers = {'Content-Type': 'application/json'}
-            params = {'username': self.cc_username, 'password': self.cc_password}
-            response = requests.post(url=api_endpoint, headers=headers, params=params)
+            params = {'email': self.remc_email, 'password': self.remc_password}
+            response = get_http_client().post(url=api_endpoint, headers=headers, params=params, retry=True)
             response.raise_for_status()  # Raise an error for bad responses
             token_data = response.json()
-            self.save_token(self.cc_token_file, token_data)
-            self.cc_token = token_data
-        return self.cc_token
-
-    def get_remc_token(self):
-        """Get REMC token. Generate new token if expired or not available."""
-        #if not self.remc_token or datetime.strptime(self.remc_token['expires_at'], '%Y-%m-%dT%H:%M:%S') <= datetime.now():
-        api_endpoint = f"{self.remc_base_url}get-token"
-        headers = {'Content-Type': 'application/json'}
-        params = {'email': self.remc_email, 'password': self.remc_password}
-        response = requests.post(url=api_endpoint, headers=headers, params=params)
-        response.raise_for_status()  # Raise an error for bad responses
-        token_data = response.json()
-        token_data['expires_at'] = (datetime.now() + timedelta(seconds=token_data['expires_in'])).strftime('%Y-%m-%dT%H:%M:%S')
-        self.save_token(self.remc_token_file, token_data)
-        self.remc_token = token_data
-        return self.remc_token
+            token_data['expires_at'] = (datetime.now() + timedelta(seconds=token_data['expires_in'])).strftime(TOKEN_TIME_FORMAT)
+            self.save_token(self.remc_token_file, token_data)
+            self.remc_token = token_data
+            return self.remc_token
 
     def get_plants(self, token_remc):
         """Get plants details using REMC token."""
@@ -72,7 +121,7 @@ class APIClient:
         api_endpoint = f"{self.remc_base_url}getPlant"
         headers = {'Content-Type': 'application/json'}
         params = {'token': token_remc['access_token']}
-        response = requests.post(url=api_endpoint, headers=headers, params=params)
+        response = get_http_client().post(url=api_endpoint, headers=headers, params=params, retry=True)
         response.raise_for_status()  # Raise an error for bad responses
         return response.json()
     
@@ -85,9 +134,20 @@ class APIClient:
         # if not self.remc_token:
         #     raise ValueError("REMC token is not set. Call get_remc_token() first.")
         
-        plants = self.get_plants(self.remc_token)
+        plants = self.get_plants(self.get_remc_token())
             
         plant_details = pd.DataFrame(plants['data'].values())
         return plant_details
 
-    
+
+_api_client = None
+_api_client_lock = threading.Lock()
+
+
+def get_api_client():
+    """Return the process-wide APIClient, created on first use."""
+    global _api_client
+    with _api_client_lock:
+        if _api_client is None:
+            _api_client = APIClient()
+        return _api_client
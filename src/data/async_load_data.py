@@ -0,0 +1,198 @@
+import os
+import asyncio
+import time
+import pandas as pd
+from urllib.parse import urlparse
+
+from src.data.load_data import DataPrep, AUTH_FAILURE_CODES
+from src.data.fetch_planner import plan_date_ranges, expand_range, uncovered_dates
+from src.data.schema import to_raw
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    def __init__(self, rate):
+        """
+        Initialize RateLimiter.
+
+        Args:
+            rate (float): Max request starts per second, 0/None disables limiting.
+        """
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        """Wait until the next request slot is free."""
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class AsyncDataPrep:
+    def __init__(self, token, max_concurrency=None, rate_limit=None, timeout=None, max_retries=None, backoff_factor=None):
+        """
+        Async alternative to DataPrep.update_solar_data_for_plants.
+
+        All plant x date-range requests go through one task queue drained by a fixed
+        number of workers, so the number of requests in flight against the
+        REMC server is bounded globally instead of per plant.
+
+        Args:
+            token (dict): REMC token, as returned by APIClient.get_remc_token.
+            max_concurrency (int): Global limit of in-flight requests.
+            rate_limit (float): Max requests started per second per host.
+            timeout (float): Per-request timeout in seconds.
+            max_retries (int): Retries on 5xx/429 or connection errors.
+            backoff_factor (float): Base retry delay in seconds, doubled every retry.
+        """
+        self.prep = DataPrep(token)
+        self.remc_base_url = self.prep.remc_base_url
+        self.max_concurrency = int(max_concurrency or os.getenv('ingest_max_concurrency', 16))
+        self.rate_limit = float(rate_limit if rate_limit is not None else os.getenv('ingest_rate_limit', 20))
+        self.timeout = float(timeout or os.getenv('http_timeout', 30))
+        self.max_retries = int(max_retries if max_retries is not None else os.getenv('http_max_retries', 3))
+        self.backoff_factor = float(backoff_factor if backoff_factor is not None else os.getenv('http_backoff_factor', 0.5))
+        self.stats = {'requests': 0, 'retries': 0, 'errors': 0}
+
+    def update_solar_data_for_plants(self, plant_list):
+        """Fetch and save new data for all plants. Drop-in for DataPrep.update_solar_data_for_plants."""
+        try:
+            asyncio.run(self._update_plants(plant_list))
+        except Exception as e:
+            print(f"Error updating solar data for plant list: {e}")
+
+    def plan_tasks(self, plant_list):
+        """
+        Build the plant x date-range task list.
+
+        Returns:
+        - tasks: list of (plant_id, from_date, to_date) tuples
+        - plants: dict, plant ID -> dates to fetch, for plants that have something to fetch
+        """
+        tasks, plants = [], {}
+        for plant_id in plant_list:
+            try:
+                dates = self.prep.get_fetch_dates(plant_id)
+            except Exception as e:
+                print(f"Error planning fetch for plant-id {plant_id}: {e}")
+                continue
+            if not dates:
+                continue
+            plants[plant_id] = dates
+            tasks.extend((plant_id, from_date, to_date) for from_date, to_date in plan_date_ranges(dates))
+        return tasks, plants
+
+    def _request_for(self, plant_id, from_date, to_date):
+        """Return (endpoint, method, params) of the API call serving a task."""
+        if plant_id == 'aggregated':
+            params = {'from_date': from_date, 'to_date': to_date, 'type': 'Solar'}
+            return 'getActualAggregateAvg', 'GET', params
+        if from_date == to_date:
+            params = {'date': from_date, 'plant_id': str(plant_id)}
+        else:
+            params = {'from_date': from_date, 'to_date': to_date, 'plant_id': str(plant_id)}
+        return 'getActual', 'POST', params
+
+    async def _update_plants(self, plant_list):
+        import aiohttp
+
+        tasks, plants = self.plan_tasks(plant_list)
+        if not tasks:
+            return
+
+        queue = asyncio.Queue()
+        for task in tasks:
+            queue.put_nowait(task)
+
+        results = {plant_id: [] for plant_id in plants}
+        limiters = {}
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            workers = [
+                asyncio.create_task(self._worker(session, queue, results, limiters))
+                for _ in range(min(self.max_concurrency, len(tasks)))
+            ]
+            await queue.join()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        for plant_id, frames in results.items():
+            await asyncio.to_thread(self._save_plant, plant_id, frames, plants[plant_id])
+
+    async def _worker(self, session, queue, results, limiters):
+        while True:
+            plant_id, from_date, to_date = await queue.get()
+            try:
+                endpoint, method, params = self._request_for(plant_id, from_date, to_date)
+                data = await self._fetch_json(session, limiters, method, f'{self.remc_base_url}{endpoint}', params)
+                if 'data' not in data:
+                    raise ValueError(f"no data in response: {data}")
+                frame = to_raw(pd.DataFrame(data['data']))
+                results[plant_id].append(frame)
+                if from_date != to_date:
+                    # Days the range response did not cover go back on the queue as single days
+                    missing = uncovered_dates(frame, from_date, to_date)
+                    if missing:
+                        print(f"Range fetch for plant-id {plant_id} from {from_date} to {to_date} did not cover {len(missing)} day(s). Falling back to per-day requests...")
+                    for date in missing:
+                        queue.put_nowait((plant_id, date, date))
+            except Exception as e:
+                if from_date != to_date:
+                    # Split a failed range into single days and put them back on the queue
+                    print(f"Range fetch failed for plant-id {plant_id} from {from_date} to {to_date}: {e}. Falling back to per-day requests...")
+                    for date in expand_range(from_date, to_date):
+                        queue.put_nowait((plant_id, date, date))
+                else:
+                    self.stats['errors'] += 1
+                    print(f"Error fetching data for plant-id {plant_id} on date {from_date}: {e}")
+            finally:
+                queue.task_done()
+
+    async def _fetch_json(self, session, limiters, method, url, params):
+        import aiohttp
+
+        host = urlparse(url).netloc
+        if host not in limiters:
+            limiters[host] = RateLimiter(self.rate_limit)
+
+        attempt = 0
+        token_refreshed = False
+        while True:
+            await limiters[host].wait()
+            self.stats['requests'] += 1
+            self.stats['retries'] += int(attempt > 0)
+            token = self.prep.token_access
+            try:
+                async with session.request(method, url, params={'token': token, **params}, headers={'Content-Type': 'application/json'}) as response:
+                    if response.status in AUTH_FAILURE_CODES and not token_refreshed:
+                        # token expired mid-run: refresh once and retry straight away
+                        await asyncio.to_thread(self.prep.refresh_token, token)
+                        token_refreshed = True
+                        continue
+                    if response.status not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                        # an error status on the last attempt is a failed fetch, not a body to parse
+                        response.raise_for_status()
+                        return await response.json(content_type=None)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt >= self.max_retries:
+                    raise
+            await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+            attempt += 1
+
+    def _save_plant(self, plant_id, frames, dates):
+        try:
+            frames = [frame for frame in frames if not frame.empty]
+            new_data = pd.concat(frames, ignore_index=True).sort_values(by='utc_datetime') if frames else pd.DataFrame()
+            print(f'Data fetched for plant-id: {plant_id}')
+            self.prep.save_solar_data(plant_id, new_data, dates)
+        except Exception as e:
+            print(f"Error updating solar data for plant-id {plant_id}: {e}")
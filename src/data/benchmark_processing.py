@@ -0,0 +1,39 @@
+# %%
+"""
+Scaling benchmark of per-plant processing over executor backends and 1..N cores.
+
+Uses the plants already present in the raw store and rewrites their processed data.
+Run: python -m src.data.benchmark_processing [max_workers]
+"""
+import os, sys
+import time
+
+from src.data.process_data import DataProcessor
+from src.data.store import raw_store
+
+# %%
+if __name__ == '__main__':
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+    plant_ids = [
+        d.split('=', 1)[1] for d in sorted(os.listdir(raw_store.root)) if d.startswith('plant=')
+    ] if os.path.exists(raw_store.root) else []
+    if not plant_ids:
+        sys.exit('No plants in the raw store. Run ingest_data.py first.')
+
+    processor = DataProcessor()
+    start = time.perf_counter()
+    processor.process_multiple_plants(plant_ids, backend='serial')
+    serial_time = time.perf_counter() - start
+
+    results = []
+    for backend in ('threads', 'processes'):
+        workers = 1
+        while workers <= max_workers:
+            start = time.perf_counter()
+            processor.process_multiple_plants(plant_ids, backend=backend, max_workers=workers)
+            results.append((backend, workers, time.perf_counter() - start))
+            workers *= 2
+
+    print(f'Plants: {len(plant_ids)}, serial: {serial_time:.2f} s')
+    for backend, workers, elapsed in results:
+        print(f'{backend:10s} workers={workers:3d}: {elapsed:8.2f} s  speedup {serial_time / elapsed:5.2f}x')
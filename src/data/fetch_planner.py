@@ -0,0 +1,66 @@
+import os
+import pandas as pd
+
+# Max number of days requested in a single range call
+DEFAULT_CHUNK_DAYS = 31
+
+
+def get_chunk_days():
+    """Chunk length in days, overridable through the `fetch_chunk_days` env variable."""
+    return int(os.getenv('fetch_chunk_days', DEFAULT_CHUNK_DAYS))
+
+
+def plan_date_ranges(dates, chunk_days=None):
+    """
+    Coalesce dates into contiguous (from_date, to_date) ranges of at most `chunk_days` days.
+
+    Adjacent dates are merged into one range, a gap in `dates` starts a new range,
+    and long runs are split so no single request spans more than `chunk_days`.
+
+    Parameters:
+    - dates: iterable of dates/strings, days that have to be fetched
+    - chunk_days: int, maximum length of a range in days (defaults to get_chunk_days())
+
+    Returns:
+    - ranges: list of (from_date, to_date) string tuples ('%Y-%m-%d'), inclusive
+    """
+    chunk_days = chunk_days or get_chunk_days()
+    dates = pd.DatetimeIndex(pd.to_datetime(list(dates))).normalize().unique().sort_values()
+    if dates.empty:
+        return []
+
+    ranges = []
+    run_start = run_end = dates[0]
+    for date in dates[1:]:
+        # Extend the current range while days are adjacent and the chunk is not full
+        if date - run_end == pd.Timedelta(days=1) and (date - run_start).days < chunk_days:
+            run_end = date
+        else:
+            ranges.append((run_start.strftime('%Y-%m-%d'), run_end.strftime('%Y-%m-%d')))
+            run_start = run_end = date
+    ranges.append((run_start.strftime('%Y-%m-%d'), run_end.strftime('%Y-%m-%d')))
+    return ranges
+
+
+def plan_window(start_date, end_date, chunk_days=None):
+    """Split the inclusive window [start_date, end_date] into ranges of at most `chunk_days` days."""
+    return plan_date_ranges(pd.date_range(start_date, end_date), chunk_days)
+
+
+def expand_range(from_date, to_date):
+    """Return the single dates ('%Y-%m-%d') of an inclusive range, used for per-day fallback."""
+    return list(pd.date_range(from_date, to_date).strftime('%Y-%m-%d'))
+
+
+def uncovered_dates(df, from_date, to_date):
+    """
+    Return the dates of an inclusive range for which `df` (raw API rows) holds no row.
+
+    A range response is only trusted for the days it actually covers: a server that
+    ignores the range parameters may return a single day or nothing at all.
+    """
+    dates = expand_range(from_date, to_date)
+    if df is None or df.empty:
+        return dates
+    covered = set(pd.to_datetime(df['utc_datetime']).dt.strftime('%Y-%m-%d'))
+    return [date for date in dates if date not in covered]
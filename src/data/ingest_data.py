@@ -12,22 +12,19 @@ sys.path.append(PROJECT_PATH)
 import warnings
 warnings.filterwarnings('ignore')
 
-# set timezone
-import time
-os.environ['TZ'] = 'Asia/Calcutta'
-time.tzset()
-
 # %%
 # custom modules
-from src.apis.tokens import APIClient
+from src.apis.tokens import get_api_client
 from src.data.load_data import DataPrep
 from src.data.process_data import DataProcessor
 from src.helper.support import misc
-from src.helper.paths import CONFIG_PATH
+from src.helper.settings import get_settings
+from src.apis.session import get_http_client
 
 # %%
 # instances
-apis = APIClient()
+get_settings()
+apis = get_api_client()
 clean_data = DataProcessor() 
 misc = misc()
 # %%
@@ -50,8 +47,9 @@ data = DataPrep(token_remc)
 # %%
 data.update_solar_data_for_plants(plant_ids)
 print('Data fetching done!')
+print(f'API stats: {get_http_client().get_stats()}')
 print('------------------------------------')
-clean_data.process_multiple_plants(plant_ids)
+clean_data.process_multiple_plants(plant_ids, incremental=True)
 print('Data processing done!')
 print('------------------------------------')
 # %%
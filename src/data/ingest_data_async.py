@@ -0,0 +1,57 @@
+# %%
+import os, sys
+import pandas as pd
+# Load environment variables
+from dotenv import load_dotenv
+load_dotenv()
+
+PROJECT_PATH = os.getenv('PROJECT_DIR')
+sys.path.append(PROJECT_PATH)
+
+# ignore warnings
+import warnings
+warnings.filterwarnings('ignore')
+
+# %%
+# custom modules
+from src.apis.tokens import get_api_client
+from src.data.async_load_data import AsyncDataPrep
+from src.data.process_data import DataProcessor
+from src.helper.support import misc
+from src.helper.settings import get_settings
+
+# %%
+# instances
+get_settings()
+apis = get_api_client()
+clean_data = DataProcessor() 
+misc = misc()
+# %%
+print('Script for fetching data (async) running...')
+
+token_remc = apis.get_remc_token()
+print('Token fetched successfully!')
+
+plant_ids = misc.get_solar_plant_ids()
+plant_ids.append('aggregated')
+
+# plant_ids = [
+            #  42, 46, 52, 57, 59, 71, 79, 93, 94, 115, 116, 187, 198, 243, 249
+            #  ]
+
+print(f'Fetching data for plant-ids: {plant_ids}')
+# # %%
+data = AsyncDataPrep(token_remc)
+
+# %%
+data.update_solar_data_for_plants(plant_ids)
+print('Data fetching done!')
+print(f'API stats: {data.stats}')
+print('------------------------------------')
+clean_data.process_multiple_plants(plant_ids, incremental=True)
+print('Data processing done!')
+print('------------------------------------')
+# %%
+
+
+
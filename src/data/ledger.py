@@ -0,0 +1,171 @@
+import os
+import json
+import threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from src.helper import paths
+from src.helper.settings import get_settings
+
+BLOCKS_PER_DAY = 96
+
+# Ledger statuses of a fetched day
+COMPLETE = 'complete'
+PARTIAL = 'partial'
+FAILED = 'failed'
+
+
+def local_today():
+    """Today's date ('%Y-%m-%d') on the plant-local clock (the timezone set by get_settings)."""
+    get_settings()
+    return pd.Timestamp.now().strftime('%Y-%m-%d')
+
+
+class FetchLedger:
+    def __init__(self, root=None, max_attempts=None):
+        """
+        Per-plant, per-date record of what has been fetched from the REMC API.
+
+        Each plant has a JSON file {root}/plant={plant_id}/_ledger.json mapping a date
+        ('%Y-%m-%d') to its fetch status, row count, number of 15-minute blocks covered
+        and number of attempts. A day with all 96 blocks covered is complete and is never
+        requested again; partial and failed days are re-requested on the next run.
+
+        Args:
+            root (str): Root directory of the ledger files, defaults to the raw store path.
+            max_attempts (int): Attempts after which a past day that is still incomplete is
+                no longer re-requested by regular runs (gap repair still retries it),
+                defaults to the `fetch_max_attempts` env variable or 3.
+        """
+        self._root = root
+        self.max_attempts = int(max_attempts or os.getenv('fetch_max_attempts', 3))
+        self._lock = threading.Lock()
+
+    @property
+    def root(self):
+        return self._root or paths.RAW_STORE_PATH
+
+    def _file_path(self, plant_id):
+        return os.path.join(self.root, f'plant={plant_id}', '_ledger.json')
+
+    def load(self, plant_id):
+        """Return the ledger of a plant as {date: entry}, empty if nothing was recorded yet."""
+        file_path = self._file_path(plant_id)
+        if not os.path.exists(file_path):
+            return {}
+        with open(file_path, 'r') as file:
+            return json.load(file)
+
+    def _save(self, plant_id, ledger):
+        file_path = self._file_path(plant_id)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(f'{file_path}.tmp', 'w') as file:
+            json.dump(dict(sorted(ledger.items())), file)
+        os.replace(f'{file_path}.tmp', file_path)
+
+    def first_date(self, plant_id):
+        """Return the earliest date recorded for a plant, or None."""
+        ledger = self.load(plant_id)
+        return min(ledger) if ledger else None
+
+    def pending_dates(self, plant_id, dates, force=False):
+        """
+        Filter `dates` down to the days that still have to be fetched.
+
+        A day is pending if it was never fetched, or is partial/failed and either is
+        today or yesterday, has been attempted fewer than `max_attempts` times, or `force` is set.
+
+        Parameters:
+        - plant_id: int or 'aggregated', plant ID
+        - dates: iterable of dates/strings
+        - force: bool, ignore the attempts limit (used by gap repair)
+
+        Returns:
+        - pending: list of dates ('%Y-%m-%d')
+        """
+        ledger = self.load(plant_id)
+        recent = (pd.Timestamp(local_today()) - pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+        pending = []
+        for date in pd.to_datetime(list(dates)).strftime('%Y-%m-%d'):
+            entry = ledger.get(date)
+            if entry is None:
+                pending.append(date)
+            elif entry['status'] != COMPLETE and (force or date >= recent or entry['attempts'] < self.max_attempts):
+                pending.append(date)
+        return pending
+
+    def completeness(self, df, dates):
+        """
+        Count rows and covered 15-minute blocks per day of raw API rows.
+
+        A block is covered when a row came back for it, with or without a generation
+        value, since the API returns night blocks as nulls. On days before today (on the
+        plant-local clock, as in pending_dates), the blocks before the first and after the
+        last block with positive generation are night blocks and are covered too, since
+        the API may also omit them.
+
+        Returns:
+        - counts: dict, date -> (rows, blocks) for every date in `dates`
+        """
+        counts = {date: (0, 0) for date in pd.to_datetime(list(dates)).strftime('%Y-%m-%d')}
+        if df is None or df.empty:
+            return counts
+        utc_datetime = pd.to_datetime(df['utc_datetime'])
+        day = utc_datetime.dt.strftime('%Y-%m-%d').to_numpy()
+        block = (utc_datetime.dt.hour * 4 + utc_datetime.dt.minute // 15).to_numpy()
+        producing = (df['generation'] > 0).to_numpy() if 'generation' in df.columns else np.ones(len(df), dtype=bool)
+        today = local_today()
+        for date in counts:
+            positions = np.flatnonzero(day == date)
+            if not len(positions):
+                continue
+            covered = np.zeros(BLOCKS_PER_DAY, dtype=bool)
+            covered[block[positions]] = True
+            daylight = block[positions][producing[positions]]
+            if date < today and len(daylight):
+                covered[:daylight.min()] = True
+                covered[daylight.max() + 1:] = True
+            counts[date] = (len(positions), int(covered.sum()))
+        return counts
+
+    def record(self, plant_id, df, dates, count_attempt=True):
+        """
+        Record the outcome of fetching `dates` for a plant from the rows that came back.
+
+        Parameters:
+        - plant_id: int or 'aggregated', plant ID
+        - df: DataFrame or None, raw rows returned for the dates
+        - dates: iterable of dates/strings that were requested
+        - count_attempt: bool, whether this counts as a fetch attempt
+
+        Returns:
+        - entries: dict, date -> ledger entry written
+        """
+        counts = self.completeness(df, dates)
+        fetched_at = datetime.now().strftime('%Y-%m-%dT%H:%M:%S')
+        with self._lock:
+            ledger = self.load(plant_id)
+            entries = {}
+            for date, (rows, blocks) in counts.items():
+                attempts = ledger.get(date, {}).get('attempts', 0) + int(count_attempt)
+                if blocks >= BLOCKS_PER_DAY:
+                    status = COMPLETE
+                elif rows > 0:
+                    status = PARTIAL
+                else:
+                    status = FAILED
+                entries[date] = {'status': status, 'rows': rows, 'blocks': blocks,
+                                 'attempts': attempts, 'fetched_at': fetched_at}
+            ledger.update(entries)
+            self._save(plant_id, ledger)
+        return entries
+
+    def summary(self, plant_id):
+        """Return the ledger of a plant as a DataFrame indexed by date."""
+        ledger = self.load(plant_id)
+        columns = ['status', 'rows', 'blocks', 'attempts', 'fetched_at']
+        return pd.DataFrame.from_dict(ledger, orient='index', columns=columns).rename_axis('date')
+
+
+fetch_ledger = FetchLedger()
@@ -1,67 +1,146 @@
 import os
-import requests
 import pandas as pd
-from dotenv import load_dotenv
 from datetime import datetime, timedelta
 import numpy as np
 from concurrent.futures import ThreadPoolExecutor
 from functools import partial
+import threading
 
-# set timezone
-import time
-os.environ['TZ'] = 'Asia/Calcutta'
-time.tzset()
-
-# Load environment variables from a .env file if present
-load_dotenv()
-
-from src.helper.paths import RAW_DATA_PATH
-from src.apis.tokens import APIClient
+from src.helper import paths
+from src.helper.settings import get_settings
+from src.apis.tokens import get_api_client
+from src.apis.session import get_http_client
 from src.helper.utils import save_pickle
+from src.data.store import raw_store
+from src.data.fetch_planner import plan_date_ranges, expand_range, uncovered_dates
+from src.data.ledger import fetch_ledger
+from src.data.schema import to_raw
 
-apis = APIClient()
+# Status codes meaning the REMC token was rejected
+AUTH_FAILURE_CODES = {401, 403}
 
 class DataPrep:
     def __init__(self, token):
+        get_settings()
         self.remc_base_url = os.getenv('remc_base_url')
         self.token_access = token['access_token']
+        self._token_lock = threading.Lock()
+
+    def refresh_token(self, rejected_token):
+        """
+        Replace a rejected token with a fresh one. Concurrent callers that saw the
+        same rejected token trigger a single login.
+        """
+        with self._token_lock:
+            if self.token_access == rejected_token:
+                print('REMC token rejected. Refreshing token...')
+                self.token_access = get_api_client().get_remc_token(force_refresh=True)['access_token']
+            return self.token_access
+
+    def call_api(self, method, endpoint, params):
+        """
+        Call a REMC endpoint with the current token and return the JSON response.
+        On an auth failure the token is refreshed and the call retried once. The
+        actuals endpoints only read data, so transient failures are retried for POST too.
+        """
+        api_endpoint = f'{self.remc_base_url}{endpoint}'
+        headers = {'Content-Type': 'application/json'}
+        token = self.token_access
+        response = get_http_client().request(method, api_endpoint, headers=headers, params={'token': token, **params},
+                                             retry=True)
+        if response.status_code in AUTH_FAILURE_CODES:
+            token = self.refresh_token(token)
+            response = get_http_client().request(method, api_endpoint, headers=headers,
+                                                 params={'token': token, **params}, retry=True)
+        return response.json()
         
     def get_solar_data(self, plant_id, start_date, prediction_date):
+        return self.get_solar_data_for_dates(plant_id, expand_range(start_date, prediction_date))
+
+    def get_solar_data_for_dates(self, plant_id, dates):
+        """
+        Fetch raw actuals of a plant for a set of (not necessarily contiguous) dates.
+
+        Returns:
+        - df: DataFrame sorted by utc_datetime, or None on error
+        """
         try:
+            # Request the dates as a few date ranges instead of one call per day
+            ranges = plan_date_ranges(dates)
             if plant_id == 'aggregated':
-                df = pd.DataFrame(self.get_actual_aggregated_avg(start_date, prediction_date)['data'])
-                df = df.sort_values(by='utc_datetime')
-                # save_pickle(df, RAW_DATA_PATH, f'solar_plant_{plant_id}')
-                return df
+                fetch_func = self.fetch_aggregated_for_range
             else:
-                dates = pd.date_range(start_date, prediction_date).date
-
-                fetch_func = partial(self.fetch_data_for_date, plant_id)
-                with ThreadPoolExecutor() as executor:
-                    df_list = list(executor.map(fetch_func, dates))
+                fetch_func = partial(self.fetch_data_for_range, plant_id)
+            with ThreadPoolExecutor() as executor:
+                df_list = list(executor.map(lambda r: fetch_func(*r), ranges))
 
-                df = pd.concat(df_list, ignore_index=True)
-                df = df.sort_values(by='utc_datetime')
-                print(f'Data fetched for plant-id: {plant_id}')
-                return df
+            df = pd.concat(df_list, ignore_index=True)
+            df = df.sort_values(by='utc_datetime')
+            print(f'Data fetched for plant-id: {plant_id} in {len(ranges)} request(s)')
+            return df
         except Exception as e:
             print(f"Error fetching solar data for plant-id {plant_id}: {e}")
             return None
 
+    def fetch_data_for_range(self, plant_id, from_date, to_date):
+        """
+        Fetch actuals of a plant for an inclusive date range. Days the range
+        response does not cover (or all days, if the range request fails) are
+        fetched with one request per day.
+
+        Parameters:
+        - plant_id: int, plant ID
+        - from_date: str, first date of the range ('%Y-%m-%d')
+        - to_date: str, last date of the range ('%Y-%m-%d')
+
+        Returns:
+        - data: DataFrame, raw actuals for the range (empty if nothing could be fetched)
+        """
+        if from_date == to_date:
+            return self.fetch_data_for_date(plant_id, from_date)
+        response = self.get_solar_actual_range(plant_id, from_date, to_date)
+        data = to_raw(pd.DataFrame(response['data'])) if 'data' in response else to_raw(None)
+        missing = uncovered_dates(data, from_date, to_date)
+        if missing:
+            print(f"Range fetch for plant-id {plant_id} from {from_date} to {to_date} did not cover {len(missing)} day(s). Falling back to per-day requests...")
+            data = pd.concat([data] + [self.fetch_data_for_date(plant_id, date) for date in missing], ignore_index=True)
+        return data
+
+    def fetch_aggregated_for_range(self, from_date, to_date):
+        """Fetch aggregated actuals for an inclusive date range, fetching the days the response does not cover one by one."""
+        response = self.get_actual_aggregated_avg(from_date, to_date)
+        data = to_raw(pd.DataFrame(response['data'])) if 'data' in response else to_raw(None)
+        missing = uncovered_dates(data, from_date, to_date) if from_date != to_date else []
+        if missing:
+            print(f"Range fetch for aggregated data from {from_date} to {to_date} did not cover {len(missing)} day(s). Falling back to per-day requests...")
+            data = pd.concat(
+                [data] + [to_raw(pd.DataFrame(self.get_actual_aggregated_avg(date, date).get('data', []))) for date in missing],
+                ignore_index=True
+            )
+        return data
+
     def fetch_data_for_date(self, plant_id, date):
         try:
-            data = pd.DataFrame(self.get_solar_actual(plant_id, date)['data'])
+            # keep only the columns used downstream, with compact dtypes
+            data = to_raw(pd.DataFrame(self.get_solar_actual(plant_id, date)['data']))
             return data
         except Exception as e:
             print(f"Error fetching data for plant-id {plant_id} on date {date}: {e}")
-            return pd.DataFrame()  # Return an empty DataFrame in case of error
+            return to_raw(None)  # Return an empty DataFrame in case of error
+
+    def get_solar_actual_range(self, plant_id, from_date, to_date):
+        try:
+            params = {'from_date': from_date, 'to_date': to_date, 'plant_id': plant_id}
+            r = self.call_api('POST', 'getActual', params)
+            return r
+        except Exception as e:
+            print(f"Error in get_solar_actual_range for plant-id {plant_id} from {from_date} to {to_date}: {e}")
+            return {}
 
     def get_solar_actual(self, plant_id, date):
         try:
-            headers = {'Content-Type': 'application/json'}
-            api_endpoint = f'{self.remc_base_url}getActual'
-            params = {'token': self.token_access, 'date': date, 'plant_id': plant_id}
-            r = requests.post(url=api_endpoint, headers=headers, params=params).json()
+            params = {'date': date, 'plant_id': plant_id}
+            r = self.call_api('POST', 'getActual', params)
             return r
         except Exception as e:
             print(f"Error in get_solar_actual for plant-id {plant_id} on date {date}: {e}")
@@ -69,9 +148,8 @@ class DataPrep:
 
     def get_actual_aggregated_avg(self, from_date, to_date):
         try:
-            api_endpoint = f"{self.remc_base_url}getActualAggregateAvg"
-            params = {'token': self.token_access, 'from_date': from_date, 'to_date': to_date, 'type': 'Solar'}
-            response = requests.get(url=api_endpoint, headers={'Content-Type': 'application/json'}, params=params).json()
+            params = {'from_date': from_date, 'to_date': to_date, 'type': 'Solar'}
+            response = self.call_api('GET', 'getActualAggregateAvg', params)
             return response
         except Exception as e:
             print(f"Error in get_actual_aggregated_avg from {from_date} to {to_date}: {e}")
@@ -85,37 +163,102 @@ class DataPrep:
         except Exception as e:
             print(f"Error fetching solar data for plant list: {e}")
             
+    def get_fetch_dates(self, plant_id):
+        """
+        Determine the dates that still have to be fetched for a plant.
+
+        Dates from the first day in the fetch ledger (or the last stored day when the
+        plant has no ledger yet) up to today are checked against the ledger, so only
+        days that were never fetched, or came back failed or incomplete, are requested.
+
+        Parameters:
+        - plant_id: int or 'aggregated', plant ID
+
+        Returns:
+        - dates: list of dates to fetch ('%Y-%m-%d'), empty if up-to-date
+        """
+        end_date = datetime.now().date()
+        # migrate the legacy whole-history pickle on first use of the store
+        raw_store.import_pickle(plant_id, os.path.join(paths.RAW_DATA_PATH, f'solar_plant_{plant_id}'))
+        start_date = fetch_ledger.first_date(plant_id)
+        if start_date is None:
+            last_datetime = raw_store.last_timestamp(plant_id)
+            if last_datetime is None:
+                print(f"No existing data found for plant-id: {plant_id}. Fetching the plants data from 2024-01-01 onwards.")
+                start_date = '2024-01-01'  # Adjust start date as needed
+            else:
+                start_date = last_datetime.date()
+
+        dates = fetch_ledger.pending_dates(plant_id, pd.date_range(start_date, end_date))
+        if not dates:
+            print(f"No new data to fetch. Last date in the dataset is up-to-date for plant-id: {plant_id}")
+        else:
+            print(f"Fetching {len(dates)} day(s) of data for plant-id {plant_id} from {dates[0]} to {dates[-1]}")
+        return dates
+
+    def save_solar_data(self, plant_id, new_data, dates=None):
+        """
+        Append newly fetched rows to the raw store of a plant. Only the months
+        touched by `new_data` get a new part file, the history is not rewritten.
+
+        Parameters:
+        - plant_id: int or 'aggregated', plant ID
+        - new_data: DataFrame or None, newly fetched raw data
+        - dates: list or None, requested dates to record in the fetch ledger
+        """
+        if new_data is not None and not new_data.empty:
+            new_data = to_raw(new_data)
+            raw_store.append(plant_id, new_data)
+            print(f"Data updated and saved for plant-id: {plant_id}")
+        else:
+            print(f"No new data to update for plant-id: {plant_id}")
+        if dates:
+            fetch_ledger.record(plant_id, new_data, dates)
+
     def update_solar_data(self, plant_id):
         try:
-            file_path = os.path.join(RAW_DATA_PATH, f'solar_plant_{plant_id}')
-            if os.path.exists(file_path):
-                df_existing = pd.read_pickle(file_path)
-                df_existing['utc_datetime'] = pd.to_datetime(df_existing['utc_datetime'])
-                last_date = df_existing['utc_datetime'].max().date()
-                start_date = last_date + timedelta(days=0)
-                end_date = datetime.now().date()
-                
-                if start_date <= end_date:
-                    print(f"Fetching data for plant-id {plant_id} from {start_date} to {end_date}")
-                    new_data = self.get_solar_data(plant_id, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
-                    if new_data is not None and not new_data.empty:
-                        new_data['utc_datetime'] = pd.to_datetime(new_data['utc_datetime'])
-                        df_updated = pd.concat([df_existing, new_data], ignore_index=True)
-                        df_updated = df_updated.drop_duplicates(subset='utc_datetime')
-                        df_updated = df_updated.sort_values(by='utc_datetime')
-                        save_pickle(df_updated, RAW_DATA_PATH, f'solar_plant_{plant_id}')
-                        print(f"Data updated and saved for plant-id: {plant_id}")
-                    else:
-                        print(f"No new data to update for plant-id: {plant_id}")
-                else:
-                    print(f"No new data to fetch. Last date in the dataset is up-to-date for plant-id: {plant_id}")
-            else:
-                print(f"No existing data found for plant-id: {plant_id}. Fetching the plants data from 2024-01-01 onwards.")
-                df = self.get_solar_data(plant_id, '2024-01-01', datetime.now().strftime('%Y-%m-%d'))  # Adjust start date as needed
-                save_pickle(df, RAW_DATA_PATH, f'solar_plant_{plant_id}')
-                print(f"Data updated and saved for plant-id: {plant_id}") 
+            dates = self.get_fetch_dates(plant_id)
+            if dates:
+                new_data = self.get_solar_data_for_dates(plant_id, dates)
+                self.save_solar_data(plant_id, new_data, dates)
         except Exception as e:
             print(f"Error updating solar data for plant-id {plant_id}: {e}")
+
+    def repair_gaps(self, plant_id, start_date, end_date):
+        """
+        Backfill missing or incomplete days of a plant within [start_date, end_date].
+
+        Days are first checked against what is already stored, so history fetched
+        before the ledger existed is not requested again. Only the days that are still
+        incomplete are fetched; their rows are appended to the store, existing
+        partitions are not rewritten.
+
+        Parameters:
+        - plant_id: int or 'aggregated', plant ID
+        - start_date: str, first date to check ('%Y-%m-%d')
+        - end_date: str, last date to check ('%Y-%m-%d')
+
+        Returns:
+        - repaired: list of dates that were fetched
+        """
+        dates = expand_range(start_date, end_date)
+        try:
+            stored = raw_store.read(plant_id, start=start_date, end=pd.Timestamp(end_date) + timedelta(days=1))
+        except FileNotFoundError:
+            stored = None
+        ledger = fetch_ledger.load(plant_id)
+        unknown = [date for date in dates if date not in ledger]
+        if unknown:
+            fetch_ledger.record(plant_id, stored, unknown, count_attempt=False)
+
+        missing = fetch_ledger.pending_dates(plant_id, dates, force=True)
+        if not missing:
+            print(f"No gaps found for plant-id {plant_id} from {start_date} to {end_date}")
+            return []
+        print(f"Repairing {len(missing)} day(s) for plant-id {plant_id}: {', '.join(missing)}")
+        new_data = self.get_solar_data_for_dates(plant_id, missing)
+        self.save_solar_data(plant_id, new_data, missing)
+        return missing
             
     
     def update_solar_data_for_plants(self, plant_list):
@@ -1,46 +1,109 @@
 import numpy as np
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
-import pickle
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from dotenv import load_dotenv
 
-# Load environment variables from a .env file if present
-load_dotenv()
-
-from src.helper.paths import PROCESSED_DATA_PATH, RAW_DATA_PATH, CONFIG_PATH
-from src.helper.utils import load_pickle, save_pickle
+from src.helper.settings import get_settings
 from src.helper.support import misc
-from src.apis.tokens import APIClient
-
-apis = APIClient()
+from src.data.store import raw_store, processed_store
+from src.data.schema import to_processed
+from src.features.time_features import time_block
+from src.features.sun_blocks import get_sun_block_estimator
+from src.helper.executors import run_parallel
 
 class DataProcessor:
     def __init__(self):
-        pass
+        get_settings()
     
-    def process_raw_data(self, plant_id):
+    def process_raw_data(self, plant_id, start_date=None, end_date=None):
         """
         Process raw solar data for a plant, including renaming columns, time bucket division,
         reindexing, adding time bucket column, handling sunrise/sunset blocks, and applying capacity limit.
 
         Parameters:
-        - df: DataFrame, raw solar data
+        - plant_id: int or 'aggregated', plant ID
+        - start_date: datetime-like or None, first raw timestamp to load (inclusive)
+        - end_date: datetime-like or None, last raw timestamp to load (exclusive)
 
         Returns:
-        - df_processed: DataFrame, processed solar data
+        - df_processed: DataFrame, processed solar data (datetime, float32 power, uint8 tb)
         """
-        df = load_pickle(RAW_DATA_PATH, f'solar_plant_{plant_id}')
+        return self._process(plant_id, start_date, end_date)[0]
+
+    def _process(self, plant_id, start_date=None, end_date=None):
+        """process_raw_data, also returning the masking state ({'sun_blocks', 'avc'}) that was applied."""
+        df = raw_store.read(plant_id, start=start_date, end=end_date)
         df = self.rename_columns(df)
         # df = self.time_block_division(df)
         df = self.data_reindex(df)
         df = self.add_time_block_column(df)
+        state = {}
         if plant_id != 'aggregated':
             avc = misc().get_avc(plant_id)
-            self.apply_capacity_limit(df, avc)
+            sunrise_block, sunset_block = self.apply_capacity_limit(df, avc, plant_id)
+            state = {'sun_blocks': [int(sunrise_block), int(sunset_block)], 'avc': float(avc)}
+        return to_processed(df), state
+
+    def rebuild(self, plant_id):
+        """Process the whole raw history of a plant and replace its processed store."""
+        changed_since = raw_store.changed_since(plant_id)
+        df, state = self._process(plant_id)
+        processed_store.write(plant_id, df)
+        processed_store.set_watermark(plant_id, df['datetime'].max(), **state)
+        raw_store.clear_changed(plant_id, changed_since)
         return df
-    
+
+    def process_incremental(self, plant_id, lookback_days=None, overlap_days=1):
+        """
+        Process only the raw rows that are new since the last run and append them to
+        the processed store, with the same result as a full rebuild.
+
+        The raw slice starts `lookback_days` before the watermark so that the window
+        used by get_sunrise_sunset_blocks is the same as in a full rebuild, and rows newer
+        than `watermark - overlap_days` are re-emitted so that refetched values of the
+        current day replace the earlier ones. Older raw rows appended since the last run
+        (gap repair, see raw_store.changed_since) move the start of the slice back to them.
+
+        A full rebuild masks all history with the latest sunrise/sunset blocks and AVC.
+        These are kept with the watermark, and when they differ from the ones the stored
+        rows were processed with, the plant is rebuilt instead, so the processed store
+        always equals a full rebuild. Without a watermark a full rebuild is done too.
+
+        Parameters:
+        - plant_id: int or 'aggregated', plant ID
+        - lookback_days: int or None, days of history reprocessed before the watermark
+          (defaults to the sunrise/sunset lookback plus one day)
+        - overlap_days: int, days before the watermark that are written again
+
+        Returns:
+        - df_new: DataFrame, processed rows written to the store
+        """
+        state = processed_store.get_watermark_state(plant_id)
+        if state is None:
+            return self.rebuild(plant_id)
+        watermark = pd.Timestamp(state['watermark'])
+
+        changed_since = raw_store.changed_since(plant_id)
+        emit_from = watermark - timedelta(days=overlap_days)
+        if changed_since is not None:
+            emit_from = min(emit_from, changed_since)
+        raw_last = raw_store.last_timestamp(plant_id)
+        if raw_last is None or raw_last < emit_from:
+            print(f"No new raw data to process for plant ID: {plant_id}")
+            return to_processed(None)
+
+        lookback_days = lookback_days or get_sun_block_estimator().lookback_days + 1
+        df, new_state = self._process(plant_id, start_date=min(watermark - timedelta(days=lookback_days), emit_from))
+        if any(state.get(key) != value for key, value in new_state.items()):
+            print(f"Sunrise/sunset blocks or AVC changed for plant ID: {plant_id}. Rebuilding...")
+            return self.rebuild(plant_id)
+
+        df_new = df[df['datetime'] >= emit_from]
+        processed_store.append(plant_id, df_new)
+        processed_store.set_watermark(plant_id, df['datetime'].max(), **new_state)
+        raw_store.clear_changed(plant_id, changed_since)
+        return df_new
+
     def rename_columns(self, df):
         """
         Rename columns of the DataFrame.
@@ -87,66 +150,71 @@ class DataProcessor:
         Returns:
         - df_with_tb: DataFrame, DataFrame with 'tb' column added
         """
-        df['tb'] = pd.to_datetime(df['datetime']).apply(lambda x: ((x.hour * 60 + x.minute) // 15) + 1)
+        df['tb'] = time_block(df['datetime'])
         return df
     
-    def get_sunrise_sunset_blocks(self, df):
+    def get_sunrise_sunset_blocks(self, df, plant_id=None):
         """
         Determine sunrise and sunset time bucket blocks based on the DataFrame.
 
+        Uses the most common first/last block with positive power of the complete days
+        in the estimator's lookback window (or the plant location, see sun_blocks),
+        cached per plant and day.
+
         Parameters:
         - df: DataFrame, input DataFrame containing solar data
+        - plant_id: int or None, plant ID used for the cache and location lookup
 
         Returns:
         - sunrise_block: int, time bucket block for sunrise
         - sunset_block: int, time bucket block for sunset
         """
-        temp_df = df.tail(960)
-        temp_df = temp_df[temp_df['power'] > 0].copy()
-        temp_df['tb'] = self.add_time_block_column(temp_df)['tb']
-        
-        sunrise_block = min(20, int(temp_df.groupby('datetime').min().tb.mode()[0]))
-        sunset_block = max(int(temp_df.groupby('datetime').max().tb.mode()[0]), 80)
-        # sunrise_block = int(temp_df.groupby('datetime').tb.min().mode()[0])
-        # sunset_block = int(temp_df.groupby('datetime').tb.max().mode()[0])
-        
-        return sunrise_block, sunset_block
+        return get_sun_block_estimator().estimate(df, plant_id)
     
-    def apply_capacity_limit(self, df, avc):
+    def apply_capacity_limit(self, df, avc, plant_id=None):
         """
         Apply capacity limit to the 'power' column of the DataFrame.
 
         Parameters:
         - df: DataFrame, input DataFrame with 'power' column to be processed
-        - capacity: float, maximum capacity limit
-        - sunrise_block: int, time bucket block for sunrise
-        - sunset_block: int, time bucket block for sunset
+        - avc: float, maximum capacity limit
+        - plant_id: int or None, plant ID used for the sunrise/sunset cache
 
         Returns:
-        - None (modifies df in place)
+        - sunrise_block, sunset_block: blocks used for masking (df is modified in place)
         """
-        sunrise_block, sunset_block = self.get_sunrise_sunset_blocks(df)
-        print(sunrise_block, sunset_block)
+        sunrise_block, sunset_block = self.get_sunrise_sunset_blocks(df, plant_id)
         df.loc[(df.tb < sunrise_block) | (df.tb > sunset_block), 'power'] = 0
         df.loc[df.power < 0, 'power'] = np.nan
         df.loc[df.power > avc, 'power'] = avc
+        return sunrise_block, sunset_block
     
-    def process_single_plant(self, plant_id):
+    def process_single_plant(self, plant_id, incremental=False):
         """
         Process data for a single plant. To be used with parallel processing.
 
+        The processed data is written to the processed store and only a small summary
+        is returned, so that process workers do not pickle full DataFrames back.
+
         Parameters:
         - plant_id: int, plant ID
+        - incremental: bool, process only rows newer than the plant's watermark
 
         Returns:
         - plant_id: int, plant ID
-        - processed_data: DataFrame or None, processed DataFrame or None if an error occurred
+        - summary: dict or None, rows written and last processed datetime, None if an error occurred
         """
         try:
             print(f"Processing data for plant ID: {plant_id}")
-            processed_data = self.process_raw_data(plant_id)
-            save_pickle(processed_data, PROCESSED_DATA_PATH, f'processed_solar_plant_{plant_id}')
-            return plant_id, processed_data
+            if incremental:
+                processed_data = self.process_incremental(plant_id)
+            else:
+                processed_data = self.rebuild(plant_id)
+            summary = {
+                'rows': len(processed_data),
+                'last_datetime': processed_data['datetime'].max() if len(processed_data) else None
+            }
+            return plant_id, summary
         except FileNotFoundError:
             print(f"Data for plant ID {plant_id} not found. Skipping...")
             return plant_id, None
@@ -154,23 +222,23 @@ class DataProcessor:
             print(f"An error occurred while processing plant ID {plant_id}: {e}. Skipping...")
             return plant_id, None
 
-    def process_multiple_plants(self, plant_ids):
+    def process_multiple_plants(self, plant_ids, incremental=False, backend=None, max_workers=None):
         """
         Process data for multiple plants in parallel.
 
         Parameters:
         - plant_ids: list of plant IDs
+        - incremental: bool, process only rows newer than each plant's watermark
+        - backend: str or None, 'threads', 'processes' or 'serial' (defaults to env `executor_backend`)
+        - max_workers: int or None, number of workers
 
         Returns:
-        - processed_data: dict, dictionary with plant IDs as keys and processed DataFrames as values
-        """
-        processed_data = {}
-        with ThreadPoolExecutor() as executor:
-            futures = [executor.submit(self.process_single_plant, plant_id) for plant_id in plant_ids]
-            for future in as_completed(futures):
-                plant_id, data = future.result()
-                if data is not None:
-                    processed_data[plant_id] = data
-                else:
-                    print(f"Skipping plant ID: {plant_id} due to processing error.")
-        # return processed_data
+        - summaries: dict, plant IDs as keys and processing summaries as values
+        """
+        summaries = {}
+        for plant_id, summary in run_parallel(self.process_single_plant, plant_ids, backend, max_workers, incremental=incremental):
+            if summary is not None:
+                summaries[plant_id] = summary
+            else:
+                print(f"Skipping plant ID: {plant_id} due to processing error.")
+        return summaries
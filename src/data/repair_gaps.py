@@ -0,0 +1,51 @@
+# %%
+"""
+Gap repair: backfill days that are missing or incomplete in the raw store.
+
+Checks every day of the window against the fetch ledger and the stored rows,
+and fetches only the days without all 96 blocks. Rows are appended, existing
+history is not rewritten.
+
+Run: python -m src.data.repair_gaps --start 2024-01-01 [--end 2024-03-31] [--plants 42 46 aggregated]
+"""
+import argparse
+from datetime import datetime
+
+from src.helper.settings import get_settings
+from src.helper.support import misc
+from src.apis.tokens import get_api_client
+from src.data.load_data import DataPrep
+from src.data.ledger import fetch_ledger
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Backfill missing or incomplete days of raw solar data.')
+    parser.add_argument('--start', required=True, help="first date to check ('%%Y-%%m-%%d')")
+    parser.add_argument('--end', help="last date to check, defaults to today")
+    parser.add_argument('--plants', nargs='*', help="plant IDs (or 'aggregated'), defaults to all solar plants plus 'aggregated'")
+    return parser.parse_args()
+
+
+def parse_plant_id(plant_id):
+    return plant_id if plant_id == 'aggregated' else int(plant_id)
+
+
+# %%
+if __name__ == '__main__':
+    args = parse_args()
+    get_settings()
+    # today in the configured timezone, which get_settings() only sets up
+    end = args.end or datetime.now().strftime('%Y-%m-%d')
+    if args.plants:
+        plant_ids = [parse_plant_id(plant_id) for plant_id in args.plants]
+    else:
+        plant_ids = misc().get_solar_plant_ids() + ['aggregated']
+
+    data = DataPrep(get_api_client().get_remc_token())
+    for plant_id in plant_ids:
+        try:
+            data.repair_gaps(plant_id, args.start, end)
+            summary = fetch_ledger.summary(plant_id).loc[args.start:end]
+            print(f"plant-id {plant_id}: {summary['status'].value_counts().to_dict()}")
+        except Exception as e:
+            print(f"Error repairing gaps for plant-id {plant_id}: {e}")
@@ -0,0 +1,96 @@
+"""
+Column schemas of the raw and processed series.
+
+Frames are cast to compact dtypes where they enter the pipeline (API
+responses, processing output, in-memory tails), so that holding the history of
+every plant costs 13 bytes per 15-minute block instead of 24 plus object columns:
+
+    datetime    datetime64[ns]  (int64 epoch nanoseconds, no duplicate index)
+    power       float32
+    tb          uint8           (1..96)
+    plant_id    category        (only in multi-plant long frames)
+
+Raw rows keep generation as float64: the raw store is the record of what the
+API returned, so it is stored losslessly and only processed frames are downcast.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Columns of the getActual / getActualAggregateAvg responses used downstream
+RAW_SCHEMA = {'utc_datetime': 'datetime64[ns]', 'generation': np.float64}
+PROCESSED_SCHEMA = {'datetime': 'datetime64[ns]', 'power': np.float32, 'tb': np.uint8}
+
+
+def _enforce(df, schema):
+    df = df[[column for column in schema if column in df.columns]].copy()
+    for column, dtype in schema.items():
+        if column not in df.columns:
+            continue
+        if dtype == 'datetime64[ns]':
+            df[column] = pd.to_datetime(df[column])
+        else:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype(dtype)
+    return df.reset_index(drop=True)
+
+
+def to_raw(df):
+    """
+    Keep only the raw API columns used downstream, with their raw-store dtypes.
+
+    Parameters:
+    - df: DataFrame, rows as returned by the API
+
+    Returns:
+    - df: DataFrame with utc_datetime (datetime64[ns]) and generation (float64)
+    """
+    if df is None or df.empty:
+        return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in RAW_SCHEMA.items()})
+    return _enforce(df, RAW_SCHEMA)
+
+
+def to_processed(df):
+    """Return the datetime, power and tb columns of a processed frame with compact dtypes."""
+    if df is None or df.empty:
+        return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in PROCESSED_SCHEMA.items()})
+    return _enforce(df, PROCESSED_SCHEMA)
+
+
+def to_long(frames):
+    """
+    Concatenate {plant_id: processed frame} into one long frame with a categorical plant_id column.
+
+    Returns:
+    - df: DataFrame with plant_id (category), datetime, power and tb columns
+    """
+    frames = {plant_id: to_processed(df) for plant_id, df in frames.items()}
+    if not frames:
+        return to_processed(None).assign(plant_id=pd.Categorical([]))
+    df = pd.concat(frames, names=['plant_id', None]).reset_index(level=0).reset_index(drop=True)
+    df['plant_id'] = pd.Categorical(df['plant_id'], categories=list(frames))
+    return df
+
+
+def memory_report(frames):
+    """
+    Memory used by a set of frames, one row per plant.
+
+    Parameters:
+    - frames: dict, plant_id -> DataFrame
+
+    Returns:
+    - report: DataFrame indexed by plant_id with rows, bytes, bytes_per_row and dtypes,
+      sorted by bytes (largest first)
+    """
+    rows = []
+    for plant_id, df in frames.items():
+        n_bytes = int(df.memory_usage(index=True, deep=True).sum())
+        rows.append({
+            'plant_id': plant_id,
+            'rows': len(df),
+            'bytes': n_bytes,
+            'bytes_per_row': n_bytes / len(df) if len(df) else 0.0,
+            'dtypes': ', '.join(f'{column}:{dtype}' for column, dtype in df.dtypes.items()),
+        })
+    report = pd.DataFrame(rows, columns=['plant_id', 'rows', 'bytes', 'bytes_per_row', 'dtypes'])
+    return report.set_index('plant_id').sort_values(by='bytes', ascending=False)
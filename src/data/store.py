@@ -0,0 +1,241 @@
+import os
+import glob
+import json
+import time
+import shutil
+import pandas as pd
+
+from src.helper import paths
+from src.data.schema import to_raw, to_processed
+
+
+class PartitionedStore:
+    def __init__(self, root, key, max_parts=32, track_changes=False, schema=None):
+        """
+        Columnar store of time series partitioned by plant and month.
+
+        Layout: {root}/plant={plant_id}/month={YYYY-MM}/part-{ns}.parquet
+
+        New rows are appended as new part files, each written to a temp file and
+        moved into place with os.replace, so readers never see a partial file.
+        Reads only open the month partitions that overlap the requested range and
+        keep the most recent row per key when parts overlap.
+
+        Args:
+            root (str or callable): Root directory of the store, or a function returning it
+                (resolved on first use so that defining a store does no I/O).
+            key (str): Name of the datetime column rows are partitioned and deduplicated on.
+            max_parts (int): Number of part files in a month after which it is compacted.
+            track_changes (bool): Record the oldest key appended per plant (see changed_since),
+                so that consumers can reprocess from there.
+            schema (callable): Casts legacy frames to the store's columns and dtypes on
+                import (see import_pickle), e.g. schema.to_raw.
+        """
+        self._root = root
+        self.key = key
+        self.max_parts = max_parts
+        self.track_changes = track_changes
+        self.schema = schema
+
+    @property
+    def root(self):
+        if callable(self._root):
+            self._root = self._root()
+        return self._root
+
+    def _plant_dir(self, plant_id):
+        return os.path.join(self.root, f'plant={plant_id}')
+
+    def _month_dir(self, plant_id, month):
+        return os.path.join(self._plant_dir(plant_id), f'month={month}')
+
+    def _parts(self, plant_id, month):
+        return sorted(glob.glob(os.path.join(self._month_dir(plant_id, month), 'part-*.parquet')))
+
+    def months(self, plant_id):
+        """Return the sorted list of month partitions ('YYYY-MM') stored for a plant."""
+        month_dirs = glob.glob(os.path.join(self._plant_dir(plant_id), 'month=*'))
+        return sorted(os.path.basename(d).split('=', 1)[1] for d in month_dirs)
+
+    def exists(self, plant_id):
+        return len(self.months(plant_id)) > 0
+
+    def _write_part(self, plant_id, month, df):
+        """Atomically write one part file into a month partition and return its path."""
+        month_dir = self._month_dir(plant_id, month)
+        os.makedirs(month_dir, exist_ok=True)
+        part_path = os.path.join(month_dir, f'part-{time.time_ns()}.parquet')
+        tmp_path = f'{part_path}.tmp'
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, part_path)
+        return part_path
+
+    def _split_by_month(self, df):
+        df = df.copy()
+        df[self.key] = pd.to_datetime(df[self.key])
+        return df.groupby(df[self.key].dt.strftime('%Y-%m'), sort=True)
+
+    def append(self, plant_id, df):
+        """
+        Append rows for a plant as new part files, one per month touched.
+
+        Parameters:
+        - plant_id: int or 'aggregated', plant ID
+        - df: DataFrame, rows to append (must contain the key column)
+        """
+        if df is None or df.empty:
+            return
+        if self.track_changes:
+            self._mark_changed(plant_id, pd.to_datetime(df[self.key]).min())
+        for month, month_df in self._split_by_month(df):
+            self._write_part(plant_id, month, month_df)
+            if len(self._parts(plant_id, month)) > self.max_parts:
+                self.compact(plant_id, month)
+
+    def write(self, plant_id, df):
+        """
+        Replace all data of a plant with `df`.
+
+        New month partitions are committed first, then the superseded part files
+        and months that are no longer present are removed.
+        """
+        if self.track_changes and df is not None and not df.empty:
+            self._mark_changed(plant_id, pd.to_datetime(df[self.key]).min())
+        old_parts = {month: self._parts(plant_id, month) for month in self.months(plant_id)}
+        new_months = set()
+        if df is not None and not df.empty:
+            for month, month_df in self._split_by_month(df):
+                self._write_part(plant_id, month, month_df)
+                new_months.add(month)
+        for month, parts in old_parts.items():
+            if month not in new_months:
+                shutil.rmtree(self._month_dir(plant_id, month), ignore_errors=True)
+            else:
+                for part in parts:
+                    os.remove(part)
+
+    def compact(self, plant_id, month):
+        """Merge all part files of a month into one, keeping the latest row per key."""
+        parts = self._parts(plant_id, month)
+        if len(parts) <= 1:
+            return
+        df = self._read_parts(parts)
+        self._write_part(plant_id, month, df)
+        for part in parts:
+            os.remove(part)
+
+    def _read_parts(self, parts, columns=None):
+        if columns is not None and self.key not in columns:
+            columns = [self.key] + list(columns)
+        df = pd.concat([pd.read_parquet(part, columns=columns) for part in parts], ignore_index=True)
+        df = df.drop_duplicates(subset=self.key, keep='last')
+        return df.sort_values(by=self.key).reset_index(drop=True)
+
+    def read(self, plant_id, start=None, end=None, columns=None):
+        """
+        Read a plant's rows with `start <= key < end`, opening only the overlapping months.
+
+        Parameters:
+        - plant_id: int or 'aggregated', plant ID
+        - start: datetime-like or None, inclusive lower bound
+        - end: datetime-like or None, exclusive upper bound
+        - columns: list or None, columns to load (the key column is always loaded)
+
+        Returns:
+        - df: DataFrame sorted by the key column
+
+        Raises:
+        - FileNotFoundError: if nothing is stored for the plant
+        """
+        months = self.months(plant_id)
+        if not months:
+            raise FileNotFoundError(f'No data stored for plant-id {plant_id} in {self.root}')
+
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+        if start is not None:
+            months = [m for m in months if m >= start.strftime('%Y-%m')]
+        if end is not None:
+            months = [m for m in months if m <= end.strftime('%Y-%m')]
+
+        parts = [part for month in months for part in self._parts(plant_id, month)]
+        if not parts:
+            # Nothing in range: return an empty frame with the stored schema
+            return self._read_parts(self._parts(plant_id, self.months(plant_id)[-1]), columns).iloc[0:0]
+
+        df = self._read_parts(parts, columns)
+        if start is not None:
+            df = df[df[self.key] >= start]
+        if end is not None:
+            df = df[df[self.key] < end]
+        return df.reset_index(drop=True)
+
+    def last_timestamp(self, plant_id):
+        """Return the latest key value stored for a plant, reading only its last month, or None."""
+        months = self.months(plant_id)
+        if not months:
+            return None
+        df = self._read_parts(self._parts(plant_id, months[-1]), columns=[self.key])
+        return df[self.key].max() if not df.empty else None
+
+    def _read_json(self, plant_id, name):
+        file_path = os.path.join(self._plant_dir(plant_id), name)
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, 'r') as file:
+            return json.load(file)
+
+    def _write_json(self, plant_id, name, data):
+        plant_dir = self._plant_dir(plant_id)
+        os.makedirs(plant_dir, exist_ok=True)
+        file_path = os.path.join(plant_dir, name)
+        with open(f'{file_path}.tmp', 'w') as file:
+            json.dump(data, file)
+        os.replace(f'{file_path}.tmp', file_path)
+
+    def get_watermark(self, plant_id):
+        """Return the persisted high-water mark of a plant as a Timestamp, or None if not set."""
+        state = self.get_watermark_state(plant_id)
+        return pd.Timestamp(state['watermark']) if state else None
+
+    def get_watermark_state(self, plant_id):
+        """Return the persisted watermark record of a plant (watermark plus extra state), or None."""
+        return self._read_json(plant_id, '_watermark.json')
+
+    def set_watermark(self, plant_id, watermark, **state):
+        """Atomically persist the high-water mark of a plant, with optional JSON-serializable state."""
+        self._write_json(plant_id, '_watermark.json', {'watermark': pd.Timestamp(watermark).isoformat(), **state})
+
+    def _mark_changed(self, plant_id, key):
+        changed = self.changed_since(plant_id)
+        if changed is None or key < changed:
+            self._write_json(plant_id, '_changed.json', {'changed_since': pd.Timestamp(key).isoformat()})
+
+    def changed_since(self, plant_id):
+        """Oldest key appended for a plant since clear_changed, or None (only with track_changes)."""
+        changed = self._read_json(plant_id, '_changed.json')
+        return pd.Timestamp(changed['changed_since']) if changed else None
+
+    def clear_changed(self, plant_id, seen):
+        """
+        Forget the change mark once the rows from `seen` on were consumed. A mark that
+        moved further back in the meantime (a concurrent append) is kept.
+        """
+        changed = self.changed_since(plant_id)
+        if changed is not None and seen is not None and changed >= seen:
+            os.remove(os.path.join(self._plant_dir(plant_id), '_changed.json'))
+
+    def import_pickle(self, plant_id, file_path):
+        """One-off migration of a legacy whole-history pickle into the store, cast with the store's schema."""
+        if os.path.exists(file_path) and not self.exists(plant_id):
+            df = pd.read_pickle(file_path)
+            if df is not None and not df.empty and self.schema is not None:
+                df = self.schema(df)
+            if df is not None and not df.empty:
+                self.write(plant_id, df)
+                print(f'Migrated {file_path} into {self.root} for plant-id: {plant_id}')
+
+
+# Stores for raw API rows (keyed on utc_datetime) and processed series (keyed on datetime)
+raw_store = PartitionedStore(lambda: paths.RAW_STORE_PATH, key='utc_datetime', track_changes=True, schema=to_raw)
+processed_store = PartitionedStore(lambda: paths.PROCESSED_STORE_PATH, key='datetime', schema=to_processed)
@@ -0,0 +1,41 @@
+# %%
+"""
+Micro-benchmark: apply-based vs vectorized time-block computation
+on one year of 15-minute data for 200 plants.
+
+Run: python -m src.features.benchmark_time_features
+"""
+import time
+import numpy as np
+import pandas as pd
+
+from src.features.time_features import time_block, time_block_np
+
+N_PLANTS = 200
+
+# %%
+def apply_time_block(datetimes):
+    # implementation previously used by DataProcessor.add_time_block_column
+    return pd.to_datetime(datetimes).apply(lambda x: ((x.hour * 60 + x.minute) // 15) + 1)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+# %%
+if __name__ == '__main__':
+    datetimes = pd.Series(pd.date_range('2024-01-01', periods=96 * 365, freq='15min'))
+    values = datetimes.to_numpy()
+
+    tb_apply, t_apply = timed(apply_time_block, datetimes)
+    tb_vector, t_vector = timed(time_block, datetimes)
+    tb_numpy, t_numpy = timed(time_block_np, values)
+    assert np.array_equal(tb_apply.to_numpy(), tb_vector) and np.array_equal(tb_vector, tb_numpy)
+
+    print(f'Rows per plant: {len(datetimes)}, plants: {N_PLANTS}')
+    print(f'apply      : {t_apply * N_PLANTS:8.2f} s')
+    print(f'vectorized : {t_vector * N_PLANTS:8.2f} s  ({t_apply / t_vector:.0f}x)')
+    print(f'numpy only : {t_numpy * N_PLANTS:8.2f} s  ({t_apply / t_numpy:.0f}x)')
@@ -1,7 +1,66 @@
+import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from src.features.time_features import calendar_features
+
+ROWS_PER_HOUR = 4
+
+
+def lag_matrix(power, lags):
+    """
+    All lags of a regular 15-minute power series as one (n, len(lags)) array.
+
+    Row i, column j holds power[i - lags[j]] (NaN before the start). The lags are
+    taken from a strided view over the NaN-padded series, so the only allocation
+    is the output matrix. A (plants, n) array gives a (plants, n, len(lags)) array.
+    """
+    power = np.asarray(power, dtype=np.float64)
+    max_lag = max(lags)
+    padded = np.concatenate([np.full(power.shape[:-1] + (max_lag,), np.nan), power], axis=-1)
+    windows = sliding_window_view(padded, max_lag + 1, axis=-1)
+    return windows[..., [max_lag - lag for lag in lags]]
+
+
+def rolling_mean_std(power, window):
+    """
+    Trailing rolling mean and std (ddof=1) over `window` rows, skipping NaNs,
+    from cumulative sums of the values, their squares and the valid counts.
+
+    Matches pandas' time-based rolling on a regular grid: the mean is NaN without
+    valid values and the std is NaN with fewer than two. Works along the last axis.
+    """
+    power = np.asarray(power, dtype=np.float64)
+    valid = ~np.isnan(power)
+    values = np.where(valid, power, 0.0)
+    zeros = np.zeros(power.shape[:-1] + (1,))
+    sums = np.concatenate([zeros, np.cumsum(values, axis=-1)], axis=-1)
+    squares = np.concatenate([zeros, np.cumsum(values * values, axis=-1)], axis=-1)
+    counts = np.concatenate([zeros, np.cumsum(valid, axis=-1)], axis=-1)
+
+    end = np.arange(1, power.shape[-1] + 1)
+    start = np.maximum(end - window, 0)
+    total = sums[..., end] - sums[..., start]
+    total_sq = squares[..., end] - squares[..., start]
+    count = counts[..., end] - counts[..., start]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(count > 0, total / count, np.nan)
+        var = np.where(count > 1, (total_sq - total * total / count) / (count - 1), np.nan)
+    return mean, np.sqrt(np.maximum(var, 0.0))
+
 
 class FeatureEngineer:
-    def __init__(self, lags=None, rolling_windows=None):
+    def __init__(self, lags=None, rolling_windows=None, streaming=False):
+        """
+        Initialize FeatureEngineer.
+
+        Args:
+            lags (list): Lags in 15-minute blocks.
+            rolling_windows (list): Rolling window lengths in hours.
+            streaming (bool): Build lags and rolling statistics with NumPy array ops
+                (one lag matrix, cumulative-sum rolling windows) instead of column-by-column pandas.
+        """
+        self.streaming = streaming
         if lags is None:
             self.lags = [1, 2, 3, 4, 6, 12, 24, 48, 94, 95, 96, 97, 98, 96*2, 96*3, 96*5]
         else:
@@ -23,10 +82,7 @@ class FeatureEngineer:
         Returns:
         - DataFrame: Transformed DataFrame with engineered features.
         """
-        df = self._resample_fill_missing(df)
-        df = self._create_lag_features(df)
-        df = self._create_rolling_statistics(df)
-        df = self._extract_datetime_features(df)
+        df = self._add_features(self._resample_fill_missing(df))
 
         if include_holidays:
             df = self._include_holiday_indicators(df)
@@ -34,6 +90,67 @@ class FeatureEngineer:
         df.dropna(inplace=True)
         return df
 
+    @property
+    def state_rows(self):
+        """Number of trailing rows needed to compute the features of the next row."""
+        return max(max(self.lags), ROWS_PER_HOUR * max(self.rolling_windows))
+
+    def engineer_features_incremental(self, new_df, tail=None, include_holidays=False):
+        """
+        Compute features only for new rows, given the tail retained from the previous call.
+
+        The tail holds the last `state_rows` rows of the resampled series, which is all the
+        lags and rolling windows of the new rows look back on, so the features equal those
+        of engineer_features over the whole history. Rows of `new_df` at or before the end of
+        the tail replace the tail values but are not emitted again.
+
+        Parameters:
+        - new_df (DataFrame): New rows with 'datetime' and 'power' columns.
+        - tail (DataFrame or None): Tail returned by the previous call, None on the first call.
+        - include_holidays (bool): Whether to include holiday indicators.
+
+        Returns:
+        - features (DataFrame): Engineered features of the new rows (after dropna).
+        - tail (DataFrame): State to pass to the next call ('datetime' and 'power' columns).
+        """
+        new_df = new_df[['datetime', 'power']].copy()
+        new_df['datetime'] = pd.to_datetime(new_df['datetime'])
+        last_datetime = None
+        if tail is not None and not tail.empty:
+            last_datetime = tail['datetime'].max()
+            new_df = pd.concat([tail, new_df], ignore_index=True).drop_duplicates(subset='datetime', keep='last')
+
+        df = self._resample_fill_missing(new_df)
+        next_tail = df['power'].iloc[-self.state_rows:].rename_axis('datetime').reset_index()
+        df = self._add_features(df)
+        if include_holidays:
+            df = self._include_holiday_indicators(df)
+        if last_datetime is not None:
+            df = df[df.index > last_datetime]
+        return df.dropna(), next_tail
+
+    def compute_features(self, df):
+        """Resample a 'datetime'/'power' frame and add all features, keeping rows with NaNs."""
+        return self._add_features(self._resample_fill_missing(df))
+
+    def _add_features(self, df):
+        """Lag, rolling and datetime features of a resampled frame, with NumPy (streaming) or pandas."""
+        if self.streaming:
+            return self._build_features(df)
+        return self._extract_datetime_features(self._create_rolling_statistics(self._create_lag_features(df)))
+
+    def _build_features(self, df):
+        """Lag, rolling and datetime features of a resampled frame from NumPy arrays."""
+        power = df['power'].to_numpy(dtype=np.float64)
+        lags = pd.DataFrame(lag_matrix(power, self.lags), index=df.index,
+                            columns=[f'power_t-{lag}' for lag in self.lags])
+        rolling = {}
+        for window in self.rolling_windows:
+            rolling[f'rolling_mean_{window}h'], rolling[f'rolling_std_{window}h'] = \
+                rolling_mean_std(power, ROWS_PER_HOUR * window)
+        calendar = calendar_features(df.index)
+        return pd.concat([df, lags, pd.DataFrame({**rolling, **calendar}, index=df.index)], axis=1)
+
     def _resample_fill_missing(self, df):
         """Resample data to fill missing time intervals."""
         df['datetime'] = pd.to_datetime(df['datetime'])
@@ -56,11 +173,8 @@ class FeatureEngineer:
 
     def _extract_datetime_features(self, df):
         """Extract datetime components as features."""
-        df['hour'] = df.index.hour
-        df['minute'] = df.index.minute
-        df['day_of_week'] = df.index.dayofweek
-        df['day_of_month'] = df.index.day
-        df['month'] = df.index.month
+        for name, values in calendar_features(df.index).items():
+            df[name] = values
         return df
 
     def _include_holiday_indicators(self, df):
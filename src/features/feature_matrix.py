@@ -0,0 +1,104 @@
+"""
+Multi-plant feature matrices for cross-plant (global) models.
+
+Reads the processed series of many plants from the processed store and builds
+the lag, rolling and datetime features of FeatureEngineer for all of them into
+one contiguous float32 matrix, with an array of plant indices and an array of
+timestamps per row. Matrices are produced per date chunk, so a learner can
+consume them one chunk at a time without holding all history in memory.
+"""
+
+import os
+import math
+import numpy as np
+import pandas as pd
+
+from src.data.store import processed_store
+from src.features.feature_engg import FeatureEngineer
+
+BLOCKS_PER_DAY = 96
+
+
+class FeatureMatrixBuilder:
+    def __init__(self, plant_ids, lags=None, rolling_windows=None, chunk_days=None, store=None):
+        """
+        Initialize FeatureMatrixBuilder.
+
+        Args:
+            plant_ids (list): Plants to include, row plant_index i refers to plant_ids[i].
+            lags (list): Lags in 15-minute blocks, defaults to FeatureEngineer's.
+            rolling_windows (list): Rolling windows in hours, defaults to FeatureEngineer's.
+            chunk_days (int): Days per chunk, defaults to the `feature_chunk_days` env variable or 31.
+            store (PartitionedStore): Store of processed series, defaults to processed_store.
+        """
+        self.plant_ids = list(plant_ids)
+        self.engineer = FeatureEngineer(lags, rolling_windows, streaming=True)
+        self.chunk_days = int(chunk_days or os.getenv('feature_chunk_days', 31))
+        self.store = store or processed_store
+        # days of history read before a chunk so the first rows have all their lags
+        self.lookback_days = math.ceil(self.engineer.state_rows / BLOCKS_PER_DAY)
+        # every column FeatureEngineer adds, in its order
+        sample = pd.DataFrame({'datetime': [pd.Timestamp('2024-01-01')], 'power': [0.0]})
+        self.feature_names = [column for column in self.engineer.compute_features(sample).columns if column != 'power']
+
+    def _plant_features(self, plant_id, start, end):
+        """Feature frame of a plant for rows with start <= datetime < end, None if no data."""
+        try:
+            df = self.store.read(plant_id, start=start - pd.Timedelta(days=self.lookback_days), end=end,
+                                 columns=['datetime', 'power'])
+        except FileNotFoundError:
+            return None
+        if df.empty:
+            return None
+        df = self.engineer.compute_features(df[['datetime', 'power']])
+        return df[(df.index >= start) & (df.index < end)].dropna()
+
+    def build_chunk(self, start, end):
+        """
+        Build the feature matrix of all plants for start <= datetime < end.
+
+        Returns:
+        - X: float32 array (n_rows, n_features), columns as in `feature_names`
+        - y: float32 array (n_rows,), power of each row
+        - plant_index: int32 array (n_rows,), index into `plant_ids`
+        - time_index: datetime64[ns] array (n_rows,)
+        """
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        frames = []
+        for i, plant_id in enumerate(self.plant_ids):
+            df = self._plant_features(plant_id, start, end)
+            if df is not None and not df.empty:
+                frames.append((i, df))
+
+        n_rows = sum(len(df) for _, df in frames)
+        X = np.empty((n_rows, len(self.feature_names)), dtype=np.float32)
+        y = np.empty(n_rows, dtype=np.float32)
+        plant_index = np.empty(n_rows, dtype=np.int32)
+        time_index = np.empty(n_rows, dtype='datetime64[ns]')
+
+        row = 0
+        for i, df in frames:
+            n = len(df)
+            X[row:row + n] = df[self.feature_names].to_numpy(dtype=np.float32)
+            y[row:row + n] = df['power'].to_numpy(dtype=np.float32)
+            plant_index[row:row + n] = i
+            time_index[row:row + n] = df.index.to_numpy(dtype='datetime64[ns]')
+            row += n
+        return X, y, plant_index, time_index
+
+    def iter_chunks(self, start_date, end_date):
+        """
+        Yield (X, y, plant_index, time_index) per chunk of `chunk_days` days
+        over the inclusive date window [start_date, end_date].
+        """
+        chunk_start = pd.Timestamp(start_date).normalize()
+        window_end = pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+        while chunk_start < window_end:
+            chunk_end = min(chunk_start + pd.Timedelta(days=self.chunk_days), window_end)
+            yield self.build_chunk(chunk_start, chunk_end)
+            chunk_start = chunk_end
+
+    def build(self, start_date, end_date):
+        """Build the whole window [start_date, end_date] as one set of arrays (see build_chunk)."""
+        chunks = list(self.iter_chunks(start_date, end_date))
+        return tuple(np.concatenate(arrays) for arrays in zip(*chunks))
@@ -0,0 +1,227 @@
+"""
+Sunrise and sunset time blocks of a plant.
+
+Two estimators:
+- from data: the first and last 15-minute block with positive power of every
+  complete day in a lookback window, found with array ops over a (day, tb)
+  mask; the sunrise/sunset block is the most common first/last block.
+- from location: the NOAA solar position equations for the plant's latitude
+  and longitude, converted to local time blocks.
+
+Estimates are cached per plant, reference day and a fingerprint of the
+(day, tb) positive-power mask they were computed from, so repeated processing
+runs on the same day do not recompute them, while rows rewritten in the window
+(gap repair, rebuild) do.
+"""
+
+import os
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+
+from src.helper.settings import TIMEZONE
+from src.features.time_features import _to_datetime64, time_block_np, BLOCKS_PER_DAY
+
+# Sunrise is never later than, and sunset never earlier than, these blocks
+MAX_SUNRISE_BLOCK = 20
+MIN_SUNSET_BLOCK = 80
+DEFAULT_LOOKBACK_DAYS = 10
+
+
+def daily_first_last_blocks(datetimes, power):
+    """
+    First and last time block with positive power of every complete day.
+
+    Days without all 96 blocks (e.g. the running day) are left out, as their last
+    positive block is the current time rather than sunset.
+
+    Parameters:
+    - datetimes: Series/array of datetimes, 15-minute resolution
+    - power: Series/array of power values
+
+    Returns:
+    - first: int64 array, first positive block per day with generation
+    - last: int64 array, last positive block per day with generation
+    """
+    values = _to_datetime64(datetimes)
+    if len(values) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    days = values.astype('datetime64[D]').astype(np.int64)
+    day = days - days.min()
+    tb = time_block_np(values) - 1
+    n_days = int(day.max()) + 1
+
+    present = np.zeros((n_days, BLOCKS_PER_DAY), dtype=bool)
+    positive = np.zeros((n_days, BLOCKS_PER_DAY), dtype=bool)
+    present[day, tb] = True
+    positive[day, tb] = np.nan_to_num(np.asarray(power, dtype=np.float64)) > 0
+
+    keep = present.all(axis=1) & positive.any(axis=1)
+    positive = positive[keep]
+    first = positive.argmax(axis=1) + 1
+    last = BLOCKS_PER_DAY - positive[:, ::-1].argmax(axis=1)
+    return first, last
+
+
+def mask_fingerprint(datetimes, power):
+    """Digest of the blocks present and the blocks with positive power, the input of daily_first_last_blocks."""
+    values = _to_datetime64(datetimes)
+    positive = np.nan_to_num(np.asarray(power, dtype=np.float64)) > 0
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(np.ascontiguousarray(values.astype(np.int64)).tobytes())
+    digest.update(np.packbits(positive).tobytes())
+    return digest.hexdigest()
+
+
+def _mode(blocks):
+    """Most common block, the smallest one on ties (like Series.mode()[0])."""
+    return int(np.bincount(blocks).argmax())
+
+
+def sun_blocks_from_data(datetimes, power):
+    """
+    Sunrise and sunset block of a series from its daily first/last positive blocks.
+
+    Returns:
+    - sunrise_block: int, at most MAX_SUNRISE_BLOCK
+    - sunset_block: int, at least MIN_SUNSET_BLOCK
+    """
+    first, last = daily_first_last_blocks(datetimes, power)
+    if len(first) == 0:
+        return MAX_SUNRISE_BLOCK, MIN_SUNSET_BLOCK
+    return min(MAX_SUNRISE_BLOCK, _mode(first)), max(_mode(last), MIN_SUNSET_BLOCK)
+
+
+def sunrise_sunset_minutes(latitude, longitude, dates, timezone=TIMEZONE):
+    """
+    Local sunrise and sunset (minutes after midnight) from the NOAA solar position equations.
+
+    Parameters:
+    - latitude: float, degrees north
+    - longitude: float, degrees east
+    - dates: list/DatetimeIndex of dates
+    - timezone: str, timezone the minutes are expressed in
+
+    Returns:
+    - sunrise: float array of minutes, NaN on days without sunrise (polar night/day)
+    - sunset: float array of minutes, NaN on days without sunset
+    """
+    dates = pd.DatetimeIndex(pd.to_datetime(dates)).normalize()
+    gamma = 2 * np.pi / 365 * (dates.dayofyear.to_numpy() - 1)
+    eqtime = 229.18 * (0.000075 + 0.001868 * np.cos(gamma) - 0.032077 * np.sin(gamma)
+                       - 0.014615 * np.cos(2 * gamma) - 0.040849 * np.sin(2 * gamma))
+    decl = (0.006918 - 0.399912 * np.cos(gamma) + 0.070257 * np.sin(gamma)
+            - 0.006758 * np.cos(2 * gamma) + 0.000907 * np.sin(2 * gamma)
+            - 0.002697 * np.cos(3 * gamma) + 0.00148 * np.sin(3 * gamma))
+    lat = np.radians(latitude)
+    with np.errstate(invalid='ignore'):
+        hour_angle = np.degrees(np.arccos(np.cos(np.radians(90.833)) / (np.cos(lat) * np.cos(decl))
+                                          - np.tan(lat) * np.tan(decl)))
+    offset = dates.tz_localize(timezone).map(lambda date: date.utcoffset().total_seconds() / 60).to_numpy(dtype=np.float64)
+    sunrise = 720 - 4 * (longitude + hour_angle) - eqtime + offset
+    sunset = 720 - 4 * (longitude - hour_angle) - eqtime + offset
+    return sunrise, sunset
+
+
+def sun_blocks_from_location(latitude, longitude, dates, timezone=TIMEZONE):
+    """
+    Sunrise and sunset block over a set of dates from the plant location.
+
+    Returns:
+    - sunrise_block: int, earliest block containing sunrise, at most MAX_SUNRISE_BLOCK
+    - sunset_block: int, latest block containing sunset, at least MIN_SUNSET_BLOCK
+    """
+    sunrise, sunset = sunrise_sunset_minutes(latitude, longitude, dates, timezone)
+    if np.isnan(sunrise).all():
+        return MAX_SUNRISE_BLOCK, MIN_SUNSET_BLOCK
+    sunrise_block = int(np.nanmin(sunrise) // 15) + 1
+    sunset_block = int(np.nanmax(sunset) // 15) + 1
+    return min(MAX_SUNRISE_BLOCK, max(sunrise_block, 1)), max(min(sunset_block, BLOCKS_PER_DAY), MIN_SUNSET_BLOCK)
+
+
+class SunBlockEstimator:
+    def __init__(self, lookback_days=None, method=None):
+        """
+        Initialize SunBlockEstimator.
+
+        Args:
+            lookback_days (int): Days of history the estimate is based on,
+                defaults to the `sun_lookback_days` env variable or 10.
+            method (str): 'data' (daily positive blocks), 'location' (latitude/longitude)
+                or 'auto' (location when the plant has coordinates, else data),
+                defaults to the `sun_method` env variable or 'data'.
+        """
+        self.lookback_days = int(lookback_days or os.getenv('sun_lookback_days', DEFAULT_LOOKBACK_DAYS))
+        self.method = method or os.getenv('sun_method', 'data')
+        self._cache = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def _location(self, plant_id):
+        """(latitude, longitude) of a plant from the plant metadata, or None."""
+        if self.method == 'data' or plant_id is None or plant_id == 'aggregated':
+            return None
+        from src.helper.plant_cache import get_plant_cache
+        try:
+            plant = get_plant_cache().get_plant(plant_id)
+        except KeyError:
+            return None
+        latitude, longitude = plant.get('latitude'), plant.get('longitude')
+        if latitude is None or longitude is None or pd.isna(latitude) or pd.isna(longitude):
+            return None
+        return float(latitude), float(longitude)
+
+    def estimate(self, df, plant_id=None):
+        """
+        Sunrise and sunset block of a plant from its processed series.
+
+        The result is cached per plant, last day of `df` and fingerprint of the rows in
+        the lookback window, so it is computed once per plant per day unless those rows
+        change.
+
+        Parameters:
+        - df: DataFrame with 'datetime' and 'power' columns
+        - plant_id: int, 'aggregated' or None (None disables caching and the location method)
+
+        Returns:
+        - sunrise_block: int
+        - sunset_block: int
+        """
+        if df.empty:
+            return MAX_SUNRISE_BLOCK, MIN_SUNSET_BLOCK
+        end_date = pd.Timestamp(df['datetime'].iloc[-1]).normalize()
+        start_date = end_date - pd.Timedelta(days=self.lookback_days)
+        recent = df[df['datetime'] >= start_date]
+        key = (end_date, self.method, self.lookback_days, mask_fingerprint(recent['datetime'], recent['power']))
+        if plant_id is not None:
+            with self._lock:
+                cached = self._cache.get(plant_id)
+                if cached is not None and cached[0] == key:
+                    self.stats['hits'] += 1
+                    return cached[1]
+                self.stats['misses'] += 1
+
+        location = self._location(plant_id)
+        if location is not None:
+            blocks = sun_blocks_from_location(*location, pd.date_range(start_date, end_date))
+        else:
+            blocks = sun_blocks_from_data(recent['datetime'], recent['power'])
+
+        if plant_id is not None:
+            with self._lock:
+                self._cache[plant_id] = (key, blocks)
+        return blocks
+
+
+_estimator = None
+_estimator_lock = threading.Lock()
+
+
+def get_sun_block_estimator():
+    """Return the process-wide SunBlockEstimator."""
+    global _estimator
+    with _estimator_lock:
+        if _estimator is None:
+            _estimator = SunBlockEstimator()
+        return _estimator
@@ -0,0 +1,78 @@
+"""
+Vectorized time-block and calendar features.
+
+All functions work on integer arithmetic over datetime64 values instead of
+per-row Python calls, and accept a pandas Series/DatetimeIndex, a list of
+datetimes or a NumPy datetime64 array. Timestamps are taken as naive local
+times (the project runs in Asia/Calcutta); tz-aware input is converted to
+its wall-clock time first.
+"""
+
+import numpy as np
+import pandas as pd
+
+MINUTES_PER_BLOCK = 15
+BLOCKS_PER_DAY = 96
+
+
+def _to_datetime64(datetimes):
+    """Return naive datetime64[ns] values of `datetimes` as a NumPy array."""
+    if isinstance(datetimes, np.ndarray) and np.issubdtype(datetimes.dtype, np.datetime64):
+        return datetimes.astype('datetime64[ns]')
+    values = pd.to_datetime(datetimes)
+    if isinstance(values, pd.Series):
+        if values.dt.tz is not None:
+            values = values.dt.tz_localize(None)
+        return values.to_numpy(dtype='datetime64[ns]')
+    values = pd.DatetimeIndex(values)
+    if values.tz is not None:
+        values = values.tz_localize(None)
+    return values.to_numpy(dtype='datetime64[ns]')
+
+
+def minute_of_day_np(values):
+    """Minutes since midnight for a datetime64 array (NumPy only)."""
+    return values.astype('datetime64[m]').astype(np.int64) % 1440
+
+
+def time_block_np(values):
+    """15-minute time block (1..96) for a datetime64 array (NumPy only)."""
+    return minute_of_day_np(values) // MINUTES_PER_BLOCK + 1
+
+
+def time_block(datetimes):
+    """
+    Compute the 15-minute time block ('tb', 1..96) of each timestamp.
+
+    Parameters:
+    - datetimes: Series, DatetimeIndex, list or datetime64 array
+
+    Returns:
+    - tb: np.ndarray of int64
+    """
+    return time_block_np(_to_datetime64(datetimes))
+
+
+def calendar_features_np(values):
+    """
+    Calendar components of a datetime64 array (NumPy only).
+
+    Returns:
+    - dict of int64 arrays: hour, minute, day_of_week (Monday=0), day_of_month, month
+    """
+    minutes = minute_of_day_np(values)
+    days = values.astype('datetime64[D]')
+    months = values.astype('datetime64[M]')
+    return {
+        'hour': minutes // 60,
+        'minute': minutes % 60,
+        # 1970-01-01 was a Thursday (day_of_week=3)
+        'day_of_week': (days.astype(np.int64) + 3) % 7,
+        'day_of_month': (days - months.astype('datetime64[D]')).astype(np.int64) + 1,
+        'month': months.astype(np.int64) % 12 + 1,
+    }
+
+
+def calendar_features(datetimes):
+    """Calendar components (hour, minute, day_of_week, day_of_month, month) of each timestamp."""
+    return calendar_features_np(_to_datetime64(datetimes))
@@ -0,0 +1,117 @@
+# %%
+"""
+Import-time benchmark of the project modules using `python -X importtime`.
+
+Imports the modules used by the cron entry points in fresh interpreters, once
+from a baseline revision (by default the one before settings were resolved
+lazily) and once from the working tree (or `--after` revision), and prints the
+cumulative import time of every src.* module before and after, slowest first,
+the interpreter wall time and the directories the import created. Each side is
+the best of `--repeat` runs. Both sides run with an empty temporary
+PROJECT_DIR, so the baseline's import-time directory creation does not touch
+the real tree.
+
+Run: python -m src.helper.benchmark_imports [--baseline <git rev>] [--after <git rev>] [--repeat 5]
+"""
+import os, sys
+import argparse
+import subprocess
+import tarfile
+import tempfile
+import time
+
+MODULES = [
+    'src.data.load_data',
+    'src.data.process_data',
+    'src.helper.support',
+    'src.model.train',
+    'src.model.predict',
+]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# %%
+def import_times(modules, cwd=None):
+    """
+    Import `modules` in a fresh interpreter.
+
+    Returns:
+    - wall_time: float, seconds
+    - cumulative: dict, module -> cumulative import time in us
+    - created: int, directories created under the (empty) PROJECT_DIR by the import
+    """
+    code = '; '.join(f'import {module}' for module in modules)
+    project_dir = tempfile.mkdtemp(prefix='benchmark-imports-')
+    env = {**os.environ, 'PROJECT_DIR': project_dir}
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True,
+                            check=True, cwd=cwd or ROOT, env=env)
+    wall_time = time.perf_counter() - start
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        # format: "import time:   self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative_us, name = [part.strip() for part in line[len('import time:'):].split('|')]
+        cumulative[name.strip()] = int(cumulative_us)
+    created = sum(len(dirs) for _, dirs, _ in os.walk(project_dir))
+    return wall_time, cumulative, created
+
+
+def best_import_times(modules, cwd=None, repeat=5):
+    """Best wall time and best cumulative time per module over `repeat` fresh interpreters, and directories created."""
+    wall_time, cumulative, created = float('inf'), {}, 0
+    for _ in range(repeat):
+        run_wall_time, run_cumulative, created = import_times(modules, cwd)
+        wall_time = min(wall_time, run_wall_time)
+        for name, us in run_cumulative.items():
+            cumulative[name] = min(cumulative.get(name, us), us)
+    return wall_time, cumulative, created
+
+
+def default_baseline():
+    """Revision before src/helper/settings.py (lazy settings) was added."""
+    added = subprocess.run(['git', 'log', '--diff-filter=A', '--format=%H', '--', 'src/helper/settings.py'],
+                           capture_output=True, text=True, check=True, cwd=ROOT).stdout.split()
+    return f'{added[-1]}^' if added else 'HEAD'
+
+
+def checkout(revision, directory):
+    """Extract the src tree of a git revision into `directory`."""
+    archive = os.path.join(directory, 'src.tar')
+    subprocess.run(['git', 'archive', '--output', archive, revision, 'src'], check=True, cwd=ROOT)
+    with tarfile.open(archive) as tar:
+        tar.extractall(directory)
+    return directory
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Compare import times of the project modules with a baseline revision.')
+    parser.add_argument('--baseline', help='git revision to compare with, defaults to the one before lazy settings')
+    parser.add_argument('--after', help='git revision to measure instead of the working tree')
+    parser.add_argument('--repeat', type=int, default=5, help='interpreters per side, the best run is reported')
+    return parser.parse_args()
+
+
+# %%
+if __name__ == '__main__':
+    args = parse_args()
+    baseline = args.baseline or default_baseline()
+    with tempfile.TemporaryDirectory(prefix='benchmark-baseline-') as directory, \
+            tempfile.TemporaryDirectory(prefix='benchmark-after-') as after_directory:
+        checkout(baseline, directory)
+        modules = [module for module in MODULES
+                   if os.path.exists(os.path.join(directory, *module.split('.')) + '.py')]
+        before_wall, before, before_created = best_import_times(modules, cwd=directory, repeat=args.repeat)
+        after_cwd = checkout(args.after, after_directory) if args.after else None
+        after_wall, after, after_created = best_import_times(modules, cwd=after_cwd, repeat=args.repeat)
+
+    names = {name for name in list(before) + list(after) if name.startswith('src.')}
+    print(f'{"module":40s} {"before":>10s} {"after":>10s}   (baseline {baseline}, after {args.after or "working tree"})')
+    for name in sorted(names, key=lambda name: -max(before.get(name, 0), after.get(name, 0))):
+        before_ms = f'{before[name] / 1000:8.1f} ms' if name in before else f'{"-":>11s}'
+        after_ms = f'{after[name] / 1000:8.1f} ms' if name in after else f'{"-":>11s}'
+        print(f'{name:40s} {before_ms} {after_ms}')
+    print(f'{"interpreter wall time":40s} {before_wall * 1000:8.1f} ms {after_wall * 1000:8.1f} ms')
+    print(f'{"directories created by the import":40s} {before_created:11d} {after_created:11d}')
@@ -0,0 +1,74 @@
+"""
+Configurable executor backends for per-plant work.
+
+'threads' suits I/O-bound work (API calls), 'processes' suits CPU-bound pandas
+work that is otherwise limited by the GIL, and 'serial' runs everything in the
+calling thread, which is handy for debugging and profiling.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future, as_completed
+
+BACKENDS = ('threads', 'processes', 'serial')
+
+
+class SerialExecutor:
+    """Executor running each task immediately in the calling thread."""
+
+    def submit(self, func, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+def get_backend(backend=None):
+    """Resolve the backend name, defaulting to the `executor_backend` env variable or 'threads'."""
+    backend = backend or os.getenv('executor_backend', 'threads')
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown executor backend '{backend}'. Choose one of {BACKENDS}.")
+    return backend
+
+
+def get_executor(backend=None, max_workers=None):
+    """
+    Create an executor for the given backend.
+
+    Args:
+        backend (str): 'threads', 'processes' or 'serial'.
+        max_workers (int): Worker count, defaults to the `executor_workers` env variable or the pool default.
+
+    Returns:
+        Executor usable as a context manager.
+    """
+    backend = get_backend(backend)
+    max_workers = max_workers or (int(os.getenv('executor_workers')) if os.getenv('executor_workers') else None)
+    if backend == 'processes':
+        return ProcessPoolExecutor(max_workers=max_workers)
+    if backend == 'serial':
+        return SerialExecutor()
+    return ThreadPoolExecutor(max_workers=max_workers)
+
+
+def run_parallel(func, items, backend=None, max_workers=None, **kwargs):
+    """
+    Run `func(item, **kwargs)` for every item and yield results as they complete.
+
+    With the 'processes' backend `func` and its arguments must be picklable and,
+    to keep inter-process traffic small, should return summaries rather than data.
+    """
+    with get_executor(backend, max_workers) as executor:
+        futures = [executor.submit(func, item, **kwargs) for item in items]
+        for future in as_completed(futures):
+            yield future.result()
@@ -1,17 +1,17 @@
 """
 Path definitions for various directories/files in the project.
 
+The constants below are resolved lazily (module __getattr__) from the project
+directory in the settings, so importing this module does not read .env or
+create directories. The directories are created on first access.
+
 Author: Aman Bhatt
 """
 
-from pathlib import Path
-import sys, os
-
-from dotenv import load_dotenv
-load_dotenv()
+import os
+import threading
 
-PROJECT_PATH = os.getenv('PROJECT_DIR')
-sys.path.append(PROJECT_PATH)
+from src.helper.settings import get_settings
 
 
 class ProjectPaths:
@@ -52,28 +52,52 @@ class ProjectPaths:
             os.makedirs(directory, exist_ok=True)
 
 
-# create an instance of the ProjectPaths class
-project_paths = ProjectPaths(PROJECT_PATH)
+def _build_paths():
+    PROJECT_PATH = get_settings().project_dir
+
+    # create an instance of the ProjectPaths class
+    project_paths = ProjectPaths(PROJECT_PATH)
+
+    return {
+        'PROJECT_PATH': PROJECT_PATH,
+        'project_paths': project_paths,
+
+        # model path
+        'MODELS_PATH': os.path.join(PROJECT_PATH, 'models'),
+
+        # dam forecast path
+        'FORECAST_PATH': project_paths.forecasts,
+        'VSTF_FORECAST_PATH': os.path.join(project_paths.forecasts, 'VSTF'),
+        'IND_FORECAST_PATH': os.path.join(project_paths.forecasts, 'IND'),
+        'DA_FORECAST_PATH': os.path.join(project_paths.forecasts, 'DA'),
+        'WA_FORECAST_PATH': os.path.join(project_paths.forecasts, 'WA'),
+
+        # logs path
+        'LOGS_PATH': project_paths.logs,
 
-# model path
-MODELS_PATH = os.path.join(PROJECT_PATH, 'models')
+        # data path
+        'DATA_PATH': project_paths.data,
+        'RAW_DATA_PATH': os.path.join(project_paths.data, 'raw_data'),
+        'PROCESSED_DATA_PATH': os.path.join(project_paths.data, 'processed_data'),
+        'RAW_STORE_PATH': os.path.join(project_paths.data, 'raw_store'),  # partitioned parquet, plant/month
+        'PROCESSED_STORE_PATH': os.path.join(project_paths.data, 'processed_store'),  # partitioned parquet, plant/month
 
-# dam forecast path
-FORECAST_PATH = project_paths.forecasts
-VSTF_FORECAST_PATH = os.path.join(project_paths.forecasts, 'VSTF')
-IND_FORECAST_PATH = os.path.join(project_paths.forecasts, 'IND')
-DA_FORECAST_PATH = os.path.join(project_paths.forecasts, 'DA')
-WA_FORECAST_PATH = os.path.join(project_paths.forecasts, 'WA')
+        # token path
+        'TOKEN_PATH': os.path.join(PROJECT_PATH, 'config'),
+        'CONFIG_PATH': os.path.join(PROJECT_PATH, 'config'),
+    }
 
-# logs path
-LOGS_PATH = project_paths.logs
 
+_paths = None
+_paths_lock = threading.Lock()
 
-# data path
-DATA_PATH = project_paths.data
-RAW_DATA_PATH = os.path.join(project_paths.data, 'raw_data') 
-PROCESSED_DATA_PATH = os.path.join(project_paths.data, 'processed_data') 
 
-# token path
-TOKEN_PATH = os.path.join(PROJECT_PATH, 'config')
-CONFIG_PATH = os.path.join(PROJECT_PATH, 'config')
\ No newline at end of file
+def __getattr__(name):
+    global _paths
+    if _paths is None:
+        with _paths_lock:
+            if _paths is None:
+                _paths = _build_paths()
+    if name in _paths:
+        return _paths[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,133 @@
+"""
+Process-wide cache of solar plant metadata.
+
+Plant info is fetched from the REMC getPlant endpoint by refresh_if_stale(),
+at most once per TTL, and persisted to config/solar_plants_info. Only the
+entry points that list plants (misc.get_solar_plant_ids / solar_plants_info,
+called once in the parent process of a run) refresh. AVC and plant lookups
+never call the API: they read the persisted snapshot, reloading it only when
+its file changed, so process-pool workers pick up the parent's refresh
+without a network call of their own.
+"""
+
+import os
+import time
+import threading
+
+from src.helper import paths
+from src.helper.settings import get_settings
+from src.helper.utils import load_pickle, save_pickle
+
+SNAPSHOT_NAME = 'solar_plants_info'
+
+
+class PlantMetadataCache:
+    def __init__(self, ttl=None):
+        """
+        Initialize PlantMetadataCache.
+
+        Args:
+            ttl (float): Seconds before refresh_if_stale fetches the metadata from the API again,
+                defaults to the `plant_cache_ttl` env variable or 6 hours.
+        """
+        get_settings()
+        self.ttl = float(ttl or os.getenv('plant_cache_ttl', 6 * 3600))
+        self._df = None
+        self._index = {}
+        self._snapshot_mtime = None
+        self._lock = threading.RLock()
+        self.stats = {'hits': 0, 'misses': 0, 'api_refreshes': 0, 'api_errors': 0}
+
+    @property
+    def snapshot_path(self):
+        return os.path.join(paths.CONFIG_PATH, SNAPSHOT_NAME)
+
+    def _snapshot_mtime_now(self):
+        try:
+            return os.path.getmtime(self.snapshot_path)
+        except FileNotFoundError:
+            return None
+
+    def _set(self, df, snapshot_mtime):
+        df = df.copy()
+        df['plant_id'] = df['plant_id'].astype('int')
+        self._df = df
+        self._index = {record['plant_id']: record for record in df.to_dict('records')}
+        self._snapshot_mtime = snapshot_mtime
+
+    def refresh(self, use_api=True):
+        """
+        Reload plant metadata, from the API if `use_api` (persisting a new snapshot),
+        else (or on API failure) from the persisted snapshot.
+        """
+        with self._lock:
+            if use_api:
+                try:
+                    from src.apis.tokens import get_api_client
+                    df = get_api_client().get_plant_info()
+                    df = df.loc[df.plant_type == 'Solar']
+                    save_pickle(df, paths.CONFIG_PATH, SNAPSHOT_NAME)
+                    self._set(df, self._snapshot_mtime_now())
+                    self.stats['api_refreshes'] += 1
+                    return self._df
+                except Exception as e:
+                    self.stats['api_errors'] += 1
+                    print(f'Error in fetching solar plants info: {str(e)}')
+                    print('Loading saved plant_info details...')
+            self._set(load_pickle(paths.CONFIG_PATH, SNAPSHOT_NAME), self._snapshot_mtime_now())
+            return self._df
+
+    def refresh_if_stale(self):
+        """Fetch the metadata from the API if the snapshot is missing or older than the TTL."""
+        with self._lock:
+            snapshot_mtime = self._snapshot_mtime_now()
+            if snapshot_mtime is None or time.time() - snapshot_mtime > self.ttl:
+                self.refresh()
+
+    def _ensure_loaded(self):
+        """Load the snapshot if it was not loaded yet or its file changed. Never calls the API."""
+        with self._lock:
+            snapshot_mtime = self._snapshot_mtime_now()
+            if self._df is not None and (snapshot_mtime is None or snapshot_mtime == self._snapshot_mtime):
+                self.stats['hits'] += 1
+                return
+            self.stats['misses'] += 1
+            if snapshot_mtime is None:
+                raise FileNotFoundError(f'No solar plant metadata at {self.snapshot_path}. Run refresh_if_stale() first.')
+            self._set(load_pickle(paths.CONFIG_PATH, SNAPSHOT_NAME), snapshot_mtime)
+
+    def get_table(self):
+        """Return the solar plant metadata DataFrame."""
+        self._ensure_loaded()
+        return self._df.copy()
+
+    def get_plant(self, plant_id):
+        """Return the metadata record (dict) of a plant. Raises KeyError if unknown."""
+        self._ensure_loaded()
+        return self._index[int(plant_id)]
+
+    def get_avc(self, plant_id):
+        return float(self.get_plant(plant_id)['avc'])
+
+    def avc_map(self):
+        """Return {plant_id: avc} for all solar plants."""
+        self._ensure_loaded()
+        return {plant_id: float(record['avc']) for plant_id, record in self._index.items()}
+
+    def plant_ids(self):
+        """Return the sorted list of solar plant IDs."""
+        self._ensure_loaded()
+        return sorted(self._index)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_plant_cache():
+    """Return the process-wide PlantMetadataCache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PlantMetadataCache()
+        return _cache
@@ -0,0 +1,46 @@
+"""
+Project settings, resolved once on first use.
+
+Loading the .env file and setting the process timezone used to happen at
+import time of several modules. They now happen the first time
+get_settings() is called, so importing a module does no I/O.
+"""
+
+import os
+import sys
+import time
+import threading
+
+TIMEZONE = 'Asia/Calcutta'
+
+
+class Settings:
+    def __init__(self):
+        """
+        Resolve the project configuration: environment variables from .env,
+        the process timezone and the project directory layout.
+        """
+        from dotenv import load_dotenv
+        load_dotenv()
+
+        # set timezone
+        os.environ['TZ'] = TIMEZONE
+        time.tzset()
+
+        self.project_dir = os.getenv('PROJECT_DIR')
+        if self.project_dir and self.project_dir not in sys.path:
+            sys.path.append(self.project_dir)
+
+
+_settings = None
+_settings_lock = threading.Lock()
+
+
+def get_settings():
+    """Return the process-wide Settings, resolving them on the first call."""
+    global _settings
+    if _settings is None:
+        with _settings_lock:
+            if _settings is None:
+                _settings = Settings()
+    return _settings
@@ -1,35 +1,20 @@
 # Dependencies
 from datetime import *
-import sys
-import time
-import os
 
-# set timezone
-import time
-os.environ['TZ'] = 'Asia/Calcutta'
-time.tzset()
-
-# Load environment variables
-from dotenv import load_dotenv
-load_dotenv()
-
-PROJECT_PATH = os.getenv('PROJECT_DIR')
-sys.path.append(PROJECT_PATH)
-
-from src.apis.tokens import APIClient
-from src.helper.paths import CONFIG_PATH
+from src.helper import paths
+from src.helper.settings import get_settings
 from src.helper.utils import load_pickle, save_pickle
-apis = APIClient()
+from src.helper.plant_cache import get_plant_cache
 
 
 class misc:
     
     def __init__(self):
-        pass
+        get_settings()
     
     def saved_solar_plants_ids(self):
         try:
-            df = load_pickle(CONFIG_PATH, 'solar_plants_info')
+            df = load_pickle(paths.CONFIG_PATH, 'solar_plants_info')
             df['plant_id'] = df['plant_id'].astype('int') 
             df = list(set(df['plant_id']))
             df.sort() 
@@ -38,29 +23,21 @@ class misc:
             return self.get_solar_plant_ids() 
     
     def solar_plants_info(self):
-        try:
-            df = apis.get_plant_info()
-            df = df.loc[df.plant_type == 'Solar']
-            save_pickle(df, CONFIG_PATH, 'solar_plants_info') 
-        except Exception as e:
-            print(f'Error in fetching solar plants info: {str(e)}')
-            print('Loading saved plant_info details...')
-            df = load_pickle(CONFIG_PATH, 'solar_plants_info')   
-        return df
+        # served from the process-wide cache, refreshed from the API once per TTL
+        get_plant_cache().refresh_if_stale()
+        return get_plant_cache().get_table()
         
     def get_avc(self, plant_id):
-        # df = self.solar_plants_info()
-        df = load_pickle(CONFIG_PATH, 'solar_plants_info')
-        avc = float(df.loc[df.plant_id == int(plant_id), 'avc'])
-        return avc
+        return get_plant_cache().get_avc(plant_id)
+    
+    def get_avc_map(self):
+        """Return the AVC of every solar plant as a {plant_id: avc} dict."""
+        return get_plant_cache().avc_map()
     
     def get_solar_plant_ids(self):
         try:
-            df = self.solar_plants_info() 
-            df['plant_id'] = df['plant_id'].astype('int') 
-            df = list(set(df['plant_id']))
-            df.sort()
-            return df
+            get_plant_cache().refresh_if_stale()
+            return get_plant_cache().plant_ids()
         except Exception as e:
             print(f'Error in get_soler_plant_ids: {str(e)}')
         
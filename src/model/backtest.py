@@ -0,0 +1,290 @@
+# %%
+"""
+Walk-forward backtest of the EWMA models.
+
+Replays the processed history in memory: at every 15-minute issue time of a day
+the intraday model is retrained on the data available at that time and its
+forecast for the rest of the day is scored, and once per day the day-ahead
+model is retrained at the issue time and its forecast for the next day is
+scored. Errors are reported per plant and revision as MAPE and NMAE.
+
+No model is fitted row by row. The EWMA of a block at issue block k of day d is
+
+    (P[d] + [b < k] x[d]) / (Q[d] + [b < k] valid[d])
+
+where P and Q are the decayed sums of the previous `days` days (see
+src.model.ewma.ewma_last), so all 96 issue times of a day are one (96, 96)
+array operation per plant.
+
+Run: python -m src.model.backtest START_DATE END_DATE [plant_id ...]
+"""
+import sys
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+from src.helper.settings import get_settings
+from src.helper.support import misc, revisions
+from src.data.store import processed_store
+from src.model.ewma import BLOCKS_PER_DAY, pivot_day_tb
+from src.model.params import DEFAULT_PARAMS
+MAX_HISTORY_DAYS = 31
+
+
+def load_history(plant_ids, start_date, end_date, history_days=MAX_HISTORY_DAYS):
+    """
+    Load the processed series of many plants as one (plant, day, tb) array.
+
+    Parameters:
+    - plant_ids: list of plant IDs
+    - start_date, end_date: first and last date (inclusive) to be scored
+    - history_days: int, days loaded before `start_date` for training windows
+
+    Returns:
+    - history: dict with 'plant_ids' (plants with data), 'start_date' (date of day 0),
+      'n_history' (days before start_date), 'values' float64 array (plants, days, 96)
+      with NaN where no value, and 'avc' float64 array (plants,), inf where unknown
+    """
+    start = pd.Timestamp(start_date).normalize() - timedelta(days=history_days)
+    end = pd.Timestamp(end_date).normalize() + timedelta(days=1)
+    n_days = (end - start).days
+    avc_map = misc().get_avc_map()
+
+    found, values, avc = [], [], []
+    for plant_id in plant_ids:
+        try:
+            data = processed_store.read(plant_id, start=start, end=end, columns=['datetime', 'power', 'tb'])
+        except FileNotFoundError:
+            print(f"Data for plant ID {plant_id} not found. Skipping...")
+            continue
+        found.append(plant_id)
+        values.append(pivot_day_tb(data['datetime'], data['tb'], data['power'], start, n_days)[0])
+        avc.append(np.inf if plant_id == 'aggregated' else avc_map.get(int(plant_id), np.inf))
+
+    return {
+        'plant_ids': found,
+        'start_date': start,
+        'n_history': history_days,
+        'values': np.array(values).reshape(len(found), n_days, BLOCKS_PER_DAY),
+        'avc': np.array(avc, dtype=np.float64),
+    }
+
+
+def issue_revisions(model_type, issue_blocks=range(BLOCKS_PER_DAY)):
+    """Revision number of every issue block (0-based block of the issue time)."""
+    day = datetime(2000, 1, 1)
+    if model_type == 'day_ahead':
+        return np.array([revisions(day + timedelta(minutes=15 * k)).day_ahead_revision() for k in issue_blocks])
+    return np.array([revisions(day + timedelta(minutes=15 * k)).intraday_revision() for k in issue_blocks])
+
+
+def _decayed_sums(values, valid, alpha, days):
+    """
+    Decayed sums of the `days` days before every day.
+
+    Returns:
+    - numerator, denominator: arrays (n_days, 96), sum over l=1..days of (1-alpha)^l * x[d-l]
+    - oldest_numerator, oldest_denominator: the l = days + 1 term, which belongs to the window
+      of a model trained at midnight (issue block 0) whose last row is on the previous day
+    """
+    n_days = values.shape[0]
+    x = np.where(valid, values, 0.0)
+    numerator = np.zeros_like(x)
+    denominator = np.zeros_like(x)
+    for lag in range(1, days + 1):
+        weight = (1 - alpha) ** lag
+        numerator[lag:] += weight * x[:n_days - lag]
+        denominator[lag:] += weight * valid[:n_days - lag]
+    lag = days + 1
+    weight = (1 - alpha) ** lag
+    oldest_numerator = np.zeros_like(x)
+    oldest_denominator = np.zeros_like(x)
+    oldest_numerator[lag:] = weight * x[:n_days - lag]
+    oldest_denominator[lag:] = weight * valid[:n_days - lag]
+    return numerator, denominator, oldest_numerator, oldest_denominator
+
+
+def _recent_means(values, tbs):
+    """Mean of the `tbs` rows before every issue block, skipping NaNs, shape (n_days, 96)."""
+    series = values.ravel()
+    valid = ~np.isnan(series)
+    sums = np.concatenate([[0.0], np.cumsum(np.where(valid, series, 0.0))])
+    counts = np.concatenate([[0], np.cumsum(valid)])
+    end = np.arange(len(series))
+    start = np.maximum(end - tbs, 0)
+    count = counts[end] - counts[start]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(count > 0, (sums[end] - sums[start]) / count, np.nan)
+    return means.reshape(values.shape)
+
+
+def model_states(values, days, alpha, tbs, weight_recent, live=True):
+    """
+    Model of every issue time of every day, as train_model would produce it.
+
+    Parameters:
+    - values: float64 array (n_days, 96) of one plant, NaN where no value
+    - days, alpha, tbs, weight_recent: training parameters of train_model
+    - live: bool, blend with the recent mean as train_model does when its data is fresh
+
+    Returns:
+    - models: float64 array (n_days, 96 issue blocks, 96 blocks); models[d, k] is the model
+      trained at block k of day d on all rows before that time
+    """
+    valid = ~np.isnan(values)
+    numerator, denominator, oldest_numerator, oldest_denominator = _decayed_sums(values, valid, alpha, days)
+
+    # rows of the issue day seen at issue block k are the blocks b < k
+    seen = np.tri(BLOCKS_PER_DAY, BLOCKS_PER_DAY, -1, dtype=bool)
+    today = np.where(valid, values, 0.0)
+    num = numerator[:, None, :] + seen[None] * today[:, None, :]
+    den = denominator[:, None, :] + seen[None] * valid[:, None, :]
+    # at block 0 the last row is on the previous day, so the window reaches one day further back
+    num[:, 0] += oldest_numerator
+    den[:, 0] += oldest_denominator
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ewma = np.where(den > 0, num / den, np.nan)
+
+    if live:
+        recent = _recent_means(values, tbs)[:, :, None]
+        ewma = np.where(ewma != 0, (1 - weight_recent) * ewma + weight_recent * recent, ewma)
+    return ewma
+
+
+class EWMABacktest:
+    def __init__(self, days=None, alpha=None, tbs=None, weight_recent=None, live=True, day_ahead_issue='09:00',
+                 min_actual_frac=0.05):
+        """
+        Initialize EWMABacktest.
+
+        Args:
+            days, alpha, tbs, weight_recent: Training parameters of EMWA_Train.train_model.
+            live (bool): Blend with the mean of the most recent blocks, as train_model does on fresh data.
+            day_ahead_issue (str): Time of day ('%H:%M') at which the day-ahead forecast is issued.
+            min_actual_frac (float): Blocks with actual power below this fraction of AVC are left out of MAPE.
+        """
+        get_settings()
+        self.params = dict(DEFAULT_PARAMS)
+        self.params.update({key: value for key, value in
+                            {'days': days, 'alpha': alpha, 'tbs': tbs, 'weight_recent': weight_recent}.items()
+                            if value is not None})
+        self.live = live
+        hour, minute = map(int, day_ahead_issue.split(':'))
+        self.day_ahead_block = (hour * 60 + minute) // 15
+        self.min_actual_frac = min_actual_frac
+
+    def _errors(self, forecast, actual, mask, avc, groups, n_groups):
+        """Absolute and percentage error sums per group of issue blocks."""
+        forecast = np.minimum(forecast, avc)
+        mask = mask & ~np.isnan(forecast) & ~np.isnan(actual)
+        abs_error = np.where(mask, np.abs(forecast - actual), 0.0)
+        scale = avc if np.isfinite(avc) else np.nanmax(actual)
+        mape_mask = mask & (actual > self.min_actual_frac * scale)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            pct_error = np.where(mape_mask, abs_error / actual, 0.0)
+
+        # sum over days and target blocks, then over the issue blocks of each group
+        sums = [abs_error.sum(axis=(0, 2)), mask.sum(axis=(0, 2)), pct_error.sum(axis=(0, 2)), mape_mask.sum(axis=(0, 2))]
+        return [np.bincount(groups, weights=s, minlength=n_groups) for s in sums], scale
+
+    def evaluate(self, history, model_types=('intraday', 'day_ahead'), **params):
+        """
+        Score the models on an in-memory history (see load_history).
+
+        Parameters:
+        - history: dict returned by load_history
+        - model_types: tuple of 'intraday' and/or 'day_ahead'
+        - params: training parameters overriding the ones given at init
+
+        Returns:
+        - results: DataFrame with plant_id, model_type, revision, n, mape, nmae (in %)
+        """
+        params = {**self.params, **params}
+        n_history = history['n_history']
+        intraday_revisions = issue_revisions('intraday')
+        day_ahead_revision = issue_revisions('day_ahead', [self.day_ahead_block])[0]
+        # intraday forecasts are scored on the blocks from the issue time to the end of the day
+        future = ~np.tri(BLOCKS_PER_DAY, BLOCKS_PER_DAY, -1, dtype=bool)
+
+        rows = []
+        for i, plant_id in enumerate(history['plant_ids']):
+            values, avc = history['values'][i], history['avc'][i]
+            models = model_states(values, params['days'], params['alpha'], params['tbs'], params['weight_recent'], self.live)
+
+            if 'intraday' in model_types:
+                actual = values[n_history:]
+                groups, revision_ids = np.unique(intraday_revisions, return_inverse=True)
+                sums, scale = self._errors(models[n_history:], actual[:, None, :], future[None], avc,
+                                           revision_ids, len(groups))
+                rows.extend(self._rows(plant_id, 'intraday', groups, sums, scale))
+
+            if 'day_ahead' in model_types:
+                # issued on day d - 1 for day d
+                forecast = models[n_history - 1:-1, self.day_ahead_block][:, None, :]
+                actual = values[n_history:][:, None, :]
+                mask = np.ones_like(forecast, dtype=bool)
+                sums, scale = self._errors(forecast, actual, mask, avc, np.zeros(1, dtype=np.int64), 1)
+                rows.extend(self._rows(plant_id, 'day_ahead', [day_ahead_revision], sums, scale))
+
+        return pd.DataFrame(rows, columns=['plant_id', 'model_type', 'revision', 'n', 'mape', 'nmae'])
+
+    def daily_errors(self, values, avc, first_day, model_types=('intraday', 'day_ahead'), **params):
+        """
+        Absolute error sums and counts per scored day of one plant, for parameter sweeps.
+
+        Parameters:
+        - values: float64 array (n_days, 96) of one plant
+        - avc: float, capacity the forecasts are clipped at
+        - first_day: int, index of the first day to score (days before it are training history)
+        - model_types: tuple of 'intraday' and/or 'day_ahead'
+        - params: training parameters overriding the ones given at init
+
+        Returns:
+        - errors: dict, model_type -> float64 array (n_days - first_day, 2) of (abs error sum, count)
+        """
+        params = {**self.params, **params}
+        models = model_states(values, params['days'], params['alpha'], params['tbs'], params['weight_recent'], self.live)
+        actual = values[first_day:]
+        errors = {}
+        if 'intraday' in model_types:
+            future = ~np.tri(BLOCKS_PER_DAY, BLOCKS_PER_DAY, -1, dtype=bool)
+            forecast = np.minimum(models[first_day:], avc)
+            mask = future[None] & ~np.isnan(forecast) & ~np.isnan(actual)[:, None, :]
+            abs_error = np.where(mask, np.abs(forecast - actual[:, None, :]), 0.0)
+            errors['intraday'] = np.stack([abs_error.sum(axis=(1, 2)), mask.sum(axis=(1, 2))], axis=1)
+        if 'day_ahead' in model_types:
+            forecast = np.minimum(models[first_day - 1:-1, self.day_ahead_block], avc)
+            mask = ~np.isnan(forecast) & ~np.isnan(actual)
+            abs_error = np.where(mask, np.abs(forecast - actual), 0.0)
+            errors['day_ahead'] = np.stack([abs_error.sum(axis=1), mask.sum(axis=1)], axis=1)
+        return errors
+
+    def _rows(self, plant_id, model_type, revision_numbers, sums, scale):
+        abs_sum, n, pct_sum, n_pct = sums
+        with np.errstate(invalid='ignore', divide='ignore'):
+            nmae = np.where(n > 0, 100 * abs_sum / (n * scale), np.nan)
+            mape = np.where(n_pct > 0, 100 * pct_sum / n_pct, np.nan)
+        return [
+            {'plant_id': plant_id, 'model_type': model_type, 'revision': int(revision),
+             'n': int(n[j]), 'mape': mape[j], 'nmae': nmae[j]}
+            for j, revision in enumerate(revision_numbers)
+        ]
+
+    def run(self, plant_ids, start_date, end_date, model_types=('intraday', 'day_ahead')):
+        """Load the history of `plant_ids` and score the models over [start_date, end_date]."""
+        history = load_history(plant_ids, start_date, end_date, max(MAX_HISTORY_DAYS, self.params['days'] + 2))
+        return self.evaluate(history, model_types)
+
+
+# %%
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        sys.exit('Usage: python -m src.model.backtest START_DATE END_DATE [plant_id ...]')
+    get_settings()
+    plant_ids = [p if p == 'aggregated' else int(p) for p in sys.argv[3:]] or misc().get_solar_plant_ids()
+
+    start = time.perf_counter()
+    results = EWMABacktest().run(plant_ids, sys.argv[1], sys.argv[2])
+    print(results.to_string(index=False))
+    print(f'Backtest of {results.plant_id.nunique()} plants done in {time.perf_counter() - start:.2f} s')
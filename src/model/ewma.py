@@ -0,0 +1,76 @@
+"""
+Array helpers for the EWMA models.
+
+A plant's recent history is laid out as a (day, tb) array so that the final EWMA
+value of every time block, for any number of plants, is one weighted sum over the
+day axis instead of a Python-level ewm per group.
+"""
+
+import numpy as np
+import pandas as pd
+
+BLOCKS_PER_DAY = 96
+
+
+def pivot_day_tb(datetimes, tb, power, start_date, n_days):
+    """
+    Pivot a 15-minute series into a (day, tb) array.
+
+    Parameters:
+    - datetimes: Series/array of datetimes
+    - tb: Series/array of time blocks (1..96)
+    - power: Series/array of power values
+    - start_date: datetime-like, date of row 0 of the array
+    - n_days: int, number of days (rows) in the array
+
+    Returns:
+    - values: float64 array (n_days, 96), NaN where no value
+    - present: bool array (n_days, 96), True where a row exists (even with NaN power)
+    """
+    days = (pd.to_datetime(datetimes).to_numpy().astype('datetime64[D]')
+            - np.datetime64(pd.Timestamp(start_date).date(), 'D')).astype(np.int64)
+    tb = np.asarray(tb, dtype=np.int64) - 1
+    power = np.asarray(power, dtype=np.float64)
+    keep = (days >= 0) & (days < n_days) & (tb >= 0) & (tb < BLOCKS_PER_DAY)
+
+    values = np.full((n_days, BLOCKS_PER_DAY), np.nan)
+    present = np.zeros((n_days, BLOCKS_PER_DAY), dtype=bool)
+    values[days[keep], tb[keep]] = power[keep]
+    present[days[keep], tb[keep]] = True
+    return values, present
+
+
+def ewma_last(values, alpha):
+    """
+    Final value of pandas' `ewm(alpha=alpha).mean()` (adjust=True, ignore_na=False)
+    along the day axis, in closed form.
+
+    For a series x_0..x_t the final value is
+        sum_i (1 - alpha)^(t - i) * x_i / sum_i (1 - alpha)^(t - i)
+    over the non-NaN x_i. Trailing NaNs scale numerator and denominator alike,
+    so the result does not depend on where the series ends.
+
+    Parameters:
+    - values: array (..., n_days, 96), NaN for missing values
+    - alpha: float, smoothing factor
+
+    Returns:
+    - array (..., 96), NaN where a block has no valid value
+    """
+    n_days = values.shape[-2]
+    weights = (1 - alpha) ** np.arange(n_days - 1, -1, -1, dtype=np.float64)
+    valid = ~np.isnan(values)
+    numerator = np.einsum('...dt,d->...t', np.where(valid, values, 0.0), weights)
+    denominator = np.einsum('...dt,d->...t', valid.astype(np.float64), weights)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+def blend_recent(ewma, recent_mean, weight_recent):
+    """
+    Blend non-zero EWMA values with the mean of the most recent blocks, as done in train_model.
+
+    `recent_mean` is a scalar for a (96,) `ewma` or one value per plant for a (plants, 96) `ewma`.
+    """
+    recent_mean = np.asarray(recent_mean, dtype=np.float64)[..., None]
+    return np.where(ewma != 0, (1 - weight_recent) * ewma + weight_recent * recent_mean, ewma)
@@ -0,0 +1,149 @@
+"""
+Forecast cache and upload diff.
+
+ForecastCache keeps the forecast frame of a plant keyed on
+(plant_id, model_type, target date, revision, model version), where the model
+version is a digest of the plant's 96-block model vector. While neither the
+revision nor the model changes, a forecast is served from the cache instead of
+being regenerated. Cached frames hold the forecast before AVC clipping; callers
+clip after the lookup, so a capacity change in the plant metadata takes effect
+(and shows up as a changed upload) without a new model or revision.
+
+SubmissionLog remembers, per model type, the digest of the last forecast of
+every plant that the REMC server accepted, so an upload can be limited to the
+plants whose forecast (values or revision) changed since then.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
+import numpy as np
+
+from src.helper import paths
+
+
+def model_version(vector):
+    """Digest of a model vector, changes whenever any block of the model changes."""
+    return hashlib.blake2b(np.ascontiguousarray(vector, dtype=np.float64).tobytes(), digest_size=8).hexdigest()
+
+
+class ForecastCache:
+    def __init__(self, max_entries=None):
+        """
+        Initialize ForecastCache.
+
+        Args:
+            max_entries (int): Max cached forecasts, least recently used are evicted first,
+                defaults to the `forecast_cache_size` env variable or 5000.
+        """
+        self.max_entries = int(max_entries or os.getenv('forecast_cache_size', 5000))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    @staticmethod
+    def key(plant_id, model_type, target_date, revision, version):
+        return (str(plant_id), model_type, str(target_date), int(revision), version)
+
+    def get(self, key):
+        """Return a copy of the cached forecast frame for `key`, or None."""
+        with self._lock:
+            df = self._entries.get(key)
+            if df is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return df.copy()
+
+    def put(self, key, df):
+        with self._lock:
+            self._entries[key] = df.copy()
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SubmissionLog:
+    def __init__(self, model_type, path=None):
+        """
+        Initialize SubmissionLog.
+
+        Args:
+            model_type (str): Forecast type the log is kept for.
+            path (str): Log file, defaults to forecasts/submissions_{model_type}.json.
+        """
+        self.model_type = model_type
+        self._path = path
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return self._path or os.path.join(paths.FORECAST_PATH, f'submissions_{self.model_type}.json')
+
+    def load(self):
+        """Return {plant_id: {'digest', 'revision', 'submitted_at'}} of the last accepted submissions."""
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r') as file:
+            return json.load(file)
+
+    @staticmethod
+    def digest(payload):
+        return hashlib.blake2b(payload.encode(), digest_size=8).hexdigest()
+
+    def changed(self, payloads):
+        """
+        Filter plants down to those whose payload differs from the last accepted submission.
+
+        Parameters:
+        - payloads: dict, plant_id -> setForecast payload (JSON string)
+
+        Returns:
+        - changed: list of plant IDs to upload
+        """
+        submitted = self.load()
+        return [plant_id for plant_id, payload in payloads.items()
+                if submitted.get(str(plant_id), {}).get('digest') != self.digest(payload)]
+
+    def record(self, payloads, revisions, accepted):
+        """
+        Store the digests of accepted submissions.
+
+        Parameters:
+        - payloads: dict, plant_id -> payload that was uploaded
+        - revisions: dict, plant_id -> revision that was uploaded
+        - accepted: list of plant IDs the server accepted
+        """
+        if not accepted:
+            return
+        submitted_at = datetime.now().strftime('%Y-%m-%dT%H:%M:%S')
+        with self._lock:
+            submitted = self.load()
+            for plant_id in accepted:
+                submitted[str(plant_id)] = {'digest': self.digest(payloads[plant_id]),
+                                            'revision': int(revisions[plant_id]), 'submitted_at': submitted_at}
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(f'{self.path}.tmp', 'w') as file:
+                json.dump(submitted, file)
+            os.replace(f'{self.path}.tmp', self.path)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_forecast_cache():
+    """Return the process-wide ForecastCache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ForecastCache()
+        return _cache
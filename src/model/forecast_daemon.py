@@ -0,0 +1,310 @@
+# %%
+"""
+Resident forecast daemon.
+
+Runs ingest -> process -> train -> predict -> upload once per 15-minute block,
+aligned to the blocks of misc.prediction_date_and_time, in one long-lived
+process. Plant metadata (plant cache), the processed tail of every plant and
+the model registry stay in memory between cycles. A cycle that is still
+running when the next block starts makes that block be skipped instead of
+running cycles on top of each other. Every cycle also issues a very-short-term
+(VSTF) forecast of the next blocks straight from the in-memory tails.
+
+The intraday model is retrained every cycle, the day-ahead model once a day
+after `day_ahead_train_time` (env, '%H:%M', default '09:00').
+
+Uploading is opt-in (--upload): the `data` format setForecast expects is not
+defined in this repo, Forecast.to_payload is an assumed serialization.
+
+Run: python -m src.model.forecast_daemon [--upload]
+"""
+import os
+import time
+import argparse
+import threading
+from datetime import datetime, timedelta
+import pandas as pd
+
+from src.helper import paths
+from src.helper.settings import get_settings
+from src.helper.support import misc, revisions
+from src.helper.plant_cache import get_plant_cache
+from src.helper.utils import configure_logger
+from src.apis.tokens import get_api_client
+from src.apis.get_set import Forecast
+from src.data.load_data import DataPrep
+from src.data.process_data import DataProcessor
+from src.data.store import processed_store
+from src.data.schema import to_processed, memory_report
+from src.model.train import EMWA_Train
+from src.model.predict import EMWA_Predict
+from src.model.forecast_cache import SubmissionLog
+from src.model.vstf import VSTFEngine
+
+BLOCK_MINUTES = 15
+MODEL_TYPES = ('intraday', 'day_ahead')
+
+
+class ForecastDaemon:
+    def __init__(self, plant_ids=None, tail_days=12, offset_seconds=None, upload=False, day_ahead_train_time=None):
+        """
+        Initialize ForecastDaemon.
+
+        Args:
+            plant_ids (list): Plants to run, defaults to all solar plants plus 'aggregated'.
+            tail_days (int): Days of processed data kept in memory per plant (>= training window).
+            offset_seconds (int): Delay after the block boundary before a cycle starts,
+                giving the REMC server time to publish the last block.
+            upload (bool): Whether forecasts are uploaded with setForecast. Needs the `owner_id`
+                env variable, the owner of plants that have none in the plant metadata.
+            day_ahead_train_time (str): Time of day ('%H:%M') after which the day-ahead model is
+                retrained once per day, defaults to the `day_ahead_train_time` env variable or '09:00'.
+        """
+        get_settings()
+        if upload and not os.getenv('owner_id'):
+            raise ValueError('Uploading forecasts needs the `owner_id` env variable.')
+        self.plant_ids = plant_ids
+        self.tail_days = tail_days
+        self.offset_seconds = int(offset_seconds if offset_seconds is not None else os.getenv('daemon_offset_seconds', 60))
+        self.upload = upload
+        hour, minute = map(int, (day_ahead_train_time or os.getenv('day_ahead_train_time', '09:00')).split(':'))
+        self.day_ahead_train_time = hour * 60 + minute
+
+        self.misc = misc()
+        self.processor = DataProcessor()
+        self.trainer = EMWA_Train()
+        self.predictor = EMWA_Predict()
+        self.vstf = VSTFEngine()
+        self.forecast = Forecast()
+        self.logger = configure_logger(paths.LOGS_PATH, 'forecast_daemon')
+
+        self.tails = {}
+        self.trained_on = {}
+        self.last_timings = {}
+        self.cycles_run = 0
+        self.cycles_skipped = 0
+        self._cycle_thread = None
+        self._stop = threading.Event()
+
+    # ---------- scheduling ----------
+
+    def next_block_start(self, now=None):
+        """Start of the next 15-minute block (plus the configured offset)."""
+        now = now or datetime.now()
+        block_start = datetime(now.year, now.month, now.day, now.hour, BLOCK_MINUTES * (now.minute // BLOCK_MINUTES))
+        next_start = block_start + timedelta(seconds=self.offset_seconds)
+        if next_start <= now:
+            next_start += timedelta(minutes=BLOCK_MINUTES)
+        return next_start
+
+    def run_forever(self):
+        """Run one cycle per 15-minute block until stop() is called."""
+        print('Forecast daemon started.')
+        while not self._stop.is_set():
+            next_start = self.next_block_start()
+            if self._stop.wait(max(0.0, (next_start - datetime.now()).total_seconds())):
+                break
+            if self._cycle_thread is not None and self._cycle_thread.is_alive():
+                self.cycles_skipped += 1
+                self.logger.warning(f'Previous cycle still running at {next_start}. Skipping this block.')
+                print(f'Previous cycle still running at {next_start}. Skipping this block.')
+                continue
+            self._cycle_thread = threading.Thread(target=self.run_cycle, name='forecast-cycle', daemon=True)
+            self._cycle_thread.start()
+        if self._cycle_thread is not None:
+            self._cycle_thread.join()
+
+    def stop(self):
+        self._stop.set()
+
+    # ---------- cycle ----------
+
+    def run_cycle(self):
+        """
+        Run ingest -> process -> train -> predict -> upload once.
+
+        Returns:
+        - timings: dict, seconds spent per stage plus 'total'
+        """
+        prediction_datetime = self.misc.prediction_date_and_time()
+        timings = {}
+        cycle_start = time.perf_counter()
+        try:
+            # the only place in a cycle where plant metadata may be fetched from the API
+            get_plant_cache().refresh_if_stale()
+            plant_ids = self.get_plant_ids()
+            stage_start = time.perf_counter()
+            self.ingest(plant_ids)
+            timings['ingest'] = time.perf_counter() - stage_start
+
+            stage_start = time.perf_counter()
+            self.process(plant_ids)
+            timings['process'] = time.perf_counter() - stage_start
+
+            stage_start = time.perf_counter()
+            self.train(plant_ids, prediction_datetime)
+            timings['train'] = time.perf_counter() - stage_start
+
+            stage_start = time.perf_counter()
+            predictions = self.predict(plant_ids, prediction_datetime)
+            timings['predict'] = time.perf_counter() - stage_start
+
+            stage_start = time.perf_counter()
+            if self.upload:
+                self.upload_forecasts(predictions)
+            timings['upload'] = time.perf_counter() - stage_start
+        except Exception as e:
+            self.logger.error(f'Cycle for {prediction_datetime} failed: {e}')
+            print(f'Cycle for {prediction_datetime} failed: {e}')
+        timings['total'] = time.perf_counter() - cycle_start
+
+        self.cycles_run += 1
+        self.last_timings = timings
+        summary = ', '.join(f'{stage}={seconds:.2f}s' for stage, seconds in timings.items())
+        self.logger.info(f'Cycle {prediction_datetime}: {summary}')
+        print(f'Cycle {prediction_datetime}: {summary}')
+        if self.tails:
+            self.logger.info(f'In-memory tails: {self.memory_report()["bytes"].sum() / 1e6:.1f} MB for {len(self.tails)} plants')
+        if timings['total'] > BLOCK_MINUTES * 60 - self.offset_seconds:
+            self.logger.warning(f'Cycle {prediction_datetime} did not finish inside its block.')
+        return timings
+
+    def get_plant_ids(self):
+        if self.plant_ids is not None:
+            return list(self.plant_ids)
+        return self.misc.get_solar_plant_ids() + ['aggregated']
+
+    def ingest(self, plant_ids):
+        token_remc = get_api_client().get_remc_token()
+        DataPrep(token_remc).update_solar_data_for_plants(plant_ids)
+
+    def process(self, plant_ids):
+        """Incrementally process every plant and fold the new rows into its in-memory tail."""
+        for plant_id in plant_ids:
+            try:
+                if plant_id not in self.tails:
+                    self.tails[plant_id] = self.load_tail(plant_id)
+                new_rows = self.processor.process_incremental(plant_id)
+                self.tails[plant_id] = self.merge_tail(self.tails[plant_id], new_rows)
+            except FileNotFoundError:
+                print(f"Data for plant ID {plant_id} not found. Skipping...")
+            except Exception as e:
+                print(f"An error occurred while processing plant ID {plant_id}: {e}. Skipping...")
+
+    def load_tail(self, plant_id):
+        last_datetime = processed_store.last_timestamp(plant_id)
+        if last_datetime is None:
+            return to_processed(None)
+        return to_processed(processed_store.read(plant_id, start=last_datetime.normalize() - timedelta(days=self.tail_days),
+                                                 columns=['datetime', 'power', 'tb']))
+
+    def merge_tail(self, tail, new_rows):
+        if new_rows is None or new_rows.empty:
+            return tail
+        tail = pd.concat([tail, to_processed(new_rows)], ignore_index=True)
+        tail = tail.drop_duplicates(subset='datetime', keep='last').sort_values(by='datetime')
+        cutoff = tail['datetime'].max().normalize() - timedelta(days=self.tail_days)
+        return tail[tail['datetime'] >= cutoff].reset_index(drop=True)
+
+    def memory_report(self):
+        """Memory held by the in-memory tails, one row per plant (see schema.memory_report)."""
+        return memory_report(self.tails)
+
+    def due_model_types(self, now):
+        """Model types to retrain this cycle: intraday always, day_ahead once a day after its train time."""
+        due = ['intraday']
+        if self.trained_on.get('day_ahead') != now.date() and now.hour * 60 + now.minute >= self.day_ahead_train_time:
+            due.append('day_ahead')
+        return due
+
+    def train(self, plant_ids, now=None):
+        now = now or datetime.now()
+        for model_type in self.due_model_types(now):
+            self.trainer.train_models_batch(plant_ids, model_type, frames=self.tails)
+            self.trained_on[model_type] = now.date()
+
+    def predict(self, plant_ids, prediction_datetime):
+        """
+        Forecast all plants for every model type, plus the VSTF forecast of the next blocks.
+
+        Returns:
+        - predictions: dict, model_type (or 'vstf') -> long forecast DataFrame
+        """
+        revision = revisions(prediction_datetime)
+        revision_by_type = {'intraday': revision.intraday_revision(), 'day_ahead': revision.day_ahead_revision()}
+        owners = self.get_owner_ids()
+        predictions = {
+            model_type: self.predictor.predict_many(plant_ids, model_type, revision_by_type[model_type], owner_id=owners)
+            for model_type in MODEL_TYPES
+        }
+        predictions['vstf'] = self.predict_vstf(plant_ids, prediction_datetime, owners)
+        return predictions
+
+    def predict_vstf(self, plant_ids, prediction_datetime, owners):
+        """VSTF forecast of the next blocks from the in-memory tails, saved under VSTF_FORECAST_PATH."""
+        tails = {plant_id: self.tails[plant_id] for plant_id in plant_ids if plant_id in self.tails}
+        df_pred = self.vstf.forecast(tails, prediction_datetime, owner_id=owners)
+        if not df_pred.empty:
+            self.vstf.save_forecast(df_pred, prediction_datetime)
+        return df_pred
+
+    def get_owner_ids(self):
+        """{plant_id: owner_id} from plant metadata when it has an owner_id column, else the `owner_id` env variable."""
+        default_owner = os.getenv('owner_id')
+        owners = {'aggregated': default_owner}
+        table = get_plant_cache().get_table()
+        if 'owner_id' in table.columns:
+            owners.update(dict(zip(table['plant_id'], table['owner_id'])))
+        else:
+            owners.update({plant_id: default_owner for plant_id in table['plant_id']})
+        return owners
+
+    def upload_forecasts(self, predictions):
+        """
+        Upload the intraday and day-ahead forecasts that changed since the last accepted
+        submission with the bulk uploader and log the plants that failed. VSTF forecasts
+        are only written to VSTF_FORECAST_PATH.
+
+        Raises ValueError, before anything is uploaded, if a forecast has no owner_id.
+        """
+        predictions = {model_type: predictions[model_type] for model_type in MODEL_TYPES if model_type in predictions}
+        for model_type, df_pred in predictions.items():
+            missing = df_pred.loc[df_pred['owner_id'].isna(), 'plant_id'].unique()
+            if len(missing):
+                raise ValueError(f'No owner_id for plant-ids {list(missing)} in the {model_type} forecast.')
+
+        token_remc = get_api_client().get_remc_token()
+        for model_type, df_pred in predictions.items():
+            if df_pred.empty:
+                continue
+            log = SubmissionLog(model_type)
+            plants = {plant_id: df_plant for plant_id, df_plant in df_pred.groupby('plant_id', sort=False)}
+            payloads = {plant_id: self.forecast.to_payload(df_plant) for plant_id, df_plant in plants.items()}
+            changed = log.changed(payloads)
+            if not changed:
+                print(f'No {model_type} forecast changed since the last submission. Skipping upload.')
+                continue
+            result = self.forecast.set_forecasts_bulk(token_remc, df_pred[df_pred['plant_id'].isin(changed)], model_type)
+            accepted = list(result.loc[result['success'], 'plant_id'])
+            log.record(payloads, {plant_id: plants[plant_id]['revision'].iloc[0] for plant_id in accepted}, accepted)
+            failed = result[~result['success']]
+            print(f'Uploaded {model_type} forecasts: {int(result["success"].sum())} ok, {len(failed)} failed, '
+                  f'max latency {result["latency"].max():.2f}s')
+            for row in failed.itertuples():
+                self.logger.error(f'Upload of {model_type} forecast failed for plant-id {row.plant_id}: {row.error}')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Run the forecast pipeline once per 15-minute block.')
+    parser.add_argument('--upload', action='store_true', help='upload forecasts with setForecast (needs the owner_id env variable)')
+    return parser.parse_args()
+
+
+# %%
+if __name__ == '__main__':
+    args = parse_args()
+    daemon = ForecastDaemon(upload=args.upload)
+    try:
+        daemon.run_forever()
+    except KeyboardInterrupt:
+        daemon.stop()
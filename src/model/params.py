@@ -0,0 +1,71 @@
+"""
+Per-plant EWMA training parameters.
+
+Tuned parameters live in config/ewma_params.json as
+    {model_type: {plant_id: {'days': ..., 'alpha': ..., 'tbs': ..., 'weight_recent': ...}}}
+and are written by src.model.tuning. Plants without an entry use DEFAULT_PARAMS.
+"""
+
+import os
+import json
+import threading
+
+from src.helper import paths
+
+DEFAULT_PARAMS = {'days': 9, 'alpha': 0.3, 'tbs': 5, 'weight_recent': 0.7}
+PARAMS_FILE = 'ewma_params.json'
+
+_config = None
+_config_mtime = None
+_config_lock = threading.Lock()
+
+
+def _file_path():
+    return os.path.join(paths.CONFIG_PATH, PARAMS_FILE)
+
+
+def load_params_config():
+    """Return the per-plant parameter config, re-reading the file only when it changed."""
+    global _config, _config_mtime
+    with _config_lock:
+        file_path = _file_path()
+        mtime = os.path.getmtime(file_path) if os.path.exists(file_path) else None
+        if mtime != _config_mtime or _config is None:
+            if mtime is None:
+                _config = {}
+            else:
+                with open(file_path, 'r') as file:
+                    _config = json.load(file)
+            _config_mtime = mtime
+        return _config
+
+
+def get_plant_params(plant_id, model_type, overrides=None):
+    """
+    Training parameters of a plant: DEFAULT_PARAMS, updated with the tuned config
+    and then with the non-None values of `overrides`.
+    """
+    params = dict(DEFAULT_PARAMS)
+    params.update(load_params_config().get(model_type, {}).get(str(plant_id), {}))
+    params.update({key: value for key, value in (overrides or {}).items() if value is not None})
+    return params
+
+
+def save_plant_params(model_type, plant_params):
+    """
+    Merge tuned parameters into the config and atomically rewrite it.
+
+    Parameters:
+    - model_type: str, 'intraday' or 'day_ahead'
+    - plant_params: dict, plant_id -> params dict
+    """
+    global _config_mtime
+    file_path = _file_path()
+    config = dict(load_params_config())
+    with _config_lock:
+        config[model_type] = {**config.get(model_type, {}),
+                              **{str(plant_id): params for plant_id, params in plant_params.items()}}
+        with open(f'{file_path}.tmp', 'w') as file:
+            json.dump(config, file, indent=2)
+        os.replace(f'{file_path}.tmp', file_path)
+        _config_mtime = None
@@ -3,14 +3,17 @@ import numpy as np
 from datetime import datetime, timedelta
 import os
 
-from src.helper.paths import MODELS_PATH, IND_FORECAST_PATH
-from src.helper.utils import load_pickle  
-from src.data.process_data import DataProcessor
+from src.helper import paths
+from src.helper.settings import get_settings
+from src.features.time_features import time_block
+from src.model.registry import get_registry
+from src.model.forecast_cache import ForecastCache, get_forecast_cache, model_version
+from src.model.seasonal import get_seasonal_index
 from src.helper.support import misc
 
 class EMWA_Predict:
     def __init__(self):
-        pass
+        get_settings()
     
     # def load_model(self, plant_id):
     #     self.model_path = os.path.join(MODELS_PATH, 'ewma_models', 'intraday')
@@ -22,50 +25,195 @@ class EMWA_Predict:
     #     else:
     #         raise FileNotFoundError(f"Model file 'intraday_model_{plant_id}.csv' not found.")
     
-    def predict(self, owner_id, plant_id, model_type, revision):
+    def predict(self, owner_id, plant_id, model_type, revision, use_cache=True):
         
         try:
             # loading model data
-            model_file = os.path.join(MODELS_PATH, 'ewma_models', f'{model_type}', f'{model_type}_model_{plant_id}.csv')
-            # if os.path.exists(model_file):
-            model_df = pd.read_csv(model_file)
-            
-            # Generate datetime entries for today with 15-minute intervals
-            now = datetime.now()
-            today = datetime(now.year, now.month, now.day)
-            time_blocks = 96  # Number of 15-minute intervals in a day (24 hours * 4)
-
-            date_range = [today + timedelta(minutes=15*i) for i in range(time_blocks)]
-            if model_type == 'day_ahead':
-                date_range = [today + timedelta(minutes=15*i) + timedelta(days=1) for i in range(time_blocks)]
-            df_pred = pd.DataFrame(date_range, columns=['datetime'])
-            df_pred = DataProcessor().add_time_block_column(df_pred)
-            
-            # Round datetime to nearest 15-minute interval
-            df_pred['datetime'] = df_pred['datetime'].dt.round('15min')
-            
-            df_pred = pd.merge(df_pred, model_df, on='tb', how='left')
-            df_pred = df_pred[['datetime', 'power']]
-            df_pred = df_pred.rename(columns = {'power': 'forecast'})
-            
-            df_pred['owner_id'] = owner_id
-            df_pred['plant_id'] = plant_id 
-            df_pred['revision'] = revision
-            
-            df_pred = df_pred[['owner_id', 'plant_id', 'datetime', 'revision', 'forecast']]
+            model = get_registry(model_type).get(plant_id)
+            model_df = pd.DataFrame({'tb': np.arange(1, len(model) + 1), 'power': model})
             
+            # Generate datetime entries for today (tomorrow for day_ahead) with 15-minute intervals
+            date_range = self.forecast_dates(model_type)
+
+            # Same revision and model as an earlier call: serve the stored (unclipped) forecast
+            key = ForecastCache.key(plant_id, model_type, date_range[0].date(), revision, model_version(model))
+            df_pred = get_forecast_cache().get(key) if use_cache else None
+            if df_pred is not None:
+                df_pred['owner_id'] = owner_id
+                print(f'Prediction for plant-id {plant_id} served from cache')
+            else:
+                df_pred = pd.DataFrame(date_range, columns=['datetime'])
+                df_pred['tb'] = time_block(df_pred['datetime'])
+
+                # Round datetime to nearest 15-minute interval
+                df_pred['datetime'] = df_pred['datetime'].dt.round('15min')
+
+                df_pred = pd.merge(df_pred, model_df, on='tb', how='left')
+                df_pred = df_pred[['datetime', 'power']]
+                df_pred = df_pred.rename(columns = {'power': 'forecast'})
+
+                df_pred['owner_id'] = owner_id
+                df_pred['plant_id'] = plant_id
+                df_pred['revision'] = revision
+
+                df_pred = df_pred[['owner_id', 'plant_id', 'datetime', 'revision', 'forecast']]
+                if use_cache:
+                    get_forecast_cache().put(key, df_pred)
+                print(f'Prediction done for plant-id {plant_id}')
+
+            # Clip at the current AVC, so a capacity change is never hidden by the cache
             if plant_id != 'aggregated' :
                 avc = misc().get_avc(plant_id)
                 df_pred.loc[df_pred.forecast > avc, 'forecast'] = avc
             df_pred = df_pred.round(2)
-            
+
             # df_pred.to_csv(os.path.join(IND_FORECAST_PATH, f'intraday_forecast_{plant_id}.csv'))
-            print(f'Prediction done for plant-id {plant_id}')
             return df_pred
         
         except FileNotFoundError:
             print(f"model for plant-id {plant_id} does not exist. Skipping...")
-        
-        
-        
-        
\ No newline at end of file
+
+    def forecast_dates(self, model_type, days=1):
+        """
+        Build the 15-minute time grid a forecast is issued for.
+
+        Parameters:
+        - model_type: str, 'intraday' (starts today), 'day_ahead' or 'week_ahead' (start tomorrow)
+        - days: int, number of days covered by the grid
+
+        Returns:
+        - date_range: DatetimeIndex of days * 96 timestamps
+        """
+        now = datetime.now()
+        start = datetime(now.year, now.month, now.day)
+        if model_type in ('day_ahead', 'week_ahead'):
+            start += timedelta(days=1)
+        return pd.date_range(start, periods=96 * days, freq='15min')
+
+    def predict_many(self, plant_ids, model_type, revision, owner_id=None, use_cache=True):
+        """
+        Generate forecasts for many plants in one vectorized pass.
+
+        The time grid is built once, all plants' 96-block model vectors are read from
+        the registry as one array, and AVC clipping uses a single capacity table.
+        Plants whose revision and model did not change since an earlier call are
+        served from the forecast cache, which holds the forecasts before clipping.
+
+        Parameters:
+        - plant_ids: list of plant IDs
+        - model_type: str, 'intraday' or 'day_ahead'
+        - revision: int, revision number
+        - owner_id: owner ID, either one value for all plants or a {plant_id: owner_id} dict
+        - use_cache: bool, read and fill the forecast cache
+
+        Returns:
+        - df_pred: DataFrame with columns owner_id, plant_id, datetime, revision, forecast
+        """
+        columns = ['owner_id', 'plant_id', 'datetime', 'revision', 'forecast']
+        found, models = get_registry(model_type).get_many(plant_ids)
+        for plant_id in set(plant_ids) - set(found):
+            print(f"model for plant-id {plant_id} does not exist. Skipping...")
+        if not found:
+            return pd.DataFrame(columns=columns)
+
+        date_range = self.forecast_dates(model_type)
+        n_blocks = len(date_range)
+        cache = get_forecast_cache()
+        keys = [ForecastCache.key(plant_id, model_type, date_range[0].date(), revision, model_version(model))
+                for plant_id, model in zip(found, models)]
+        cached = [cache.get(key) if use_cache else None for key in keys]
+        missing = [i for i, df in enumerate(cached) if df is None]
+
+        forecast = np.empty((len(found), n_blocks))
+        for i, df in enumerate(cached):
+            if df is not None:
+                forecast[i] = df['forecast'].to_numpy()
+        if missing:
+            forecast[missing] = models[missing][:, time_block(date_range) - 1]
+
+        owners = [owner_id.get(plant_id) for plant_id in found] if isinstance(owner_id, dict) else [owner_id] * len(found)
+        df_pred = pd.DataFrame({
+            'owner_id': np.repeat(np.array(owners, dtype=object), n_blocks),
+            'plant_id': np.repeat(np.array(found, dtype=object), n_blocks),
+            'datetime': np.tile(date_range.to_numpy(), len(found)),
+            'revision': revision,
+            'forecast': forecast.ravel(),
+        })[columns]
+        if use_cache:
+            for i in missing:
+                cache.put(keys[i], df_pred.iloc[i * n_blocks:(i + 1) * n_blocks].reset_index(drop=True))
+
+        # Clip at the current AVC after the cache, aggregated and plants without AVC are left unclipped
+        avc_map = misc().get_avc_map()
+        avc = np.array([np.inf if plant_id == 'aggregated' else avc_map.get(int(plant_id), np.inf) for plant_id in found])
+        df_pred['forecast'] = np.minimum(forecast, avc[:, None]).round(2).ravel()
+        print(f'Prediction done for {len(found)} plants ({len(found) - len(missing)} from cache)')
+        return df_pred
+
+    def predict_week_ahead(self, plant_ids, revision, owner_id=None, days=7):
+        """
+        Generate week-ahead forecasts (tomorrow and the `days` - 1 days after) for many plants.
+
+        Each day blends the plant's day-ahead EWMA model with its seasonal profile for
+        that date from the seasonal index (src.model.seasonal): the EWMA weight starts at
+        the `wa_ewma_weight` env variable (default 0.8) for tomorrow and halves every
+        `wa_half_life_days` (default 2) days, so later days lean on the seasonal profile.
+        Where only one of the two has a value, that one is used.
+
+        Parameters:
+        - plant_ids: list of plant IDs
+        - revision: int, revision number
+        - owner_id: owner ID, either one value for all plants or a {plant_id: owner_id} dict
+        - days: int, number of days forecast
+
+        Returns:
+        - df_pred: DataFrame with columns owner_id, plant_id, datetime, revision, forecast
+        """
+        columns = ['owner_id', 'plant_id', 'datetime', 'revision', 'forecast']
+        date_range = self.forecast_dates('week_ahead', days)
+        dates = date_range[::96]
+        found, profiles = get_seasonal_index().lookup(plant_ids, dates)
+        found_models, models = get_registry('day_ahead').get_many(found)
+        for plant_id in set(plant_ids) - set(found):
+            print(f"seasonal profile for plant-id {plant_id} does not exist. Skipping...")
+        if not found:
+            return pd.DataFrame(columns=columns)
+
+        # EWMA state of every plant with a profile, NaN where a plant has no day-ahead model
+        ewma = np.full((len(found), 96), np.nan)
+        rows = {str(plant_id): i for i, plant_id in enumerate(found)}
+        for plant_id, model in zip(found_models, models):
+            ewma[rows[str(plant_id)]] = model
+
+        ewma_weight = float(os.getenv('wa_ewma_weight', 0.8))
+        half_life = float(os.getenv('wa_half_life_days', 2))
+        weight = (ewma_weight * 0.5 ** (np.arange(days) / half_life))[None, :, None]
+        ewma = np.broadcast_to(ewma[:, None, :], profiles.shape)
+        forecast = np.where(np.isnan(ewma), profiles,
+                            np.where(np.isnan(profiles), ewma, weight * ewma + (1 - weight) * profiles))
+        forecast = forecast.reshape(len(found), -1)
+
+        # Clip at AVC, aggregated and plants without AVC are left unclipped
+        avc_map = misc().get_avc_map()
+        avc = np.array([np.inf if plant_id == 'aggregated' else avc_map.get(int(plant_id), np.inf) for plant_id in found])
+        forecast = np.clip(forecast, 0, avc[:, None]).round(2)
+
+        n_blocks = len(date_range)
+        owners = [owner_id.get(plant_id) for plant_id in found] if isinstance(owner_id, dict) else [owner_id] * len(found)
+        df_pred = pd.DataFrame({
+            'owner_id': np.repeat(np.array(owners, dtype=object), n_blocks),
+            'plant_id': np.repeat(np.array(found, dtype=object), n_blocks),
+            'datetime': np.tile(date_range.to_numpy(), len(found)),
+            'revision': revision,
+            'forecast': forecast.ravel(),
+        })[columns]
+        print(f'Week-ahead prediction done for {len(found)} plants')
+        return df_pred
+
+    def save_week_ahead(self, df_pred):
+        """Write a week-ahead forecast to WA_FORECAST_PATH/wa_forecast_{first date}.csv and return the path."""
+        os.makedirs(paths.WA_FORECAST_PATH, exist_ok=True)
+        first_date = pd.Timestamp(df_pred['datetime'].min()) if not df_pred.empty else datetime.now()
+        file_path = os.path.join(paths.WA_FORECAST_PATH, f'wa_forecast_{first_date:%Y%m%d}.csv')
+        df_pred.to_csv(file_path, index=False)
+        return file_path
@@ -0,0 +1,227 @@
+"""
+Single-file registry of EWMA models, one file per horizon (model type).
+
+File layout:
+    8 bytes   magic b'EWMAREG1'
+    8 bytes   header length (little-endian uint64)
+    header    JSON (format version, registry version, plant ids, per-plant
+              training params, trained-at timestamps), padded to 64 bytes
+    data      float64 array of shape (n_plants, 96), row i = plant_ids[i]
+
+The data section is memory-mapped on read, so a lookup is a dictionary read
+plus a row view. Writes go to a temp file that replaces the registry with
+os.replace, so readers always see either the old or the new file.
+"""
+
+import os
+import glob
+import json
+import struct
+import threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from src.helper import paths
+
+MAGIC = b'EWMAREG1'
+FORMAT_VERSION = 1
+BLOCKS_PER_DAY = 96
+ALIGNMENT = 64
+
+
+class ModelRegistry:
+    def __init__(self, model_type, path=None):
+        """
+        Initialize ModelRegistry.
+
+        Args:
+            model_type (str): Horizon of the models, e.g. 'intraday' or 'day_ahead'.
+            path (str): Registry file, defaults to models/ewma_models/{model_type}_models.ewma.
+        """
+        self.model_type = model_type
+        self.path = path or os.path.join(paths.MODELS_PATH, 'ewma_models', f'{model_type}_models.ewma')
+        self.header = None
+        self._data = None
+        self._index = {}
+        self._stat = None
+        self._lock = threading.Lock()
+
+    # ---------- reading ----------
+
+    def _refresh(self):
+        """(Re)map the registry file if it changed since it was last loaded."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self.header, self._data, self._index, self._stat = None, None, {}, None
+            return
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if key == self._stat:
+            return
+        with open(self.path, 'rb') as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f'{self.path} is not an EWMA model registry')
+            header_len = struct.unpack('<Q', file.read(8))[0]
+            header = json.loads(file.read(header_len).rstrip(b' ').decode())
+        offset = len(MAGIC) + 8 + header_len
+        n_plants = len(header['plant_ids'])
+        data = np.memmap(self.path, dtype=np.float64, mode='r', offset=offset, shape=(n_plants, BLOCKS_PER_DAY)) \
+            if n_plants else np.empty((0, BLOCKS_PER_DAY))
+        self.header, self._data, self._stat = header, data, key
+        self._index = {plant_id: i for i, plant_id in enumerate(header['plant_ids'])}
+
+    def plant_ids(self):
+        with self._lock:
+            self._refresh()
+            return list(self._index)
+
+    def get(self, plant_id):
+        """
+        Return the 96-block model vector of a plant (NaN for blocks without a value).
+
+        Raises:
+        - FileNotFoundError: if the plant has no model in the registry
+        """
+        with self._lock:
+            self._refresh()
+            i = self._index.get(str(plant_id))
+            if i is None:
+                raise FileNotFoundError(f"model for plant-id {plant_id} not in {self.path}")
+            return np.array(self._data[i])
+
+    def get_frame(self, plant_id):
+        """Return a plant's model as a (tb, power) DataFrame, the layout train_model produces."""
+        power = self.get(plant_id)
+        return pd.DataFrame({'tb': np.arange(1, BLOCKS_PER_DAY + 1), 'power': power})
+
+    def get_many(self, plant_ids):
+        """
+        Return models of several plants as one (len(found), 96) array.
+
+        Returns:
+        - found: list of plant IDs that have a model, in the order of the rows
+        - models: float64 array (len(found), 96)
+        """
+        with self._lock:
+            self._refresh()
+            rows = [(plant_id, self._index[str(plant_id)]) for plant_id in plant_ids if str(plant_id) in self._index]
+            if not rows:
+                return [], np.empty((0, BLOCKS_PER_DAY))
+            return [plant_id for plant_id, _ in rows], np.array(self._data[[i for _, i in rows]])
+
+    def version(self):
+        """Registry version, incremented on every write (0 if the registry does not exist)."""
+        with self._lock:
+            self._refresh()
+            return self.header['version'] if self.header else 0
+
+    # ---------- writing ----------
+
+    def update(self, models, params=None, plant_params=None):
+        """
+        Add or replace models and atomically swap the registry file.
+
+        Parameters:
+        - models: dict, plant_id -> (tb, power) DataFrame or 96-value array
+        - params: dict or None, training params shared by all given plants
+        - plant_params: dict or None, plant_id -> training params, overrides `params`
+        """
+        import fcntl
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # serialize read-modify-write across threads and processes
+        with open(f'{self.path}.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            with self._lock:
+                self._refresh()
+                header = self.header or {'plant_ids': [], 'params': {}, 'trained_at': {}, 'version': 0}
+                existing = {plant_id: np.array(self._data[i]) for plant_id, i in self._index.items()}
+                header_params, header_trained_at = dict(header['params']), dict(header['trained_at'])
+
+                trained_at = datetime.now().strftime('%Y-%m-%dT%H:%M:%S')
+                for plant_id, model in models.items():
+                    key = str(plant_id)
+                    existing[key] = self._to_vector(model)
+                    header_params[key] = (plant_params or {}).get(plant_id, params or {})
+                    header_trained_at[key] = trained_at
+
+                self._write(existing, header_params, header_trained_at, header['version'] + 1)
+                self._stat = None
+
+    def import_csv_models(self, directory=None):
+        """
+        One-off migration of the legacy per-plant CSV models
+        ({directory}/{model_type}_model_{plant_id}.csv, (tb, power) columns) into the registry.
+        Plants already in the registry keep their registry model.
+
+        Args:
+            directory (str): Directory of the CSV models, defaults to models/ewma_models/{model_type}.
+
+        Returns:
+            list: plant IDs (as strings) that were imported.
+        """
+        directory = directory or os.path.join(os.path.dirname(self.path), self.model_type)
+        prefix = f'{self.model_type}_model_'
+        files = {os.path.basename(file)[len(prefix):-len('.csv')]: file
+                 for file in glob.glob(os.path.join(directory, f'{prefix}*.csv'))}
+        if not files:
+            return []
+        with self._lock:
+            self._refresh()
+            known = set(self._index)
+        models = {plant_id: pd.read_csv(file) for plant_id, file in files.items() if plant_id not in known}
+        if models:
+            self.update(models, params={})
+            print(f'Migrated {len(models)} CSV model(s) from {directory} into {self.path}')
+        return list(models)
+
+    def _to_vector(self, model):
+        vector = np.full(BLOCKS_PER_DAY, np.nan)
+        if isinstance(model, pd.DataFrame):
+            tb = model['tb'].to_numpy(dtype=np.int64) - 1
+            vector[tb] = model['power'].to_numpy(dtype=np.float64)
+        else:
+            vector[:] = np.asarray(model, dtype=np.float64)
+        return vector
+
+    def _write(self, models, params, trained_at, version):
+        plant_ids = list(models)
+        header = {
+            'format_version': FORMAT_VERSION,
+            'model_type': self.model_type,
+            'version': version,
+            'written_at': datetime.now().strftime('%Y-%m-%dT%H:%M:%S'),
+            'plant_ids': plant_ids,
+            'params': {plant_id: params.get(plant_id, {}) for plant_id in plant_ids},
+            'trained_at': {plant_id: trained_at.get(plant_id) for plant_id in plant_ids},
+        }
+        header_bytes = json.dumps(header).encode()
+        # pad so that the data section starts on an aligned offset
+        header_len = len(header_bytes) + (-(len(MAGIC) + 8 + len(header_bytes)) % ALIGNMENT)
+        header_bytes = header_bytes.ljust(header_len, b' ')
+        data = np.vstack([models[plant_id] for plant_id in plant_ids]) if plant_ids else np.empty((0, BLOCKS_PER_DAY))
+
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'wb') as file:
+            file.write(MAGIC)
+            file.write(struct.pack('<Q', header_len))
+            file.write(header_bytes)
+            file.write(np.ascontiguousarray(data, dtype='<f8').tobytes())
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(model_type):
+    """Return the process-wide ModelRegistry of a model type, importing legacy CSV models on first use."""
+    with _registries_lock:
+        if model_type not in _registries:
+            registry = ModelRegistry(model_type)
+            registry.import_csv_models()
+            _registries[model_type] = registry
+        return _registries[model_type]
@@ -0,0 +1,272 @@
+# %%
+"""
+Seasonal profile index for week-ahead forecasts.
+
+For every plant the whole processed history is read once and reduced to a
+(day-of-year, tb) profile: the mean power of each block over the days within
+`window_days` of that day of the year, across all years. Days of the year with
+fewer than `min_samples` values in their neighbourhood fall back to the
+profile of their month. Day of year is counted on a leap-year calendar
+(0..365, Feb 29 = 59), so every year maps onto the same rows.
+
+The profiles of all plants are stored in one file, models/seasonal/profiles.seas:
+
+    8 bytes   magic b'SEASIDX1'
+    8 bytes   header length (little-endian uint64)
+    header    JSON (format version, plant ids, build settings), padded to 64 bytes
+    data      float32 array of shape (n_plants, 366, 96), row i = plant_ids[i]
+
+The data section is memory-mapped on read, so a week-ahead forecast is a
+lookup of seven rows per plant and never touches the history again. A rebuild
+writes a temp file that replaces the index with a single os.replace, so
+readers always see a header together with the data it describes.
+
+Run: python -m src.model.seasonal [--plants 42 46] [--forecast]
+"""
+import os
+import json
+import struct
+import argparse
+import threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from src.helper import paths
+from src.helper.settings import get_settings
+from src.helper.support import misc
+from src.data.store import processed_store
+from src.model.ewma import BLOCKS_PER_DAY, pivot_day_tb
+
+MAGIC = b'SEASIDX1'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+DAYS_PER_YEAR = 366
+# first leap-calendar day of year of each month, and the month of each day of year
+MONTH_STARTS = np.cumsum([0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30])
+DOY_MONTH = np.searchsorted(MONTH_STARTS, np.arange(DAYS_PER_YEAR), side='right') - 1
+
+
+def day_of_year(dates):
+    """Leap-calendar day of year (0..365) of each date, Feb 29 is 59 and Mar 1 is always 60."""
+    dates = pd.DatetimeIndex(dates)
+    return MONTH_STARTS[dates.month - 1] + dates.day.to_numpy() - 1
+
+
+def seasonal_profile(values, first_date, window_days=15, min_samples=5):
+    """
+    Seasonal profile of one plant.
+
+    Parameters:
+    - values: float array (days, 96), processed power, NaN where no value
+    - first_date: date of row 0 of `values`
+    - window_days: int, half-width of the day-of-year neighbourhood
+    - min_samples: int, values a neighbourhood needs before the month profile is used instead
+
+    Returns:
+    - profile: float32 array (366, 96), NaN where neither the neighbourhood nor the month has data
+    """
+    doy = day_of_year(pd.date_range(first_date, periods=len(values)))
+    valid = ~np.isnan(values)
+    sums = np.zeros((DAYS_PER_YEAR, BLOCKS_PER_DAY))
+    counts = np.zeros((DAYS_PER_YEAR, BLOCKS_PER_DAY))
+    np.add.at(sums, doy, np.where(valid, values, 0.0))
+    np.add.at(counts, doy, valid)
+
+    # circular moving sums over the +-window_days neighbourhood of every day of year
+    width = 2 * window_days + 1
+    padded = np.concatenate([sums[-window_days:], sums, sums[:window_days]]) if window_days else sums
+    padded_counts = np.concatenate([counts[-window_days:], counts, counts[:window_days]]) if window_days else counts
+    cumsum = np.concatenate([np.zeros((1, BLOCKS_PER_DAY)), np.cumsum(padded, axis=0)])
+    cumcount = np.concatenate([np.zeros((1, BLOCKS_PER_DAY)), np.cumsum(padded_counts, axis=0)])
+    window_sums, window_counts = cumsum[width:] - cumsum[:-width], cumcount[width:] - cumcount[:-width]
+
+    month_sums, month_counts = np.zeros((12, BLOCKS_PER_DAY)), np.zeros((12, BLOCKS_PER_DAY))
+    np.add.at(month_sums, DOY_MONTH, sums)
+    np.add.at(month_counts, DOY_MONTH, counts)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        profile = np.where(window_counts >= min_samples, window_sums / window_counts,
+                           (month_sums / month_counts)[DOY_MONTH])
+    return profile.astype(np.float32)
+
+
+class SeasonalIndex:
+    def __init__(self, root=None, window_days=None, min_samples=None):
+        """
+        Initialize SeasonalIndex.
+
+        Args:
+            root (str): Directory of the index, defaults to models/seasonal.
+            window_days (int): Half-width of the day-of-year neighbourhood,
+                defaults to the `seasonal_window_days` env variable or 15.
+            min_samples (int): Values a neighbourhood needs before the month profile is used,
+                defaults to the `seasonal_min_samples` env variable or 5.
+        """
+        self._root = root
+        self.window_days = int(window_days or os.getenv('seasonal_window_days', 15))
+        self.min_samples = int(min_samples or os.getenv('seasonal_min_samples', 5))
+        self.header = None
+        self._data = None
+        self._index = {}
+        self._stat = None
+        self._lock = threading.Lock()
+
+    @property
+    def root(self):
+        return self._root or os.path.join(paths.MODELS_PATH, 'seasonal')
+
+    @property
+    def path(self):
+        return os.path.join(self.root, 'profiles.seas')
+
+    # ---------- reading ----------
+
+    def _refresh(self):
+        """(Re)map the profiles if the index was rebuilt since it was last loaded."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self.header, self._data, self._index, self._stat = None, None, {}, None
+            return
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if key == self._stat:
+            return
+        with open(self.path, 'rb') as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f'{self.path} is not a seasonal profile index')
+            header_len = struct.unpack('<Q', file.read(8))[0]
+            header = json.loads(file.read(header_len).rstrip(b' ').decode())
+        offset = len(MAGIC) + 8 + header_len
+        n_plants = len(header['plant_ids'])
+        data = np.memmap(self.path, dtype='<f4', mode='r', offset=offset, shape=(n_plants, DAYS_PER_YEAR, BLOCKS_PER_DAY)) \
+            if n_plants else np.empty((0, DAYS_PER_YEAR, BLOCKS_PER_DAY), dtype=np.float32)
+        self.header, self._data, self._stat = header, data, key
+        self._index = {plant_id: i for i, plant_id in enumerate(header['plant_ids'])}
+
+    def plant_ids(self):
+        with self._lock:
+            self._refresh()
+            return list(self._index)
+
+    def lookup(self, plant_ids, dates):
+        """
+        Profiles of several plants for several dates.
+
+        Returns:
+        - found: list of plant IDs that have a profile, in the order of the rows
+        - profiles: float64 array (len(found), len(dates), 96)
+        """
+        doy = day_of_year(dates)
+        with self._lock:
+            self._refresh()
+            rows = [(plant_id, self._index[str(plant_id)]) for plant_id in plant_ids if str(plant_id) in self._index]
+            if not rows:
+                return [], np.empty((0, len(doy), BLOCKS_PER_DAY))
+            profiles = self._data[[i for _, i in rows]][:, doy].astype(np.float64)
+        return [plant_id for plant_id, _ in rows], profiles
+
+    # ---------- building ----------
+
+    def build_plant(self, plant_id):
+        """Read a plant's whole processed history once and reduce it to its seasonal profile, None if no data."""
+        try:
+            data = processed_store.read(plant_id, columns=['datetime', 'power', 'tb'])
+        except FileNotFoundError:
+            data = None
+        if data is None or data.empty:
+            print(f"Data for plant ID {plant_id} not found. Skipping...")
+            return None
+        first_date = pd.Timestamp(data['datetime'].min()).normalize()
+        n_days = (pd.Timestamp(data['datetime'].max()).normalize() - first_date).days + 1
+        values = pivot_day_tb(data['datetime'], data['tb'], data['power'], first_date, n_days)[0]
+        return seasonal_profile(values, first_date, self.window_days, self.min_samples)
+
+    def build(self, plant_ids):
+        """
+        Build the profiles of the given plants, keep those of the other plants, and
+        atomically replace the index.
+
+        Returns:
+        - built: list of plant IDs whose profile was (re)built
+        """
+        profiles = {}
+        for plant_id in plant_ids:
+            profile = self.build_plant(plant_id)
+            if profile is not None:
+                profiles[str(plant_id)] = profile
+        with self._lock:
+            self._refresh()
+            existing = {plant_id: np.array(self._data[i]) for plant_id, i in self._index.items()}
+            existing.update(profiles)
+            self._write(existing)
+            self._stat = None
+        print(f'Seasonal profiles built for {len(profiles)} plants')
+        return [plant_id for plant_id in plant_ids if str(plant_id) in profiles]
+
+    def _write(self, profiles):
+        os.makedirs(self.root, exist_ok=True)
+        plant_ids = list(profiles)
+        data = np.stack([profiles[plant_id] for plant_id in plant_ids]) if plant_ids \
+            else np.empty((0, DAYS_PER_YEAR, BLOCKS_PER_DAY), dtype=np.float32)
+        header = {
+            'format_version': FORMAT_VERSION,
+            'plant_ids': plant_ids,
+            'window_days': self.window_days,
+            'min_samples': self.min_samples,
+            'built_at': datetime.now().strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        header_bytes = json.dumps(header).encode()
+        # pad so that the data section starts on an aligned offset
+        header_len = len(header_bytes) + (-(len(MAGIC) + 8 + len(header_bytes)) % ALIGNMENT)
+        header_bytes = header_bytes.ljust(header_len, b' ')
+
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'wb') as file:
+            file.write(MAGIC)
+            file.write(struct.pack('<Q', header_len))
+            file.write(header_bytes)
+            file.write(np.ascontiguousarray(data, dtype='<f4').tobytes())
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_seasonal_index():
+    """Return the process-wide SeasonalIndex."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SeasonalIndex()
+        return _index
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Build the seasonal profile index used by week-ahead forecasts.')
+    parser.add_argument('--plants', nargs='*', help="plant IDs (or 'aggregated'), defaults to all solar plants")
+    parser.add_argument('--forecast', action='store_true', help='also write a week-ahead forecast to WA_FORECAST_PATH')
+    return parser.parse_args()
+
+
+# %%
+if __name__ == '__main__':
+    from src.helper.support import revisions
+    from src.model.predict import EMWA_Predict
+
+    args = parse_args()
+    get_settings()
+    if args.plants:
+        plant_ids = [plant_id if plant_id == 'aggregated' else int(plant_id) for plant_id in args.plants]
+    else:
+        plant_ids = misc().get_solar_plant_ids() + ['aggregated']
+
+    built = get_seasonal_index().build(plant_ids)
+    if args.forecast:
+        predictor = EMWA_Predict()
+        revision = revisions(misc().prediction_date_and_time()).day_ahead_revision()
+        df_pred = predictor.predict_week_ahead(built, revision, owner_id=os.getenv('owner_id'))
+        print(f'Week-ahead forecast written to {predictor.save_week_ahead(df_pred)}')
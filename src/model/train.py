@@ -3,25 +3,50 @@ import numpy as np
 from datetime import timedelta, datetime
 import os
 
-from src.helper.paths import MODELS_PATH, PROCESSED_DATA_PATH
-from src.helper.utils import load_pickle
-
-# set timezone
-import time
-os.environ['TZ'] = 'Asia/Calcutta'
-time.tzset()
+from src.helper.settings import get_settings
+from src.data.store import processed_store
+from src.helper.executors import run_parallel
+from src.model.registry import get_registry
+from src.model.ewma import BLOCKS_PER_DAY, pivot_day_tb, ewma_last, blend_recent
+from src.model.params import get_plant_params
 
 class EMWA_Train:
     def __init__(self):
+        get_settings()
         self.model = None
     
-    def train_model(self, plant_id, model_type, days: int = 9, alpha: float = 0.3, tbs: int = 5, weight_recent: float = 0.7):
-        
+    def train_model(self, plant_id, model_type, days: int = None, alpha: float = None, tbs: int = None, weight_recent: float = None):
+        """
+        Train the EWMA model of a plant and save it to the registry. Parameters left as None
+        come from the plant's tuned config (src.model.params), falling back to days=9,
+        alpha=0.3, tbs=5, weight_recent=0.7.
+        """
+        fitted = self.fit_model(plant_id, model_type, days, alpha, tbs, weight_recent)
+        if fitted is None:
+            return False
+        self.model, params = fitted
+
+        # Save the model
+        self.save_model(plant_id, model_type, self.model, params=params)
+
+        print(f"Model for plant {plant_id} has been trained using days={params['days']} and alpha={params['alpha']}.")
+        return True
+
+    def fit_model(self, plant_id, model_type, days: int = None, alpha: float = None, tbs: int = None, weight_recent: float = None):
+        """
+        Fit the EWMA model of a plant without saving it.
+
+        Returns:
+        - (model, params): (tb, power) model DataFrame and the parameters used, or None if the plant has no data
+        """
+        params = get_plant_params(plant_id, model_type, {'days': days, 'alpha': alpha, 'tbs': tbs, 'weight_recent': weight_recent})
+        days, alpha, tbs, weight_recent = params['days'], params['alpha'], params['tbs'], params['weight_recent']
         try:
-            self.model_path = os.path.join(MODELS_PATH, 'ewma_models', f'{model_type}')
-            
-            # Load processed plant data
-            data = load_pickle(PROCESSED_DATA_PATH, f'processed_solar_plant_{plant_id}')
+            # Load only the last `days` days of processed plant data
+            last_datetime = processed_store.last_timestamp(plant_id)
+            if last_datetime is None:
+                raise FileNotFoundError(plant_id)
+            data = processed_store.read(plant_id, start=last_datetime.normalize() - timedelta(days=days))
         
             # Ensure datetime column is in datetime format
             data['datetime'] = pd.to_datetime(data['datetime'])
@@ -49,18 +74,134 @@ class EMWA_Train:
                     (1 - weight_recent) * ewma_days['power'] + weight_recent * ewma_recent,
                     ewma_days['power']
                     )
-                
-            # Store the model (EWMA power for each time block)
-            self.model = ewma_days
-            
-            # Ensure the directory exists
-            os.makedirs(self.model_path, exist_ok=True)
-            
-            # Save the model
-            self.model.to_csv(os.path.join(self.model_path, f'{model_type}_model_{plant_id}.csv'), index=False)
-            
-            print(f"Model for plant {plant_id} has been trained using days={days} and alpha={alpha}.")
+            return ewma_days, params
         
         except FileNotFoundError:
             print(f"Model for {plant_id}' not found. Skipping...")
-    
\ No newline at end of file
+            return None
+
+    def save_model(self, plant_id, model_type, model_df, params=None):
+        """Save the (tb, power) model of a plant into the model registry of `model_type`."""
+        get_registry(model_type).update({plant_id: model_df}, params=params)
+
+    def train_models_batch(self, plant_ids, model_type, days: int = None, alpha: float = None, tbs: int = None, weight_recent: float = None,
+                           frames=None):
+        """
+        Train the EWMA models of all plants in one vectorized pass per parameter set.
+
+        The last `days` days of every plant are pivoted into one (plant, day, tb) array
+        and the final EWMA value of every plant and block is computed in closed form
+        (see src.model.ewma.ewma_last). Produces the same models as train_model.
+
+        Parameters:
+        - plant_ids: list of plant IDs
+        - model_type: str, 'intraday' or 'day_ahead'
+        - days, alpha, tbs, weight_recent: same as train_model, None takes each plant's tuned value
+        - frames: dict or None, plant_id -> processed data already held in memory (covering at
+          least the last `days` days); plants not in it are read from the processed store
+
+        Returns:
+        - models: dict, plant IDs as keys and (tb, power) model DataFrames as values
+        """
+        overrides = {'days': days, 'alpha': alpha, 'tbs': tbs, 'weight_recent': weight_recent}
+        groups = {}
+        for plant_id in plant_ids:
+            params = get_plant_params(plant_id, model_type, overrides)
+            groups.setdefault(tuple(sorted(params.items())), []).append(plant_id)
+
+        models, plant_params = {}, {}
+        for params, group in groups.items():
+            params = dict(params)
+            group_models = self._train_group(group, frames, **params)
+            models.update(group_models)
+            plant_params.update({plant_id: params for plant_id in group_models})
+        if not models:
+            return {}
+
+        # Write all models in a single registry swap
+        get_registry(model_type).update(models, plant_params=plant_params)
+        if len(groups) == 1:
+            params = plant_params[next(iter(models))]
+            print(f"Models for {len(models)} plants have been trained using days={params['days']} and alpha={params['alpha']}.")
+        else:
+            print(f"Models for {len(models)} plants have been trained using {len(groups)} parameter sets.")
+        return models
+
+    def _train_group(self, plant_ids, frames, days, alpha, tbs, weight_recent):
+        """Vectorized training of plants sharing one parameter set, see train_models_batch."""
+        preloaded, frames = frames or {}, {}
+        for plant_id in plant_ids:
+            data = preloaded.get(plant_id)
+            # in-memory frames are used if they reach back far enough for this parameter set
+            if data is not None and not data.empty and \
+                    data['datetime'].min() <= data['datetime'].max().normalize() - timedelta(days=days):
+                frames[plant_id] = data
+                continue
+            last_datetime = processed_store.last_timestamp(plant_id)
+            if last_datetime is None:
+                print(f"Model for {plant_id}' not found. Skipping...")
+                continue
+            frames[plant_id] = processed_store.read(
+                plant_id, start=last_datetime.normalize() - timedelta(days=days), columns=['datetime', 'power', 'tb']
+            )
+        if not frames:
+            return {}
+
+        n_plants, n_days = len(frames), days + 1
+        values = np.full((n_plants, n_days, BLOCKS_PER_DAY), np.nan)
+        present = np.zeros((n_plants, n_days, BLOCKS_PER_DAY), dtype=bool)
+        recent_mean = np.full(n_plants, np.nan)
+        use_recent = np.zeros(n_plants, dtype=bool)
+        recent_cutoff = datetime.now() + timedelta(hours = -2.5)
+
+        for i, data in enumerate(frames.values()):
+            last_datetime = data['datetime'].max()
+            start_date = last_datetime.normalize() - timedelta(days=days)
+            values[i], present[i] = pivot_day_tb(data['datetime'], data['tb'], data['power'], start_date, n_days)
+            recent_mean[i] = data['power'].tail(tbs).mean()
+            use_recent[i] = last_datetime > recent_cutoff
+
+        ewma = ewma_last(values, alpha)
+        ewma = np.where(use_recent[:, None], blend_recent(ewma, recent_mean, weight_recent), ewma)
+        tb_present = present.any(axis=1)
+
+        models = {}
+        blocks = np.arange(1, BLOCKS_PER_DAY + 1)
+        for i, plant_id in enumerate(frames):
+            models[plant_id] = pd.DataFrame({'tb': blocks[tb_present[i]], 'power': ewma[i][tb_present[i]]})
+        return models
+
+    def train_single_plant(self, plant_id, model_type, **params):
+        """
+        Fit one plant and return (plant_id, (model, params)), or (plant_id, None) on failure.
+        The model is not saved here, so that train_multiple_plants writes the registry once.
+        """
+        try:
+            return plant_id, self.fit_model(plant_id, model_type, **params)
+        except Exception as e:
+            print(f"An error occurred while training plant ID {plant_id}: {e}. Skipping...")
+            return plant_id, None
+
+    def train_multiple_plants(self, plant_ids, model_type, backend=None, max_workers=None, **params):
+        """
+        Train models for multiple plants in parallel and save them in a single registry write.
+
+        Parameters:
+        - plant_ids: list of plant IDs
+        - model_type: str, 'intraday' or 'day_ahead'
+        - backend: str or None, 'threads', 'processes' or 'serial' (defaults to env `executor_backend`)
+        - max_workers: int or None, number of workers
+        - params: training parameters passed to fit_model
+
+        Returns:
+        - trained: dict, plant IDs as keys and True/False as values
+        """
+        models, plant_params, trained = {}, {}, {}
+        for plant_id, fitted in run_parallel(self.train_single_plant, plant_ids, backend, max_workers, model_type=model_type, **params):
+            trained[plant_id] = fitted is not None
+            if fitted is not None:
+                models[plant_id], plant_params[plant_id] = fitted
+        if models:
+            get_registry(model_type).update(models, plant_params=plant_params)
+            print(f"Models for {len(models)} plants have been trained.")
+        return trained
@@ -0,0 +1,231 @@
+# %%
+"""
+Grid search of the EWMA training parameters per plant.
+
+For every plant the processed history is loaded once into a (day, tb) array and
+every grid point is scored on it with the in-memory backtest
+(src.model.backtest), plants are spread over a process pool, and the
+parameters with the lowest NMAE per model type are written to
+config/ewma_params.json, which EMWA_Train reads.
+
+Scores are cached per plant and day together with a fingerprint of the data
+the day's score depends on (including the plant AVC), so a rerun only scores
+days that are new or whose data or capacity changed.
+
+Run: python -m src.model.tuning START_DATE END_DATE [--plants 42 46] [--backend processes] [--no-save]
+"""
+import os
+import argparse
+import hashlib
+import itertools
+import json
+import time
+import numpy as np
+import pandas as pd
+
+from src.helper import paths
+from src.helper.settings import get_settings
+from src.helper.support import misc
+from src.helper.executors import run_parallel
+from src.model.backtest import EWMABacktest, load_history
+from src.model.params import DEFAULT_PARAMS, save_plant_params
+
+MODEL_TYPES = ('intraday', 'day_ahead')
+DEFAULT_GRID = {
+    'days': [5, 7, 9, 12],
+    'alpha': [0.1, 0.2, 0.3, 0.5],
+    'tbs': [3, 5, 8],
+    'weight_recent': [0.5, 0.7, 0.9],
+}
+
+
+def grid_points(grid):
+    """All parameter combinations of a grid, as a list of dicts in a fixed order."""
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def grid_key(grid, backtest):
+    """Identifier of a grid and the backtest settings, cached scores are only reused for the same key."""
+    settings = {'grid': {key: list(grid[key]) for key in sorted(grid)}, 'live': backtest.live,
+                'day_ahead_block': backtest.day_ahead_block}
+    return hashlib.blake2b(json.dumps(settings, sort_keys=True).encode(), digest_size=8).hexdigest()
+
+
+def day_fingerprints(values, avc, first_day, lookback_days):
+    """
+    Fingerprint of the data each scored day depends on: the day itself, `lookback_days` days before it and the
+    plant AVC the forecasts are clipped at.
+    """
+    avc_bytes = np.float64(avc).tobytes()
+    return [
+        hashlib.blake2b(np.ascontiguousarray(values[max(day - lookback_days, 0):day + 1]).tobytes() + avc_bytes,
+                        digest_size=8).hexdigest()
+        for day in range(first_day, len(values))
+    ]
+
+
+class ScoreCache:
+    def __init__(self, root=None):
+        """
+        Per-plant cache of daily grid scores, one .npz file per plant.
+
+        Args:
+            root (str): Directory of the cache files, defaults to models/tuning_cache.
+        """
+        self._root = root
+
+    @property
+    def root(self):
+        return self._root or os.path.join(paths.MODELS_PATH, 'tuning_cache')
+
+    def _file_path(self, plant_id):
+        return os.path.join(self.root, f'plant={plant_id}.npz')
+
+    def load(self, plant_id, key):
+        """Return {date: (fingerprint, scores)} of a plant for grid `key`, empty if none cached."""
+        file_path = self._file_path(plant_id)
+        if not os.path.exists(file_path):
+            return {}
+        with np.load(file_path) as cache:
+            if str(cache['key']) != key:
+                return {}
+            return {date: (fingerprint, scores) for date, fingerprint, scores in
+                    zip(cache['dates'], cache['fingerprints'], cache['scores'])}
+
+    def save(self, plant_id, key, entries):
+        """Atomically write {date: (fingerprint, scores)} of a plant."""
+        os.makedirs(self.root, exist_ok=True)
+        dates = sorted(entries)
+        file_path = self._file_path(plant_id)
+        tmp_path = f'{file_path}.tmp.npz'
+        np.savez(tmp_path, key=np.array(key), dates=np.array(dates),
+                 fingerprints=np.array([entries[date][0] for date in dates]),
+                 scores=np.stack([entries[date][1] for date in dates]))
+        os.replace(tmp_path, file_path)
+
+
+def tune_plant(plant_id, start_date, end_date, grid=None, model_types=MODEL_TYPES, use_cache=True):
+    """
+    Score every grid point on one plant and pick the best parameters per model type.
+
+    Parameters:
+    - plant_id: int or 'aggregated', plant ID
+    - start_date, end_date: first and last date (inclusive) to score
+    - grid: dict, parameter -> list of values (defaults to DEFAULT_GRID)
+    - model_types: tuple of model types to tune
+    - use_cache: bool, reuse the scores of days whose data did not change
+
+    Returns:
+    - plant_id: plant ID
+    - result: dict, model_type -> {'params', 'nmae', 'default_nmae', 'n'}, None if the plant has no data
+    """
+    get_settings()
+    grid = grid or DEFAULT_GRID
+    points = grid_points(grid)
+    backtest = EWMABacktest()
+    lookback_days = max(grid['days']) + 2
+    history = load_history([plant_id], start_date, end_date, lookback_days)
+    if not history['plant_ids']:
+        return plant_id, None
+
+    values, avc = history['values'][0], history['avc'][0]
+    first_day = history['n_history']
+    dates = list(pd.date_range(history['start_date'], periods=len(values))[first_day:].strftime('%Y-%m-%d'))
+    fingerprints = day_fingerprints(values, avc, first_day, lookback_days)
+
+    cache, key = ScoreCache(), grid_key(grid, backtest)
+    cached = cache.load(plant_id, key) if use_cache else {}
+    stale = [i for i, date in enumerate(dates) if date not in cached or cached[date][0] != fingerprints[i]]
+
+    # scores: (days, grid points, model types, [abs error sum, count])
+    scores = np.zeros((len(dates), len(points), len(MODEL_TYPES), 2))
+    for i, date in enumerate(dates):
+        if date in cached:
+            scores[i] = cached[date][1]
+    if stale:
+        # score only from the first stale day on, with the history its window needs
+        offset = first_day + stale[0]
+        window = values[offset - lookback_days:]
+        for j, params in enumerate(points):
+            # all model types are scored so that the cache is complete whatever is being tuned
+            errors = backtest.daily_errors(window, avc, lookback_days, MODEL_TYPES, **params)
+            for t, model_type in enumerate(MODEL_TYPES):
+                scores[stale[0]:, j, t] = errors[model_type]
+        if use_cache:
+            cached.update({date: (fingerprints[i], scores[i]) for i, date in enumerate(dates)})
+            cache.save(plant_id, key, cached)
+
+    totals = scores.sum(axis=0)
+    scale = avc if np.isfinite(avc) else np.nanmax(values[first_day:])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        nmae = np.where(totals[..., 1] > 0, 100 * totals[..., 0] / (totals[..., 1] * scale), np.inf)
+
+    default_index = next((j for j, params in enumerate(points) if params == DEFAULT_PARAMS), None)
+    result = {}
+    for t, model_type in enumerate(MODEL_TYPES):
+        if model_type not in model_types or not np.isfinite(nmae[:, t]).any():
+            continue
+        best = int(np.argmin(nmae[:, t]))
+        result[model_type] = {
+            'params': points[best],
+            'nmae': float(nmae[best, t]),
+            'default_nmae': float(nmae[default_index, t]) if default_index is not None else None,
+            'n': int(totals[best, t, 1]),
+        }
+    print(f'Tuned plant-id {plant_id}: {len(stale)} of {len(dates)} day(s) scored')
+    return plant_id, result
+
+
+def tune_plants(plant_ids, start_date, end_date, grid=None, model_types=MODEL_TYPES, backend='processes',
+                max_workers=None, save=True):
+    """
+    Tune many plants in parallel and (optionally) write the chosen parameters to the config.
+
+    Returns:
+    - summary: DataFrame with plant_id, model_type, nmae, default_nmae, n and the chosen parameters
+    """
+    rows, chosen = [], {model_type: {} for model_type in model_types}
+    for plant_id, result in run_parallel(tune_plant, plant_ids, backend, max_workers,
+                                         start_date=start_date, end_date=end_date, grid=grid, model_types=model_types):
+        if result is None:
+            print(f"Data for plant ID {plant_id} not found. Skipping...")
+            continue
+        for model_type, best in result.items():
+            chosen[model_type][plant_id] = best['params']
+            rows.append({'plant_id': plant_id, 'model_type': model_type, 'nmae': best['nmae'],
+                         'default_nmae': best['default_nmae'], 'n': best['n'], **best['params']})
+
+    if save:
+        for model_type, plant_params in chosen.items():
+            if plant_params:
+                save_plant_params(model_type, plant_params)
+    columns = ['plant_id', 'model_type', 'nmae', 'default_nmae', 'n'] + sorted(DEFAULT_PARAMS)
+    return pd.DataFrame(rows, columns=columns)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Grid search of the EWMA parameters per plant.')
+    parser.add_argument('start_date', help="first date to score ('%%Y-%%m-%%d')")
+    parser.add_argument('end_date', help="last date to score ('%%Y-%%m-%%d')")
+    parser.add_argument('--plants', nargs='*', help="plant IDs (or 'aggregated'), defaults to all solar plants")
+    parser.add_argument('--backend', default='processes', help="'processes', 'threads' or 'serial'")
+    parser.add_argument('--workers', type=int, help='number of workers')
+    parser.add_argument('--no-save', action='store_true', help='only report, do not update the parameter config')
+    return parser.parse_args()
+
+
+# %%
+if __name__ == '__main__':
+    args = parse_args()
+    get_settings()
+    if args.plants:
+        plant_ids = [plant_id if plant_id == 'aggregated' else int(plant_id) for plant_id in args.plants]
+    else:
+        plant_ids = misc().get_solar_plant_ids()
+
+    start = time.perf_counter()
+    summary = tune_plants(plant_ids, args.start_date, args.end_date, backend=args.backend,
+                          max_workers=args.workers, save=not args.no_save)
+    print(summary.to_string(index=False))
+    print(f'Tuned {summary.plant_id.nunique()} plants in {time.perf_counter() - start:.2f} s')
@@ -0,0 +1,209 @@
+"""
+Very-short-term (VSTF) forecasts of the next few 15-minute blocks.
+
+For every horizon h = 1..H a small ridge regression per plant maps the
+features at the last observed block t to power(t + h):
+
+    1, power(t), power(t - 1), power(t - 2), rolling mean over 3 h,
+    power(t + h - 96)  (same block yesterday)
+
+The features are FeatureEngineer's lag and rolling features, computed on the
+last `window_days` days of the live tail. All plants are right-aligned on
+their last observed block into one (plant, block) array, so building the
+features, fitting the regressions (one batched linear solve) and forecasting
+is a single vectorized pass over all plants.
+
+Forecasts are anchored on the issue time: they cover the `horizon` blocks from
+the block of prediction_datetime on. A plant whose last observed block lags
+behind gets the matching longer horizons; a plant whose data is more than
+`horizon` blocks old (or newer than the issue block) is skipped.
+"""
+
+import os
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+
+from src.helper import paths
+from src.helper.support import misc, revisions
+from src.features.feature_engg import lag_matrix, rolling_mean_std, ROWS_PER_HOUR
+from src.features.sun_blocks import get_sun_block_estimator
+from src.features.time_features import time_block
+from src.data.store import processed_store
+
+BLOCKS_PER_DAY = 96
+RECENT_LAGS = [0, 1, 2]
+ROLLING_HOURS = 3
+
+
+class VSTFEngine:
+    def __init__(self, horizon=None, window_days=None, ridge=1e-2, min_rows=48):
+        """
+        Initialize VSTFEngine.
+
+        Args:
+            horizon (int): Number of blocks forecast after the last observed block,
+                defaults to the `vstf_horizon` env variable or 4.
+            window_days (int): Days of the tail the regressions are fitted on,
+                defaults to the `vstf_window_days` env variable or 3.
+            ridge (float): L2 penalty of the regressions (on capacity-normalized power).
+            min_rows (int): Fitting rows a plant needs, plants with fewer fall back to persistence.
+        """
+        self.horizon = int(horizon or os.getenv('vstf_horizon', 4))
+        self.window_days = int(window_days or os.getenv('vstf_window_days', 3))
+        self.ridge = ridge
+        self.min_rows = min_rows
+        self.n_features = 1 + len(RECENT_LAGS) + 2
+
+    @property
+    def n_blocks(self):
+        """Length of the aligned series: the fitting window plus the lookback of the seasonal lag."""
+        return self.window_days * BLOCKS_PER_DAY + BLOCKS_PER_DAY
+
+    def load_tails(self, plant_ids):
+        """Read the short window of every plant needed by forecast() from the processed store."""
+        tails = {}
+        for plant_id in plant_ids:
+            last_datetime = processed_store.last_timestamp(plant_id)
+            if last_datetime is None:
+                print(f"Data for plant ID {plant_id} not found. Skipping...")
+                continue
+            start = last_datetime - timedelta(minutes=15 * self.n_blocks)
+            tails[plant_id] = processed_store.read(plant_id, start=start, columns=['datetime', 'power', 'tb'])
+        return tails
+
+    def align(self, tails):
+        """
+        Right-align the tails on each plant's last observed block.
+
+        Returns:
+        - plant_ids: list of plants with an observed block
+        - origins: DatetimeIndex, last observed block of each plant
+        - power: float64 array (plants, n_blocks), column -1 is the origin, NaN where no value
+        """
+        plant_ids, origins, rows = [], [], []
+        for plant_id, df in tails.items():
+            datetimes = df['datetime'].to_numpy(dtype='datetime64[ns]')
+            power = df['power'].to_numpy(dtype=np.float64)
+            observed = ~np.isnan(power)
+            if not observed.any():
+                continue
+            datetimes, power = datetimes[observed], power[observed]
+            origin = datetimes.max()
+            position = self.n_blocks - 1 - ((origin - datetimes) // np.timedelta64(15, 'm')).astype(np.int64)
+            keep = position >= 0
+            row = np.full(self.n_blocks, np.nan)
+            row[position[keep]] = power[keep]
+            plant_ids.append(plant_id)
+            origins.append(origin)
+            rows.append(row)
+        return plant_ids, pd.DatetimeIndex(origins), np.array(rows).reshape(len(plant_ids), self.n_blocks)
+
+    def features(self, power, h):
+        """Feature array (plants, n_blocks, n_features) for horizon h at every block."""
+        lags = lag_matrix(power, RECENT_LAGS + [BLOCKS_PER_DAY - h])
+        rolling_mean, _ = rolling_mean_std(power, ROWS_PER_HOUR * ROLLING_HOURS)
+        ones = np.ones(power.shape + (1,))
+        return np.concatenate([ones, lags[..., :-1], rolling_mean[..., None], lags[..., -1:]], axis=-1)
+
+    def fit_predict(self, power, horizon=None):
+        """
+        Fit the per-plant, per-horizon regressions on normalized power and forecast.
+
+        Parameters:
+        - power: float64 array (plants, n_blocks), normalized power aligned by align()
+        - horizon: int, number of blocks forecast after the last observed block, defaults to self.horizon
+
+        Returns:
+        - forecast: float64 array (plants, horizon), normalized power
+        """
+        horizon = horizon or self.horizon
+        n_plants = power.shape[0]
+        forecast = np.full((n_plants, horizon), np.nan)
+        penalty = self.ridge * np.eye(self.n_features)
+        penalty[0, 0] = 0.0
+        for h in range(1, horizon + 1):
+            X = self.features(power, h)
+            # fitting rows: blocks t with a known target power(t + h) and complete features
+            X_fit, y = X[:, :-h], power[:, h:]
+            mask = ~np.isnan(y) & ~np.isnan(X_fit).any(axis=-1)
+            X_fit = np.where(mask[..., None], X_fit, 0.0)
+            y = np.where(mask, y, 0.0)
+            # only plants with enough fitting rows are solved, the unpenalized intercept
+            # makes A singular for a plant without any (e.g. less than a day of tail)
+            enough = mask.sum(axis=1) >= self.min_rows
+            coef = np.zeros((n_plants, self.n_features))
+            if enough.any():
+                A = np.einsum('pnf,png->pfg', X_fit[enough], X_fit[enough]) + penalty
+                b = np.einsum('pnf,pn->pf', X_fit[enough], y[enough])
+                coef[enough] = np.linalg.solve(A, b[..., None])[..., 0]
+
+            x_now = X[:, -1]
+            prediction = np.einsum('pf,pf->p', np.nan_to_num(x_now), coef)
+            # persistence where a plant has too little data or incomplete current features
+            fallback = ~enough | np.isnan(x_now).any(axis=1)
+            forecast[:, h - 1] = np.where(fallback, power[:, -1], prediction)
+        return forecast
+
+    def forecast(self, tails, prediction_datetime, owner_id=None):
+        """
+        Forecast the `horizon` blocks from the block of the issue time on, for all plants.
+
+        Parameters:
+        - tails: dict, plant_id -> processed frame ('datetime', 'power', 'tb') covering at least
+          `window_days` + 1 days (e.g. ForecastDaemon.tails or load_tails())
+        - prediction_datetime: datetime, issue time, gives the first target block and the VSTF revision
+        - owner_id: owner ID, either one value for all plants or a {plant_id: owner_id} dict
+
+        Returns:
+        - df_pred: DataFrame with columns owner_id, plant_id, datetime, revision, forecast
+        """
+        columns = ['owner_id', 'plant_id', 'datetime', 'revision', 'forecast']
+        plant_ids, origins, power = self.align(tails)
+
+        # blocks from each plant's last observed block to the issue block, the first target
+        issue = pd.Timestamp(prediction_datetime).floor('15min').to_datetime64().astype('datetime64[ns]')
+        shift = ((issue - origins.to_numpy()) // np.timedelta64(15, 'm')).astype(np.int64)
+        fresh = (shift >= 1) & (shift <= self.horizon)
+        for plant_id, lag in zip(plant_ids, shift):
+            if not 1 <= lag <= self.horizon:
+                print(f"Last observed block of plant-id {plant_id} is {lag - 1} blocks before the issue block. Skipping...")
+        plant_ids, shift, power = [plant_id for plant_id, keep in zip(plant_ids, fresh) if keep], shift[fresh], power[fresh]
+        if not plant_ids:
+            return pd.DataFrame(columns=columns)
+
+        # normalize by capacity so that one ridge penalty suits all plants, the aggregate by the total capacity
+        avc_map = misc().get_avc_map()
+        total_avc = sum(avc_map.values())
+        scale = np.array([avc_map.get(int(plant_id), np.nan) if plant_id != 'aggregated' else total_avc for plant_id in plant_ids])
+        scale = np.where(np.isfinite(scale) & (scale > 0), scale, np.nanmax(np.where(np.isnan(power), 0.0, power), axis=1))
+        scale = np.where(scale > 0, scale, 1.0)
+        forecast = self.fit_predict(power / scale[:, None], shift.max() + self.horizon - 1)
+        forecast = np.take_along_axis(forecast, shift[:, None] - 1 + np.arange(self.horizon), axis=1) * scale[:, None]
+
+        targets = np.broadcast_to(issue + np.arange(self.horizon) * np.timedelta64(15, 'm'), forecast.shape)
+        # no generation outside the plant's sunrise/sunset blocks, nor above capacity
+        estimator = get_sun_block_estimator()
+        sun = np.array([estimator.estimate(tails[plant_id], plant_id) for plant_id in plant_ids])
+        tb = time_block(targets.ravel()).reshape(targets.shape)
+        daylight = (tb >= sun[:, :1]) & (tb <= sun[:, 1:])
+        forecast = np.clip(np.where(daylight, forecast, 0.0), 0.0, scale[:, None]).round(2)
+
+        revision = revisions(prediction_datetime).vstf_revision()
+        owners = [owner_id.get(plant_id) for plant_id in plant_ids] if isinstance(owner_id, dict) else [owner_id] * len(plant_ids)
+        df_pred = pd.DataFrame({
+            'owner_id': np.repeat(np.array(owners, dtype=object), self.horizon),
+            'plant_id': np.repeat(np.array(plant_ids, dtype=object), self.horizon),
+            'datetime': targets.ravel(),
+            'revision': revision,
+            'forecast': forecast.ravel(),
+        })
+        print(f'VSTF prediction done for {len(plant_ids)} plants')
+        return df_pred[columns]
+
+    def save_forecast(self, df_pred, prediction_datetime):
+        """Write a VSTF forecast to VSTF_FORECAST_PATH/vstf_forecast_{YYYYmmdd_HHMM}.csv and return the path."""
+        os.makedirs(paths.VSTF_FORECAST_PATH, exist_ok=True)
+        file_path = os.path.join(paths.VSTF_FORECAST_PATH, f'vstf_forecast_{prediction_datetime:%Y%m%d_%H%M}.csv')
+        df_pred.to_csv(file_path, index=False)
+        return file_path
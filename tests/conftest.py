@@ -0,0 +1,39 @@
+"""
+Shared test setup.
+
+The project directory (models, data, forecasts, config) is pointed at a
+temporary directory before any src module resolves its paths, so tests never
+touch a real deployment.
+"""
+
+import os
+import sys
+import tempfile
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['PROJECT_DIR'] = tempfile.mkdtemp(prefix='solar-forecast-tests-')
+
+
+@pytest.fixture
+def plant_info():
+    """
+    Write a solar plant metadata snapshot and return a function to replace it.
+
+    Usage: plant_info({plant_id: avc, ...}). The process-wide plant cache is reset
+    so the snapshot is picked up.
+    """
+    from src.helper import paths, plant_cache
+    from src.helper.utils import save_pickle
+
+    def write(avc_by_plant):
+        df = pd.DataFrame({'plant_id': list(avc_by_plant), 'avc': [float(avc) for avc in avc_by_plant.values()],
+                           'plant_type': 'Solar'})
+        save_pickle(df, paths.CONFIG_PATH, plant_cache.SNAPSHOT_NAME)
+        plant_cache._cache = None
+        return df
+
+    yield write
+    plant_cache._cache = None
@@ -0,0 +1,140 @@
+import asyncio
+import functools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('aiohttp')
+
+from src.data.async_load_data import AsyncDataPrep
+from src.data.load_data import DataPrep
+
+LATENCY = 0.05
+FAILING_PLANT = '13'
+RANGE_IGNORING_PLANT = '7'
+
+
+@functools.lru_cache(maxsize=None)
+def _body(from_date, to_date):
+    """getActual response of 96 blocks per day, cached so the stub spends its time in LATENCY, not in building rows."""
+    datetimes = pd.date_range(from_date, pd.Timestamp(to_date) + pd.Timedelta(hours=23, minutes=45), freq='15min')
+    rows = [{'utc_datetime': dt.strftime('%Y-%m-%d %H:%M:%S'), 'generation': 1.5} for dt in datetimes]
+    return json.dumps({'data': rows}).encode()
+
+
+class StubREMCHandler(BaseHTTPRequestHandler):
+    """
+    getActual stub: 96 blocks per requested day after a fixed latency, 500 for
+    FAILING_PLANT, and only the first day of a range for RANGE_IGNORING_PLANT.
+    """
+
+    def do_POST(self):
+        time.sleep(LATENCY)
+        params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        if params.get('plant_id') == FAILING_PLANT:
+            self.send_response(500)
+            self.end_headers()
+            self.wfile.write(b'internal error')
+            return
+        from_date = params.get('from_date', params.get('date'))
+        to_date = from_date if params.get('plant_id') == RANGE_IGNORING_PLANT else params.get('to_date', from_date)
+        body = _body(from_date, to_date)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubREMCServer(ThreadingHTTPServer):
+    # the default listen backlog (5) drops connections when many requests start at once
+    request_queue_size = 128
+    daemon_threads = True
+
+
+@pytest.fixture(scope='module')
+def stub_server():
+    server = StubREMCServer(('127.0.0.1', 0), StubREMCHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/'
+    server.shutdown()
+
+
+def _run(base_url, plant_id, dates, ranges=None, **kwargs):
+    engine = AsyncDataPrep({'access_token': 'token'}, rate_limit=0, backoff_factor=0, **kwargs)
+    engine.remc_base_url = base_url
+    saved = {}
+    tasks = [(plant_id, from_date, to_date) for from_date, to_date in ranges or [(date, date) for date in dates]]
+    engine.plan_tasks = lambda plant_list: (tasks, {plant_id: dates})
+    engine._save_plant = lambda plant_id, frames, dates: saved.update({plant_id: frames})
+    start = time.perf_counter()
+    asyncio.run(engine._update_plants([plant_id]))
+    return engine, saved, time.perf_counter() - start
+
+
+def _stub_prep(prep, base_url, dates_by_plant, saved):
+    """Point a DataPrep at the stub server, with fixed fetch dates and a capturing save."""
+    prep.remc_base_url = base_url
+    prep.get_fetch_dates = lambda plant_id: dates_by_plant[plant_id]
+    prep.save_solar_data = lambda plant_id, new_data, dates=None: saved.update({plant_id: new_data})
+    return prep
+
+
+def _sorted_rows(saved):
+    return {plant_id: df.sort_values(by='utc_datetime').reset_index(drop=True) for plant_id, df in saved.items()}
+
+
+def test_async_engine_is_at_least_as_fast_as_the_threaded_path(stub_server):
+    # every other day, so each plant needs one request per day
+    dates = list(pd.date_range('2024-01-01', periods=8, freq='2D').strftime('%Y-%m-%d'))
+    dates_by_plant = {plant_id: dates for plant_id in range(100, 124)}
+    token = {'access_token': 'token'}
+
+    threaded_rows = {}
+    prep = _stub_prep(DataPrep(token), stub_server, dates_by_plant, threaded_rows)
+    start = time.perf_counter()
+    prep.update_solar_data_for_plants(list(dates_by_plant))
+    threaded = time.perf_counter() - start
+
+    async_rows = {}
+    engine = AsyncDataPrep(token, max_concurrency=64, rate_limit=0, backoff_factor=0)
+    engine.remc_base_url = stub_server
+    _stub_prep(engine.prep, stub_server, dates_by_plant, async_rows)
+    start = time.perf_counter()
+    engine.update_solar_data_for_plants(list(dates_by_plant))
+    elapsed = time.perf_counter() - start
+
+    assert engine.stats['requests'] == len(dates_by_plant) * len(dates)
+    assert set(async_rows) == set(threaded_rows) == set(dates_by_plant)
+    threaded_rows, async_rows = _sorted_rows(threaded_rows), _sorted_rows(async_rows)
+    for plant_id in dates_by_plant:
+        assert len(async_rows[plant_id]) == len(dates) * 96
+        pd.testing.assert_frame_equal(async_rows[plant_id], threaded_rows[plant_id])
+    assert elapsed <= threaded
+
+
+def test_error_status_after_last_attempt_is_a_failed_fetch(stub_server):
+    dates = ['2024-01-01', '2024-01-02']
+    engine, saved, _ = _run(stub_server, int(FAILING_PLANT), dates, max_retries=1)
+
+    assert saved[int(FAILING_PLANT)] == []
+    assert engine.stats['errors'] == len(dates)
+    assert engine.stats['requests'] == 2 * len(dates)
+
+
+def test_days_missing_from_a_range_response_are_fetched_per_day(stub_server):
+    dates = list(pd.date_range('2024-01-01', periods=5).strftime('%Y-%m-%d'))
+    engine, saved, _ = _run(stub_server, int(RANGE_IGNORING_PLANT), dates, ranges=[(dates[0], dates[-1])])
+
+    data = pd.concat(saved[int(RANGE_IGNORING_PLANT)], ignore_index=True)
+    assert sorted(data['utc_datetime'].dt.strftime('%Y-%m-%d').unique()) == dates
+    assert len(data) == len(dates) * 96
+    assert engine.stats['requests'] == len(dates)
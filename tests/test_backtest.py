@@ -0,0 +1,52 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.schema import to_processed
+from src.data.store import processed_store
+from src.model import train as train_module
+from src.model.backtest import model_states
+from src.model.train import EMWA_Train
+
+PARAMS = {'days': 5, 'alpha': 0.3, 'tbs': 5, 'weight_recent': 0.7}
+FIRST_DAY = pd.Timestamp('2024-04-01')
+
+
+def _history(n_days=10, seed=0):
+    datetimes = pd.date_range(FIRST_DAY, periods=96 * n_days, freq='15min')
+    tb = datetimes.hour * 4 + datetimes.minute // 15 + 1
+    rng = np.random.default_rng(seed)
+    power = np.where((tb > 24) & (tb < 76), 3 + 2 * rng.random(len(tb)), 0.0)
+    power[rng.random(len(power)) < 0.02] = np.nan
+    return to_processed(pd.DataFrame({'datetime': datetimes, 'power': power, 'tb': tb}))
+
+
+def _frozen_now(now):
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now
+    return FrozenDatetime
+
+
+@pytest.mark.parametrize('live', [True, False])
+@pytest.mark.parametrize('day, block', [(6, 0), (7, 37), (9, 95)])
+def test_model_states_equal_train_model(monkeypatch, live, day, block):
+    history = _history()
+    values = history['power'].to_numpy(dtype=np.float64).reshape(-1, 96)
+    expected = model_states(values, live=live, **PARAMS)[day, block]
+
+    # train_model at the issue time: only the rows before it are stored
+    issue_time = FIRST_DAY + pd.Timedelta(days=day, minutes=15 * block)
+    plant_id = 700 + 10 * day + int(live)
+    processed_store.write(plant_id, history[history['datetime'] < issue_time].reset_index(drop=True))
+    # the live blend applies when the last row is less than 2.5 hours old
+    now = issue_time if live else issue_time + pd.Timedelta(hours=3)
+    monkeypatch.setattr(train_module, 'datetime', _frozen_now(now.to_pydatetime()))
+
+    model, _ = EMWA_Train().fit_model(plant_id, 'intraday', **PARAMS)
+
+    # processed power is float32 and train_model takes the recent mean in float32
+    np.testing.assert_allclose(expected[model['tb'] - 1], model['power'], rtol=1e-6, atol=1e-9)
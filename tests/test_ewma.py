@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.schema import to_processed
+from src.data.store import processed_store
+from src.model.ewma import ewma_last
+from src.model.train import EMWA_Train
+
+
+def _pandas_ewma_last(values, alpha):
+    return pd.DataFrame(values).ewm(alpha=alpha).mean().iloc[-1].to_numpy()
+
+
+@pytest.mark.parametrize('alpha', [0.1, 0.3, 0.9])
+def test_ewma_last_matches_pandas(alpha):
+    rng = np.random.default_rng(0)
+    values = rng.random((10, 96)) * 5
+    values[rng.random(values.shape) < 0.2] = np.nan
+    values[-3:, :10] = np.nan   # trailing NaNs
+    values[-1, 40:] = np.nan    # partial last day
+    values[:, 95] = np.nan      # block without any value
+
+    expected = _pandas_ewma_last(values, alpha)
+    np.testing.assert_allclose(ewma_last(values, alpha), expected, rtol=1e-12, equal_nan=True)
+    assert np.isnan(ewma_last(values, alpha)[95])
+
+
+def test_ewma_last_is_batched_over_leading_axes():
+    values = np.random.default_rng(1).random((3, 8, 96))
+    values[1, -2:] = np.nan
+    batched = ewma_last(values, 0.3)
+    for i in range(3):
+        np.testing.assert_allclose(batched[i], _pandas_ewma_last(values[i], 0.3), rtol=1e-12)
+
+
+def _processed(end, days, seed, trailing_nan=0):
+    """Processed rows of `days` days up to `end` (exclusive), with NaN holes and optional trailing NaNs."""
+    datetimes = pd.date_range(end - timedelta(days=days), end - timedelta(minutes=15), freq='15min')
+    tb = datetimes.hour * 4 + datetimes.minute // 15 + 1
+    rng = np.random.default_rng(seed)
+    power = np.where((tb > 24) & (tb < 72), rng.random(len(datetimes)) * 8, 0.0)
+    power[rng.random(len(datetimes)) < 0.05] = np.nan
+    if trailing_nan:
+        power[-trailing_nan:] = np.nan
+    return to_processed(pd.DataFrame({'datetime': datetimes, 'power': power, 'tb': tb}))
+
+
+def test_batch_training_matches_train_model():
+    now = datetime.now()
+    frames = {
+        # partial last day ending within the recent-blend window
+        611: _processed(pd.Timestamp(now).floor('15min'), 14, seed=0),
+        # ends days ago with trailing NaN blocks, no recent blend
+        612: _processed(pd.Timestamp(now).normalize() - timedelta(days=3, hours=5), 14, seed=1, trailing_nan=7),
+    }
+    for plant_id, df in frames.items():
+        processed_store.write(plant_id, df)
+
+    trainer = EMWA_Train()
+    batch = trainer.train_models_batch(list(frames), 'intraday', days=9, alpha=0.3, tbs=5, weight_recent=0.7)
+    for plant_id in frames:
+        assert trainer.train_model(plant_id, 'intraday', days=9, alpha=0.3, tbs=5, weight_recent=0.7)
+        expected = trainer.model.sort_values(by='tb').reset_index(drop=True)
+        np.testing.assert_array_equal(batch[plant_id]['tb'].to_numpy(), expected['tb'].to_numpy())
+        np.testing.assert_allclose(batch[plant_id]['power'].to_numpy(), expected['power'].to_numpy(),
+                                   rtol=1e-12, equal_nan=True)
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features.feature_engg import FeatureEngineer, lag_matrix, rolling_mean_std, ROWS_PER_HOUR
+
+
+def _history(days=12, seed=0):
+    """Power with missing rows (gaps in the index) and NaN values."""
+    datetimes = pd.date_range('2024-03-28', periods=96 * days, freq='15min')
+    tb = datetimes.hour * 4 + datetimes.minute // 15 + 1
+    rng = np.random.default_rng(seed)
+    power = np.where((tb > 24) & (tb < 76), 5 * np.sin((tb - 24) / 52 * np.pi) + rng.random(len(tb)), 0.0)
+    power[rng.random(len(power)) < 0.03] = np.nan
+    df = pd.DataFrame({'datetime': datetimes, 'power': power})
+    missing = np.zeros(len(df), dtype=bool)
+    missing[96 * 4 + 30:96 * 4 + 50] = True   # a gap of 20 blocks
+    missing[rng.random(len(df)) < 0.02] = True
+    return df[~missing].reset_index(drop=True)
+
+
+def test_lag_matrix_and_rolling_equal_pandas():
+    power = FeatureEngineer()._resample_fill_missing(_history())['power']
+    lags = [1, 4, 96, 97]
+
+    expected = np.column_stack([power.shift(lag).to_numpy() for lag in lags])
+    np.testing.assert_array_equal(lag_matrix(power.to_numpy(), lags), expected)
+    for hours in (3, 6):
+        mean, std = rolling_mean_std(power.to_numpy(), ROWS_PER_HOUR * hours)
+        np.testing.assert_allclose(mean, power.rolling(f'{hours}h').mean().to_numpy(), rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(std, power.rolling(f'{hours}h').std().to_numpy(), rtol=1e-9, atol=1e-9)
+
+
+def test_streaming_features_equal_pandas_features():
+    streaming = FeatureEngineer(streaming=True).engineer_features(_history())
+    pandas = FeatureEngineer(streaming=False).engineer_features(_history())
+
+    assert len(pandas) > 0
+    pd.testing.assert_frame_equal(streaming, pandas, check_dtype=False, rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize('streaming', [True, False])
+def test_chunked_incremental_equals_full_history(streaming):
+    history = _history()
+    engineer = FeatureEngineer(streaming=streaming)
+    expected = engineer.engineer_features(history.copy())
+
+    chunks, tail = [], None
+    # uneven chunks, one of them overlapping the previous call's rows
+    for start, end in [(0, 400), (400, 401), (380, 700), (700, 1000), (1000, len(history))]:
+        features, tail = engineer.engineer_features_incremental(history.iloc[start:end], tail)
+        chunks.append(features)
+    incremental = pd.concat(chunks)
+
+    pd.testing.assert_frame_equal(incremental, expected, check_dtype=False, rtol=1e-9, atol=1e-9, check_freq=False)
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from src.data.schema import to_processed
+from src.data.store import PartitionedStore
+from src.features.feature_engg import FeatureEngineer
+from src.features.feature_matrix import FeatureMatrixBuilder
+
+
+def _processed(seed, days=20):
+    datetimes = pd.date_range('2024-02-20', periods=96 * days, freq='15min')
+    tb = datetimes.hour * 4 + datetimes.minute // 15 + 1
+    power = np.where((tb > 24) & (tb < 76), 4 + np.random.default_rng(seed).random(len(tb)), 0.0)
+    return to_processed(pd.DataFrame({'datetime': datetimes, 'power': power, 'tb': tb}))
+
+
+def test_chunked_rows_equal_features_over_the_whole_history(tmp_path):
+    store = PartitionedStore(str(tmp_path), key='datetime')
+    for seed, plant_id in enumerate([11, 12]):
+        store.write(plant_id, _processed(seed))
+    builder = FeatureMatrixBuilder([11, 12, 99], chunk_days=3, store=store)
+
+    chunks = list(builder.iter_chunks('2024-02-26', '2024-03-10'))
+    X, y, plant_index, time_index = (np.concatenate(arrays) for arrays in zip(*chunks))
+
+    assert X.dtype == np.float32 and y.dtype == np.float32
+    assert set(plant_index) == {0, 1}   # plant 99 has no data
+    for i, plant_id in enumerate([11, 12]):
+        expected = FeatureEngineer(streaming=True).engineer_features(store.read(plant_id, columns=['datetime', 'power']))
+        expected = expected[(expected.index >= '2024-02-26') & (expected.index < '2024-03-11')]
+        rows = plant_index == i
+        np.testing.assert_array_equal(time_index[rows], expected.index.to_numpy(dtype='datetime64[ns]'))
+        np.testing.assert_array_equal(X[rows], expected[builder.feature_names].to_numpy(dtype=np.float32))
+        np.testing.assert_array_equal(y[rows], expected['power'].to_numpy(dtype=np.float32))
+
+    # the first row of every chunk uses the lookback read before the chunk
+    for chunk_start, (_, _, chunk_plants, chunk_times) in zip(pd.date_range('2024-02-26', periods=len(chunks), freq='3D'), chunks):
+        assert chunk_times[chunk_plants == 0][0] == np.datetime64(chunk_start, 'ns')
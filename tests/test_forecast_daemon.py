@@ -0,0 +1,36 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from src.model.forecast_daemon import ForecastDaemon
+
+
+def test_upload_needs_owner_id(monkeypatch):
+    monkeypatch.delenv('owner_id', raising=False)
+    with pytest.raises(ValueError):
+        ForecastDaemon(upload=True)
+    assert ForecastDaemon().upload is False
+
+
+def test_day_ahead_trained_once_a_day(monkeypatch):
+    daemon = ForecastDaemon(day_ahead_train_time='09:00')
+    trained = []
+    monkeypatch.setattr(daemon.trainer, 'train_models_batch',
+                        lambda plant_ids, model_type, frames=None: trained.append(model_type))
+
+    for now in pd.date_range('2024-05-01 08:30', '2024-05-02 09:15', freq='15min'):
+        daemon.train([1], now.to_pydatetime())
+
+    assert trained.count('day_ahead') == 2
+    assert trained.count('intraday') == 100
+
+
+def test_upload_fails_fast_on_missing_owner(monkeypatch):
+    daemon = ForecastDaemon()
+    monkeypatch.setattr('src.model.forecast_daemon.get_api_client',
+                        lambda: pytest.fail('no request may be made without owner ids'))
+    df_pred = pd.DataFrame({'owner_id': [None], 'plant_id': [1], 'datetime': [datetime(2024, 5, 1)],
+                            'revision': [1], 'forecast': [1.0]})
+    with pytest.raises(ValueError):
+        daemon.upload_forecasts({'intraday': df_pred})
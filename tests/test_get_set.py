@@ -0,0 +1,106 @@
+import json
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+import requests
+
+from src.apis.get_set import Forecast
+
+
+def _response(status_code, body):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+    return response
+
+
+def _forecast(plant_owners):
+    return pd.DataFrame([
+        {'owner_id': owner_id, 'plant_id': plant_id, 'datetime': dt, 'revision': 3, 'forecast': 1.5}
+        for plant_id, owner_id in plant_owners.items()
+        for dt in pd.date_range(datetime(2024, 5, 1), periods=4, freq='15min')
+    ])
+
+
+class StubForecast(Forecast):
+    def __init__(self, responses, delay=0.0):
+        self.responses = responses
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def post_forecast(self, token_remc, json_data, owner_id, forecast_type, module):
+        with self.lock:
+            self.calls.append((owner_id, json.loads(json_data)))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+        return self.responses[owner_id]
+
+
+def test_one_request_per_plant_in_parallel():
+    forecast = StubForecast({'owner': _response(200, {'status': 'success'})}, delay=0.05)
+    df_pred = _forecast({plant_id: 'owner' for plant_id in range(1, 9)})
+
+    result = forecast.set_forecasts_bulk({'access_token': 't'}, df_pred, 'intraday', max_workers=8)
+
+    assert len(forecast.calls) == 8
+    assert all(len(records) == 4 and 'plant_id' not in records[0] for _, records in forecast.calls)
+    assert forecast.max_in_flight > 1
+    assert result['success'].all()
+    assert sorted(result['plant_id']) == list(range(1, 9))
+
+
+def test_error_bodies_are_failures():
+    forecast = StubForecast({
+        'ok': _response(200, {'status': 'success'}),
+        'error_body': _response(200, {'status': 'error', 'message': 'invalid revision'}),
+        'not_json': _response(200, '<html>maintenance</html>'),
+        'http_error': _response(500, {'error': 'internal'}),
+    })
+    df_pred = _forecast({1: 'ok', 2: 'error_body', 3: 'not_json', 4: 'http_error'})
+
+    result = forecast.set_forecasts_bulk({'access_token': 't'}, df_pred, 'intraday').set_index('plant_id')
+
+    assert result['success'].to_dict() == {1: True, 2: False, 3: False, 4: False}
+    assert result.loc[2, 'error'] == 'invalid revision'
+    assert result.loc[4, 'status_code'] == 500
+
+
+def _connect_failure():
+    from urllib3.exceptions import MaxRetryError, NewConnectionError
+    return requests.ConnectionError(MaxRetryError(None, '/setForecast', NewConnectionError(None, 'refused')))
+
+
+def test_accepted_failed_and_retried_plants_against_a_stub(monkeypatch):
+    from src.apis.session import HTTPClient
+
+    client = HTTPClient(max_retries=2, backoff_factor=0)
+    attempts = {}
+
+    def stub_request(method, url, data=None, **kwargs):
+        owner_id = data['owner_id']
+        attempts[owner_id] = attempts.get(owner_id, 0) + 1
+        if owner_id == 'retried' and attempts[owner_id] == 1:
+            raise _connect_failure()
+        if owner_id == 'failed':
+            return _response(503, {'error': 'unavailable'})
+        return _response(200, {'status': 'success'})
+
+    monkeypatch.setattr(client.session, 'request', stub_request)
+    monkeypatch.setattr('src.apis.get_set.get_http_client', lambda: client)
+    monkeypatch.setenv('remc_base_url', 'http://remc.test/')
+    df_pred = _forecast({1: 'accepted', 2: 'failed', 3: 'retried'})
+
+    result = Forecast().set_forecasts_bulk({'access_token': 't'}, df_pred, 'intraday').set_index('plant_id')
+
+    assert result['success'].to_dict() == {1: True, 2: False, 3: True}
+    assert result.loc[2, 'status_code'] == 503
+    # the 503 may have been processed by the server, so only the connection failure is retried
+    assert attempts == {'accepted': 1, 'failed': 1, 'retried': 2}
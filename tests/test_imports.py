@@ -0,0 +1,16 @@
+import os
+import subprocess
+import sys
+
+from src.helper.benchmark_imports import MODULES, ROOT
+
+
+def test_importing_the_pipeline_has_no_side_effects(tmp_path):
+    code = '; '.join(f'import {module}' for module in MODULES) + "; import os; print(os.environ.get('TZ'))"
+    env = {key: value for key, value in os.environ.items() if key != 'TZ'}
+    env['PROJECT_DIR'] = str(tmp_path)
+
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, cwd=ROOT, env=env)
+
+    assert result.stdout.strip() == 'None'
+    assert list(tmp_path.iterdir()) == []
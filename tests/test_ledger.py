@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from src.data import ledger as ledger_module
+from src.data.ledger import FetchLedger, COMPLETE, PARTIAL, FAILED, local_today
+
+
+def _rows(date, blocks, daylight=range(4, 52)):
+    utc_datetime = pd.Timestamp(date) + pd.to_timedelta(np.asarray(blocks) * 15, unit='min')
+    generation = [5.0 if block in daylight else np.nan for block in blocks]
+    return pd.DataFrame({'utc_datetime': utc_datetime, 'generation': generation})
+
+
+def test_null_and_omitted_night_blocks_complete_a_past_day(tmp_path):
+    ledger = FetchLedger(root=str(tmp_path))
+    df = pd.concat([
+        _rows('2024-05-01', range(96)),      # night blocks returned as nulls
+        _rows('2024-05-02', range(4, 52)),   # night blocks omitted
+        _rows('2024-05-03', list(range(4, 20)) + list(range(30, 52))),  # daytime gap
+    ])
+
+    entries = ledger.record(1, df, ['2024-05-01', '2024-05-02', '2024-05-03', '2024-05-04'])
+
+    assert {date: entry['status'] for date, entry in entries.items()} == {
+        '2024-05-01': COMPLETE, '2024-05-02': COMPLETE, '2024-05-03': PARTIAL, '2024-05-04': FAILED}
+    assert entries['2024-05-01']['rows'] == 96 and entries['2024-05-02']['rows'] == 48
+
+
+def test_today_needs_every_block(tmp_path):
+    ledger = FetchLedger(root=str(tmp_path))
+    today = local_today()
+
+    entries = ledger.record(1, _rows(today, range(4, 52)), [today])
+
+    assert entries[today]['status'] == PARTIAL
+
+
+def test_today_is_the_same_day_for_completeness_and_retries(tmp_path, monkeypatch):
+    # 00:30 plant-local time on May 2 is still May 1 in UTC
+    monkeypatch.setattr(ledger_module.pd.Timestamp, 'now', classmethod(lambda cls, tz=None: pd.Timestamp('2024-05-02 00:30')))
+    ledger = FetchLedger(root=str(tmp_path), max_attempts=1)
+    df = pd.concat([_rows('2024-04-30', list(range(4, 20)) + list(range(30, 52))), _rows('2024-05-01', range(4, 52)), _rows('2024-05-02', range(4, 52))])
+
+    entries = ledger.record(1, df, ['2024-04-30', '2024-05-01', '2024-05-02'])
+
+    # May 1 is over: its omitted night blocks are covered; May 2 is today and needs every block
+    assert {date: entry['status'] for date, entry in entries.items()} == {
+        '2024-04-30': PARTIAL, '2024-05-01': COMPLETE, '2024-05-02': PARTIAL}
+    # yesterday and today are retried, older partial days only up to max_attempts
+    assert ledger.pending_dates(1, ['2024-04-30', '2024-05-01', '2024-05-02']) == ['2024-05-02']
@@ -0,0 +1,58 @@
+import pandas as pd
+
+from src.data.fetch_planner import uncovered_dates
+from src.data.load_data import DataPrep
+
+
+def _day_rows(date):
+    datetimes = pd.date_range(date, periods=96, freq='15min')
+    return [{'utc_datetime': dt.strftime('%Y-%m-%d %H:%M:%S'), 'generation': 2.0} for dt in datetimes]
+
+
+class RangeIgnoringPrep(DataPrep):
+    """getActual stub that ignores from_date/to_date and only ever answers for `date` (or from_date)."""
+
+    def __init__(self, range_rows='first_day'):
+        super().__init__({'access_token': 'token'})
+        self.range_rows = range_rows
+        self.calls = []
+
+    def call_api(self, method, endpoint, params):
+        self.calls.append(params)
+        if 'date' in params:
+            return {'data': _day_rows(params['date'])}
+        if self.range_rows == 'first_day':
+            return {'data': _day_rows(params['from_date'])}
+        if self.range_rows == 'empty':
+            return {'data': []}
+        return {'error': 'unknown parameters'}
+
+
+def test_uncovered_dates():
+    df = pd.DataFrame(_day_rows('2024-01-02'))
+    assert uncovered_dates(df, '2024-01-01', '2024-01-03') == ['2024-01-01', '2024-01-03']
+    assert uncovered_dates(None, '2024-01-01', '2024-01-02') == ['2024-01-01', '2024-01-02']
+
+
+def test_partial_range_response_is_completed_per_day():
+    prep = RangeIgnoringPrep('first_day')
+    data = prep.fetch_data_for_range(42, '2024-01-01', '2024-01-04')
+
+    assert len(data) == 4 * 96
+    assert uncovered_dates(data, '2024-01-01', '2024-01-04') == []
+    assert [call.get('date') for call in prep.calls[1:]] == ['2024-01-02', '2024-01-03', '2024-01-04']
+
+
+def test_empty_range_response_falls_back_to_every_day():
+    prep = RangeIgnoringPrep('empty')
+    data = prep.fetch_data_for_range(42, '2024-01-01', '2024-01-03')
+
+    assert len(data) == 3 * 96
+    assert len(prep.calls) == 4
+
+
+def test_failed_range_response_falls_back_to_every_day():
+    prep = RangeIgnoringPrep('error')
+    data = prep.fetch_data_for_range(42, '2024-01-01', '2024-01-02')
+
+    assert len(data) == 2 * 96
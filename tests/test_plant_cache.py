@@ -0,0 +1,54 @@
+import os
+import time
+from unittest import mock
+
+import pytest
+
+from src.helper.plant_cache import PlantMetadataCache
+
+
+def test_lookups_read_the_snapshot_without_calling_the_api(plant_info):
+    plant_info({1: 5.0, 2: 7.5})
+    cache = PlantMetadataCache(ttl=1)
+    # an expired TTL must not make a lookup call the API
+    os.utime(cache.snapshot_path, (time.time() - 3600, time.time() - 3600))
+
+    with mock.patch('src.apis.tokens.get_api_client') as get_api_client:
+        assert cache.get_avc(2) == 7.5
+        assert cache.avc_map() == {1: 5.0, 2: 7.5}
+        assert cache.plant_ids() == [1, 2]
+    get_api_client.assert_not_called()
+
+
+def test_lookups_pick_up_a_new_snapshot(plant_info):
+    plant_info({1: 5.0})
+    cache = PlantMetadataCache()
+    assert cache.get_avc(1) == 5.0
+
+    plant_info({1: 6.0})
+    os.utime(cache.snapshot_path, (time.time() + 5, time.time() + 5))
+    assert cache.get_avc(1) == 6.0
+
+
+def test_refresh_if_stale_calls_the_api_only_when_the_snapshot_is_old(plant_info):
+    df = plant_info({1: 5.0})
+    cache = PlantMetadataCache(ttl=60)
+    client = mock.Mock()
+    client.get_plant_info.return_value = df.assign(avc=9.0)
+
+    with mock.patch('src.apis.tokens.get_api_client', return_value=client):
+        cache.refresh_if_stale()
+        assert client.get_plant_info.call_count == 0
+
+        os.utime(cache.snapshot_path, (time.time() - 120, time.time() - 120))
+        cache.refresh_if_stale()
+        assert client.get_plant_info.call_count == 1
+    assert cache.get_avc(1) == 9.0
+
+
+def test_lookup_without_snapshot_raises(plant_info):
+    plant_info({1: 5.0})
+    cache = PlantMetadataCache()
+    os.remove(cache.snapshot_path)
+    with pytest.raises(FileNotFoundError):
+        cache.get_avc(1)
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from src.model.forecast_cache import get_forecast_cache
+from src.model.forecast_daemon import ForecastDaemon
+from src.model.predict import EMWA_Predict
+from src.model.registry import get_registry
+
+PROFILE = np.where((np.arange(96) > 24) & (np.arange(96) < 72), 5.0, 0.0)
+
+
+def test_cached_forecasts_are_clipped_at_the_current_avc(plant_info):
+    plant_info({631: 3.0, 632: 3.0})
+    get_registry('intraday').update({631: PROFILE, 632: PROFILE})
+    predictor, cache = EMWA_Predict(), get_forecast_cache()
+
+    assert predictor.predict_many([631], 'intraday', 1, owner_id='o')['forecast'].max() == 3.0
+    assert predictor.predict('o', 632, 'intraday', 1)['forecast'].max() == 3.0
+
+    plant_info({631: 4.0, 632: 4.0})
+    hits = cache.stats['hits']
+    assert predictor.predict_many([631], 'intraday', 1, owner_id='o')['forecast'].max() == 4.0
+    assert predictor.predict('o', 632, 'intraday', 1)['forecast'].max() == 4.0
+    assert cache.stats['hits'] == hits + 2
+
+
+def test_upload_skips_unchanged_forecasts(plant_info, monkeypatch):
+    plant_info({633: 3.0})
+    get_registry('day_ahead').update({633: PROFILE})
+    daemon = ForecastDaemon()
+    uploads = []
+
+    def set_forecasts_bulk(token_remc, df_pred, forecast_type):
+        uploads.append(list(df_pred['plant_id'].unique()))
+        return pd.DataFrame({'plant_id': uploads[-1], 'success': True, 'latency': 0.1, 'error': None})
+
+    monkeypatch.setattr(daemon.forecast, 'set_forecasts_bulk', set_forecasts_bulk)
+    monkeypatch.setattr('src.model.forecast_daemon.get_api_client',
+                        lambda: type('Client', (), {'get_remc_token': lambda self: {'access_token': 't'}})())
+
+    def upload():
+        daemon.upload_forecasts({'day_ahead': daemon.predictor.predict_many([633], 'day_ahead', 2, owner_id='o')})
+
+    upload()
+    upload()
+    plant_info({633: 4.0})
+    upload()
+
+    assert uploads == [[633], [633]]
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+from src.data.process_data import DataProcessor
+from src.data.store import raw_store, processed_store
+
+
+def _raw(start, days, sunrise=15, sunset=85, scale=6.0, seed=0):
+    """Raw API rows of `days` days with positive generation from block `sunrise` to `sunset`."""
+    datetimes = pd.date_range(start, periods=96 * days, freq='15min')
+    tb = datetimes.hour * 4 + datetimes.minute // 15 + 1
+    noise = np.random.default_rng(seed).random(len(datetimes))
+    generation = np.where((tb >= sunrise) & (tb <= sunset), scale * np.sin((tb - sunrise + 1) / (sunset - sunrise + 2) * np.pi), 0.0)
+    return pd.DataFrame({'utc_datetime': datetimes, 'generation': generation + 0.1 * noise * (generation > 0)})
+
+
+def _assert_equals_rebuild(processor, plant_id):
+    incremental = processed_store.read(plant_id)
+    rebuilt = processor.process_raw_data(plant_id)
+    pd.testing.assert_frame_equal(incremental, rebuilt)
+
+
+def test_incremental_equals_full_rebuild(plant_info):
+    plant_info({501: 8.0})
+    processor = DataProcessor()
+    raw = _raw('2024-01-01', 30)
+    missing_day = raw['utc_datetime'].dt.date == pd.Timestamp('2024-01-12').date()
+
+    # initial history with a missing day, then new rows in several runs
+    raw_store.append(501, raw[(raw.index < 96 * 20) & ~missing_day])
+    processor.process_incremental(501)
+    for start, end in [(96 * 20, 96 * 22 + 40), (96 * 22 + 30, 96 * 25), (96 * 25, 96 * 30)]:
+        raw_store.append(501, raw.iloc[start:end])
+        processor.process_incremental(501)
+        _assert_equals_rebuild(processor, 501)
+
+    # a gap repair fills the old day, incremental runs pick it up from the change mark
+    raw_store.append(501, raw[missing_day])
+    processor.process_incremental(501)
+    _assert_equals_rebuild(processor, 501)
+    assert raw_store.changed_since(501) is None
+
+
+def test_incremental_equals_full_rebuild_when_sun_blocks_change(plant_info):
+    plant_info({502: 8.0})
+    processor = DataProcessor()
+    raw_store.append(502, _raw('2024-03-01', 20, sunrise=18, sunset=82))
+    processor.process_incremental(502)
+    first_state = processed_store.get_watermark_state(502)
+
+    # longer days: the estimated blocks move and all history is masked with the new ones
+    raw_store.append(502, _raw('2024-03-21', 15, sunrise=12, sunset=88, seed=1))
+    processor.process_incremental(502)
+
+    assert processed_store.get_watermark_state(502)['sun_blocks'] != first_state['sun_blocks']
+    _assert_equals_rebuild(processor, 502)
+
+
+def test_incremental_equals_full_rebuild_when_avc_changes(plant_info):
+    plant_info({503: 8.0})
+    processor = DataProcessor()
+    raw_store.append(503, _raw('2024-05-01', 15))
+    processor.process_incremental(503)
+
+    plant_info({503: 4.0})
+    raw_store.append(503, _raw('2024-05-16', 2, seed=2))
+    processor.process_incremental(503)
+
+    _assert_equals_rebuild(processor, 503)
+    assert processed_store.read(503)['power'].max() <= 4.0
@@ -0,0 +1,54 @@
+from datetime import timedelta
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from src.data.schema import to_processed
+from src.data.store import processed_store
+from src.model.registry import ModelRegistry, get_registry
+from src.model.train import EMWA_Train
+
+
+def _store_plant(plant_id, seed):
+    end = pd.Timestamp.now().normalize() - timedelta(days=1)
+    datetimes = pd.date_range(end - timedelta(days=12), end - timedelta(minutes=15), freq='15min')
+    tb = datetimes.hour * 4 + datetimes.minute // 15 + 1
+    power = np.where((tb > 24) & (tb < 72), np.random.default_rng(seed).random(len(datetimes)) * 5, 0.0)
+    processed_store.write(plant_id, to_processed(pd.DataFrame({'datetime': datetimes, 'power': power, 'tb': tb})))
+
+
+def test_train_multiple_plants_writes_the_registry_once():
+    plant_ids = [621, 622, 623]
+    for seed, plant_id in enumerate(plant_ids):
+        _store_plant(plant_id, seed)
+    trainer = EMWA_Train()
+    registry = get_registry('day_ahead')
+
+    with mock.patch.object(ModelRegistry, '_write', autospec=True, side_effect=ModelRegistry._write) as write:
+        trained = trainer.train_multiple_plants(plant_ids + [699], 'day_ahead', backend='serial')
+
+    assert write.call_count == 1
+    assert trained == {621: True, 622: True, 623: True, 699: False}
+    for plant_id in plant_ids:
+        model, _ = trainer.fit_model(plant_id, 'day_ahead')
+        np.testing.assert_allclose(registry.get(plant_id)[model['tb'] - 1], model['power'])
+
+
+def test_import_csv_models(tmp_path):
+    csv_dir = tmp_path / 'intraday'
+    csv_dir.mkdir()
+    tb = np.arange(1, 97)
+    for plant_id, level in [(7, 1.0), (8, 2.0), ('aggregated', 3.0)]:
+        pd.DataFrame({'tb': tb, 'power': level * np.ones(96)}).to_csv(csv_dir / f'intraday_model_{plant_id}.csv', index=False)
+
+    registry = ModelRegistry('intraday', path=str(tmp_path / 'intraday_models.ewma'))
+    registry.update({8: np.full(96, 9.0)})
+    imported = registry.import_csv_models()
+
+    assert sorted(imported) == ['7', 'aggregated']
+    np.testing.assert_array_equal(registry.get(7), np.ones(96))
+    np.testing.assert_array_equal(registry.get('aggregated'), np.full(96, 3.0))
+    # a plant already in the registry keeps its registry model
+    np.testing.assert_array_equal(registry.get(8), np.full(96, 9.0))
+    assert registry.import_csv_models() == []
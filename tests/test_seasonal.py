@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.data.schema import to_processed
+from src.data.store import processed_store
+from src.model.predict import EMWA_Predict
+from src.model.registry import get_registry
+from src.model.seasonal import DAYS_PER_YEAR, SeasonalIndex, day_of_year, get_seasonal_index
+
+DAYLIGHT = (np.arange(96) >= 24) & (np.arange(96) < 72)
+
+
+def _history(start, end, level=None, seed=0):
+    """Processed history with daylight power `level` (random if None) and no power at night."""
+    datetimes = pd.date_range(start, end, freq='15min', inclusive='left')
+    tb = datetimes.hour * 4 + datetimes.minute // 15 + 1
+    day_power = 3 + 2 * np.random.default_rng(seed).random(len(tb)) if level is None else np.full(len(tb), level)
+    return to_processed(pd.DataFrame({'datetime': datetimes, 'power': np.where(DAYLIGHT[tb - 1], day_power, 0.0),
+                                      'tb': tb}))
+
+
+def test_build_matches_the_day_of_year_mean(tmp_path):
+    history = _history('2023-03-01', '2023-04-01')
+    history = pd.concat([history, _history('2024-03-01', '2024-04-01', seed=1)], ignore_index=True)
+    processed_store.write(761, history)
+    index = SeasonalIndex(root=str(tmp_path), window_days=2, min_samples=1)
+
+    assert index.build([761, 762]) == [761]
+    assert index.plant_ids() == ['761']
+
+    dates = pd.DatetimeIndex(['2025-03-15', '2025-06-15'])
+    found, profiles = index.lookup([761], dates)
+    assert found == [761] and profiles.shape == (1, 2, 96)
+    # Mar 15 is the mean of Mar 13..17 of both years, June has no data at all
+    doy = day_of_year(history['datetime'])
+    near = history[np.abs(doy - day_of_year(dates[:1])[0]) <= 2]
+    expected = near.groupby('tb')['power'].mean().to_numpy(dtype=np.float64)
+    np.testing.assert_allclose(profiles[0, 0], expected, rtol=1e-6)
+    assert np.isnan(profiles[0, 1]).all()
+
+
+def test_rebuild_replaces_one_file_and_keeps_other_plants(tmp_path):
+    processed_store.write(763, _history('2023-05-01', '2023-06-01', level=2.0))
+    processed_store.write(764, _history('2023-05-01', '2023-06-01', level=4.0))
+    writer = SeasonalIndex(root=str(tmp_path), window_days=2, min_samples=1)
+    reader = SeasonalIndex(root=str(tmp_path), window_days=2, min_samples=1)
+    writer.build([763, 764])
+
+    dates = pd.DatetimeIndex(['2025-05-15'])
+    found, profiles = reader.lookup([763, 764], dates)
+    assert found == [763, 764]
+    np.testing.assert_array_equal(profiles[:, 0, 40], [2.0, 4.0])
+    assert reader.plant_ids() == ['763', '764']
+
+    processed_store.write(763, _history('2023-05-01', '2023-06-01', level=3.0))
+    writer.build([763])
+
+    # the reader remaps the rebuilt index, the header and the data come from one file
+    found, profiles = reader.lookup([763, 764], dates)
+    np.testing.assert_array_equal(profiles[:, 0, 40], [3.0, 4.0])
+    assert sorted(os.listdir(tmp_path)) == ['profiles.seas']
+    assert reader._data.shape == (2, DAYS_PER_YEAR, 96)
+
+
+def test_week_ahead_blends_ewma_into_the_profile_and_clips(plant_info):
+    plant_info({765: 5.0})
+    # a profile of 2.0 in daylight on every day of the year
+    processed_store.write(765, _history('2023-01-01', '2024-01-01', level=2.0))
+    get_seasonal_index().build([765])
+    ewma = np.where(DAYLIGHT, 6.0, -1.0)
+    get_registry('day_ahead').update({765: ewma})
+
+    df_pred = EMWA_Predict().predict_week_ahead([765], revision=1, owner_id='o')
+
+    assert len(df_pred) == 7 * 96
+    forecast = df_pred['forecast'].to_numpy().reshape(7, 96)
+    # the EWMA weight starts at 0.8 and halves every 2 days
+    weight = 0.8 * 0.5 ** (np.arange(7) / 2)
+    expected = weight[:, None] * ewma + (1 - weight[:, None]) * np.where(DAYLIGHT, 2.0, 0.0)
+    np.testing.assert_allclose(forecast, np.clip(expected, 0.0, 5.0).round(2))
+    # clipped at the AVC the first day and at zero at night
+    assert forecast[0, DAYLIGHT].max() == 5.0 and forecast[0, ~DAYLIGHT].min() == 0.0
+    assert forecast[-1, DAYLIGHT].max() < 5.0
@@ -0,0 +1,63 @@
+from unittest import mock
+
+import pytest
+import requests
+
+from src.apis.session import HTTPClient
+
+
+def _response(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return response
+
+
+def _client_calls(method, **kwargs):
+    client = HTTPClient(max_retries=2, backoff_factor=0)
+    with mock.patch.object(client.session, 'request', return_value=_response(503)) as request:
+        response = client.request(method, 'http://remc.test/endpoint', **kwargs)
+    return response, request.call_count
+
+
+def test_get_is_retried_on_server_errors():
+    response, calls = _client_calls('GET')
+    assert response.status_code == 503
+    assert calls == 3
+
+
+def test_post_is_sent_once_by_default():
+    response, calls = _client_calls('POST')
+    assert response.status_code == 503
+    assert calls == 1
+
+
+def test_post_is_retried_when_caller_opts_in():
+    _, calls = _client_calls('POST', retry=True)
+    assert calls == 3
+
+
+def test_post_connection_error_is_not_retried():
+    client = HTTPClient(max_retries=2, backoff_factor=0)
+    with mock.patch.object(client.session, 'request', side_effect=requests.ConnectionError) as request:
+        with pytest.raises(requests.ConnectionError):
+            client.post('http://remc.test/setForecast')
+    assert request.call_count == 1
+
+
+def test_connect_only_retries_only_unsent_requests():
+    from urllib3.exceptions import MaxRetryError, NewConnectionError
+    from src.apis.session import CONNECT_ONLY
+
+    refused = requests.ConnectionError(MaxRetryError(None, '/', NewConnectionError(None, 'refused')))
+    client = HTTPClient(max_retries=2, backoff_factor=0)
+    with mock.patch.object(client.session, 'request', side_effect=[refused, requests.ConnectTimeout(), _response(200)]) as request:
+        assert client.post('http://remc.test/setForecast', retry=CONNECT_ONLY).status_code == 200
+    assert request.call_count == 3
+
+    with mock.patch.object(client.session, 'request', side_effect=requests.ReadTimeout) as request:
+        with pytest.raises(requests.ReadTimeout):
+            client.post('http://remc.test/setForecast', retry=CONNECT_ONLY)
+    assert request.call_count == 1
+
+    _, calls = _client_calls('POST', retry=CONNECT_ONLY)
+    assert calls == 1
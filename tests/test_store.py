@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from src.data.schema import to_raw
+from src.data.store import PartitionedStore
+
+
+def test_raw_generation_is_stored_losslessly(tmp_path):
+    store = PartitionedStore(str(tmp_path), key='utc_datetime', schema=to_raw)
+    generation = np.array([0.1, 1234.56789, 1 / 3])
+    store.append(1, to_raw(pd.DataFrame({'utc_datetime': pd.date_range('2024-05-01', periods=3, freq='15min'),
+                                         'generation': generation})))
+
+    stored = store.read(1)
+
+    assert stored['generation'].dtype == np.float64
+    np.testing.assert_array_equal(stored['generation'].to_numpy(), generation)
+
+
+def test_import_pickle_applies_the_store_schema(tmp_path):
+    legacy = pd.DataFrame({
+        'utc_datetime': pd.date_range('2024-05-01', periods=4, freq='15min').strftime('%Y-%m-%d %H:%M:%S'),
+        'generation': ['1.5', None, '2.25', '3'],
+        'plant_name': 'legacy',
+    })
+    legacy.to_pickle(tmp_path / 'solar_plant_1')
+    store = PartitionedStore(str(tmp_path / 'store'), key='utc_datetime', schema=to_raw)
+
+    store.import_pickle(1, str(tmp_path / 'solar_plant_1'))
+
+    stored = store.read(1)
+    assert list(stored.columns) == ['utc_datetime', 'generation']
+    assert stored.dtypes.to_dict() == to_raw(None).dtypes.to_dict()
+    np.testing.assert_array_equal(stored['generation'].to_numpy(), [1.5, np.nan, 2.25, 3.0])
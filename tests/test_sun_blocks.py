@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features.sun_blocks import (MAX_SUNRISE_BLOCK, MIN_SUNSET_BLOCK, SunBlockEstimator, daily_first_last_blocks,
+                                     sun_blocks_from_data, sun_blocks_from_location, sunrise_sunset_minutes)
+
+
+def _series(first_last, start='2024-05-01', running_blocks=None):
+    """15-minute series with positive power from `first` to `last` block on each day, plus an optional running day."""
+    frames = []
+    for i, (first, last) in enumerate(first_last):
+        datetimes = pd.date_range(pd.Timestamp(start) + pd.Timedelta(days=i), periods=96, freq='15min')
+        tb = np.arange(1, 97)
+        frames.append(pd.DataFrame({'datetime': datetimes, 'power': np.where((tb >= first) & (tb <= last), 3.0, 0.0)}))
+    if running_blocks:
+        datetimes = pd.date_range(pd.Timestamp(start) + pd.Timedelta(days=len(first_last)), periods=running_blocks, freq='15min')
+        frames.append(pd.DataFrame({'datetime': datetimes, 'power': 3.0}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_daily_first_last_blocks_per_day_and_running_day_excluded():
+    df = _series([(24, 76), (25, 75), (0, -1), (24, 74)], running_blocks=40)
+
+    first, last = daily_first_last_blocks(df['datetime'], df['power'])
+
+    # the day without generation and the running day (positive up to "now") are left out
+    np.testing.assert_array_equal(first, [24, 25, 24])
+    np.testing.assert_array_equal(last, [76, 75, 74])
+
+
+def test_sun_blocks_from_data_takes_the_mode_and_clamps():
+    df = _series([(18, 82), (19, 84), (18, 84), (30, 70)])
+    assert sun_blocks_from_data(df['datetime'], df['power']) == (18, 84)
+
+    df = _series([(24, 70), (24, 70)])
+    assert sun_blocks_from_data(df['datetime'], df['power']) == (MAX_SUNRISE_BLOCK, MIN_SUNSET_BLOCK)
+    assert sun_blocks_from_data(df['datetime'][:0], df['power'][:0]) == (MAX_SUNRISE_BLOCK, MIN_SUNSET_BLOCK)
+
+
+def test_sunrise_sunset_from_location():
+    # New Delhi on the June solstice: sunrise about 05:24, sunset about 19:22 IST
+    sunrise, sunset = sunrise_sunset_minutes(28.61, 77.21, ['2024-06-21'])
+    assert sunrise[0] == pytest.approx(5 * 60 + 24, abs=4)
+    assert sunset[0] == pytest.approx(19 * 60 + 22, abs=4)
+
+    # blocks over the dates: earliest sunrise block clamped to MAX_SUNRISE_BLOCK, latest sunset block
+    dates = pd.date_range('2024-06-15', '2024-06-25')
+    sunrise, sunset = sunrise_sunset_minutes(28.61, 77.21, dates)
+    assert sun_blocks_from_location(28.61, 77.21, dates) == (
+        min(MAX_SUNRISE_BLOCK, int(sunrise.min() // 15) + 1), max(MIN_SUNSET_BLOCK, int(sunset.max() // 15) + 1))
+    # polar day: no sunrise at all, the defaults are used
+    assert sun_blocks_from_location(80.0, 20.0, dates) == (MAX_SUNRISE_BLOCK, MIN_SUNSET_BLOCK)
+
+
+def test_estimate_is_recomputed_when_rows_in_the_window_change():
+    estimator = SunBlockEstimator(lookback_days=10, method='data')
+    df = _series([(16, 84)] * 5)
+
+    assert estimator.estimate(df, 1) == (16, 84)
+    assert estimator.estimate(df.copy(), 1) == (16, 84)
+    assert estimator.stats == {'hits': 1, 'misses': 1}
+
+    # a gap repair rewrites the same days: same plant and end date, different rows
+    repaired = _series([(14, 86)] * 5)
+    assert estimator.estimate(repaired, 1) == (14, 86)
+    assert estimator.stats == {'hits': 1, 'misses': 2}
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features.time_features import calendar_features, calendar_features_np, time_block, time_block_np
+
+# a year of 15-minute timestamps across a year boundary and Feb 29, plus the epoch boundary
+DATETIMES = pd.DatetimeIndex(pd.date_range('2023-07-01', '2024-07-01', freq='15min', inclusive='left')
+                             .append(pd.date_range('1969-12-30', '1970-01-02', freq='15min')))
+
+INPUTS = {
+    'series': lambda: pd.Series(DATETIMES),
+    'index': lambda: DATETIMES,
+    'list': lambda: list(DATETIMES[:5000]),
+    'tz_aware': lambda: pd.Series(DATETIMES.tz_localize('Asia/Calcutta')),
+}
+
+
+def _expected(datetimes):
+    datetimes = pd.DatetimeIndex(datetimes)
+    if datetimes.tz is not None:
+        datetimes = datetimes.tz_localize(None)
+    return datetimes, {
+        'hour': datetimes.hour, 'minute': datetimes.minute, 'day_of_week': datetimes.dayofweek,
+        'day_of_month': datetimes.day, 'month': datetimes.month,
+    }
+
+
+@pytest.mark.parametrize('kind', list(INPUTS))
+def test_time_block_and_calendar_equal_pandas(kind):
+    datetimes = INPUTS[kind]()
+    expected_datetimes, expected = _expected(datetimes)
+
+    np.testing.assert_array_equal(time_block(datetimes),
+                                  expected_datetimes.hour * 4 + expected_datetimes.minute // 15 + 1)
+    features = calendar_features(datetimes)
+    for column, values in expected.items():
+        np.testing.assert_array_equal(features[column], values, err_msg=column)
+
+
+def test_numpy_path_equals_pandas():
+    values = DATETIMES.to_numpy(dtype='datetime64[ns]')
+    _, expected = _expected(DATETIMES)
+
+    tb = time_block_np(values)
+    np.testing.assert_array_equal(tb, DATETIMES.hour * 4 + DATETIMES.minute // 15 + 1)
+    assert tb.min() == 1 and tb.max() == 96
+    features = calendar_features_np(values)
+    for column, values in expected.items():
+        np.testing.assert_array_equal(features[column], values, err_msg=column)
@@ -0,0 +1,121 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+
+from src.apis.tokens import APIClient, TOKEN_TIME_FORMAT
+from src.data.load_data import DataPrep
+
+
+def _response(status_code, body):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body).encode()
+    return response
+
+
+class StubHTTPClient:
+    """Records requests and answers them with `handler(method, params)`."""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def request(self, method, url, params=None, **kwargs):
+        with self.lock:
+            self.calls.append((method, url, dict(params or {})))
+        return self.handler(method, params or {})
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+
+def _login_client(tmp_path, monkeypatch):
+    logins = iter(range(1, 100))
+    http = StubHTTPClient(lambda method, params: _response(200, {'access_token': f'token-{next(logins)}', 'expires_in': 3600}))
+    monkeypatch.setattr('src.apis.tokens.get_http_client', lambda: http)
+    client = APIClient()
+    client.remc_base_url = 'http://remc.test/'
+    client.remc_token_file = str(tmp_path / 'token_remc.json')
+    return client, http
+
+
+def _expiring_in(seconds, token='cached'):
+    return {'access_token': token, 'expires_at': (datetime.now() + timedelta(seconds=seconds)).strftime(TOKEN_TIME_FORMAT)}
+
+
+def test_token_is_reused_until_the_refresh_margin(tmp_path, monkeypatch):
+    client, http = _login_client(tmp_path, monkeypatch)
+    client.refresh_margin = 300
+    client.remc_token = _expiring_in(600)
+
+    assert client.get_remc_token()['access_token'] == 'cached'
+    assert http.calls == []
+
+    client.remc_token = _expiring_in(200)
+    assert client.get_remc_token()['access_token'] == 'token-1'
+    assert client.get_remc_token()['access_token'] == 'token-1'
+    assert len(http.calls) == 1
+
+
+def test_force_refresh_logs_in_again(tmp_path, monkeypatch):
+    client, http = _login_client(tmp_path, monkeypatch)
+    client.remc_token = _expiring_in(3600)
+
+    assert client.get_remc_token(force_refresh=True)['access_token'] == 'token-1'
+    assert len(http.calls) == 1
+    assert client.load_token(client.remc_token_file)['access_token'] == 'token-1'
+
+
+class StubAPIClient:
+    def __init__(self):
+        self.refreshes = 0
+
+    def get_remc_token(self, force_refresh=False):
+        self.refreshes += int(force_refresh)
+        return {'access_token': 'fresh'}
+
+
+def _prep(monkeypatch, handler):
+    http, api = StubHTTPClient(handler), StubAPIClient()
+    monkeypatch.setattr('src.data.load_data.get_http_client', lambda: http)
+    monkeypatch.setattr('src.data.load_data.get_api_client', lambda: api)
+    prep = DataPrep({'access_token': 'stale'})
+    prep.remc_base_url = 'http://remc.test/'
+    return prep, http, api
+
+
+def _reject_stale(status_code):
+    return lambda method, params: _response(status_code, {'error': 'expired'}) if params['token'] == 'stale' \
+        else _response(200, {'data': []})
+
+
+def test_rejected_token_is_refreshed_and_the_call_retried(monkeypatch):
+    for status_code in (401, 403):
+        prep, http, api = _prep(monkeypatch, _reject_stale(status_code))
+
+        assert prep.call_api('POST', 'getActual', {'date': '2024-05-01'}) == {'data': []}
+        assert [params['token'] for _, _, params in http.calls] == ['stale', 'fresh']
+        assert api.refreshes == 1
+
+
+def test_concurrent_rejections_share_one_login(monkeypatch):
+    n_threads = 8
+    barrier = threading.Barrier(n_threads)
+    reject_stale = _reject_stale(401)
+
+    def handler(method, params):
+        if params['token'] == 'stale':
+            barrier.wait(timeout=5)  # every thread sees the rejection before anyone refreshes
+        return reject_stale(method, params)
+
+    prep, http, api = _prep(monkeypatch, handler)
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        results = list(executor.map(lambda date: prep.call_api('POST', 'getActual', {'date': date}), range(n_threads)))
+
+    assert results == [{'data': []}] * n_threads
+    assert api.refreshes == 1
+    assert len(http.calls) == 2 * n_threads
@@ -0,0 +1,60 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from src.data.schema import to_processed
+from src.data.store import processed_store
+from src.model.tuning import tune_plant
+
+GRID = {'days': [3], 'alpha': [0.2, 0.5], 'tbs': [3], 'weight_recent': [0.7]}
+START_DATE, END_DATE = '2024-04-08', '2024-04-14'
+
+
+def _history(seed=0):
+    datetimes = pd.date_range('2024-04-01', '2024-04-15', freq='15min', inclusive='left')
+    tb = datetimes.hour * 4 + datetimes.minute // 15 + 1
+    power = np.where((tb > 24) & (tb < 76), 3 + 2 * np.random.default_rng(seed).random(len(tb)), 0.0)
+    return pd.DataFrame({'datetime': datetimes, 'power': power, 'tb': tb})
+
+
+def _scored_days(capsys, plant_id):
+    plant_id, result = tune_plant(plant_id, START_DATE, END_DATE, grid=GRID)
+    assert result
+    return int(re.search(r'(\d+) of \d+ day\(s\) scored', capsys.readouterr().out).group(1)), result
+
+
+def test_rerun_scores_no_days(plant_info, capsys):
+    plant_info({751: 8.0})
+    processed_store.write(751, to_processed(_history()))
+
+    assert _scored_days(capsys, 751)[0] == 7
+    scored, result = _scored_days(capsys, 751)
+    assert scored == 0
+    assert result == tune_plant(751, START_DATE, END_DATE, grid=GRID, use_cache=False)[1]
+
+
+def test_changed_day_is_rescored(plant_info, capsys):
+    plant_info({752: 8.0})
+    history = _history()
+    processed_store.write(752, to_processed(history))
+    _scored_days(capsys, 752)
+
+    # the last day only feeds its own score
+    history.loc[history['datetime'] >= '2024-04-14 12:00', 'power'] += 1.0
+    processed_store.write(752, to_processed(history))
+    scored, result = _scored_days(capsys, 752)
+    assert scored == 1
+    assert result == tune_plant(752, START_DATE, END_DATE, grid=GRID, use_cache=False)[1]
+
+
+def test_changed_avc_is_rescored(plant_info, capsys):
+    plant_info({753: 8.0})
+    processed_store.write(753, to_processed(_history()))
+    _scored_days(capsys, 753)
+
+    # forecasts are clipped at the AVC, so every day's score depends on it
+    plant_info({753: 4.0})
+    scored, result = _scored_days(capsys, 753)
+    assert scored == 7
+    assert result == tune_plant(753, START_DATE, END_DATE, grid=GRID, use_cache=False)[1]
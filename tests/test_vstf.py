@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from src.model.vstf import VSTFEngine
+
+
+def _tail(end, n_blocks, seed=0):
+    """Processed tail of `n_blocks` blocks ending with the block at `end`."""
+    datetimes = pd.date_range(end=end, periods=n_blocks, freq='15min')
+    tb = datetimes.hour * 4 + datetimes.minute // 15 + 1
+    daylight = np.clip(np.sin((tb - 24) / 48 * np.pi), 0, None)
+    noise = np.random.default_rng(seed).random(n_blocks)
+    return pd.DataFrame({'datetime': datetimes, 'power': 6.0 * daylight * (0.8 + 0.2 * noise), 'tb': tb})
+
+
+def test_short_tail_plant_falls_back_to_persistence(plant_info):
+    plant_info({641: 8.0, 642: 8.0})
+    issue = pd.Timestamp('2024-05-10 12:00')
+    tails = {641: _tail(issue - timedelta(minutes=15), 4 * 96), 642: _tail(issue - timedelta(minutes=15), 50, seed=1)}
+
+    df_pred = VSTFEngine(horizon=4).forecast(tails, issue.to_pydatetime(), owner_id='o')
+
+    assert sorted(df_pred['plant_id'].unique()) == [641, 642]
+    short = df_pred[df_pred['plant_id'] == 642]['forecast'].to_numpy()
+    np.testing.assert_allclose(short, round(tails[642]['power'].iloc[-1], 2))
+    assert df_pred['forecast'].notna().all()
+
+
+def test_targets_start_at_the_issue_block(plant_info):
+    plant_info({643: 8.0, 644: 8.0, 645: 8.0})
+    issue = pd.Timestamp('2024-05-10 12:00')
+    tails = {
+        643: _tail(issue - timedelta(minutes=15), 4 * 96),
+        644: _tail(issue - timedelta(minutes=45), 4 * 96, seed=1),   # two blocks late
+        645: _tail(issue - timedelta(hours=3), 4 * 96, seed=2),      # older than the horizon
+    }
+
+    df_pred = VSTFEngine(horizon=4).forecast(tails, issue.to_pydatetime(), owner_id='o')
+
+    assert sorted(df_pred['plant_id'].unique()) == [643, 644]
+    expected = list(pd.date_range(issue, periods=4, freq='15min'))
+    for _, df_plant in df_pred.groupby('plant_id'):
+        assert list(df_plant['datetime']) == expected
+    assert df_pred['forecast'].notna().all()
+
+
+def test_aggregated_is_scaled_and_clipped_by_the_total_avc(plant_info):
+    issue = pd.Timestamp('2024-05-10 12:00')
+    tail = _tail(issue - timedelta(minutes=15), 4 * 96)
+
+    plant_info({646: 4.0, 647: 8.0})
+    aggregated = VSTFEngine(horizon=4).forecast({'aggregated': tail}, issue.to_pydatetime(), owner_id='o')
+    # the same tail as a single plant whose AVC is the total
+    plant_info({648: 12.0})
+    plant = VSTFEngine(horizon=4).forecast({648: tail}, issue.to_pydatetime(), owner_id='o')
+
+    np.testing.assert_array_equal(aggregated['forecast'].to_numpy(), plant['forecast'].to_numpy())
+    assert (aggregated['forecast'] <= 12.0).all()